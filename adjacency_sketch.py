@@ -0,0 +1,176 @@
+"""Approximate adjacency counting for corpus-scale ingestion.
+
+:class:`AdjacencySketch` replaces the exact ``token -> {adjacent: count}``
+dictionary kept by :class:`skg_engine.SKGEngine` with a count-min sketch over
+hashed token pairs plus a small table of the heaviest neighbors per token.
+Memory is bounded by the sketch dimensions and ``top_k`` rather than by the
+number of distinct pairs seen.
+
+For a sketch built with ``epsilon`` and ``delta`` every estimate satisfies::
+
+    true_count <= estimate <= true_count + epsilon * total
+
+with probability at least ``1 - delta``, where ``total`` is the sum of all
+weights added.  Sketches with identical dimensions and seed can be merged, so
+parallel workers may ingest disjoint shards and combine their results.
+"""
+
+import math
+import sys
+import hashlib
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Multiply-shift hashing works on 64-bit words; the row parameters are drawn
+# from a seeded generator so that sketches built by different workers agree.
+_MASK64 = (1 << 64) - 1
+
+
+def _pair_hash(token: str, adj_token: str) -> int:
+    """Return a stable 64-bit hash of an ordered token pair."""
+    key = sys.intern(token) + "\x1f" + sys.intern(adj_token)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class AdjacencySketch:
+    """
+    Count-min sketch of token-pair weights with an exact top-K neighbor table.
+
+    Parameters
+    ----------
+    epsilon : float
+        Relative error bound; the table width is ``ceil(e / epsilon)``.
+    delta : float
+        Failure probability; the table depth is ``ceil(ln(1 / delta))``.
+    top_k : int
+        Number of neighbors retained per token for traversal.
+    seed : int
+        Seed for the row hash parameters.  Only sketches sharing a seed can be
+        merged.
+    """
+
+    def __init__(
+        self,
+        epsilon: float = 1e-4,
+        delta: float = 1e-3,
+        top_k: int = 16,
+        seed: int = 0,
+    ) -> None:
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be in (0, 1)")
+        self.epsilon = epsilon
+        self.delta = delta
+        self.top_k = top_k
+        self.seed = seed
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1.0 / delta)))
+        rng = np.random.default_rng(seed)
+        # Odd multipliers keep multiply-shift a universal family.
+        mult = rng.integers(1, 2**63, size=self.depth, dtype=np.uint64)
+        self._mult = mult * np.uint64(2) + np.uint64(1)
+        self._add = rng.integers(0, 2**63, size=self.depth, dtype=np.uint64)
+        self._rows = np.arange(self.depth)
+        self.table = np.zeros((self.depth, self.width), dtype=np.float64)
+        self.total = 0.0
+        self.top: dict[str, dict[str, float]] = {}
+
+    def _columns(self, pair_hash: int) -> np.ndarray:
+        h = np.uint64(pair_hash & _MASK64)
+        with np.errstate(over="ignore"):
+            mixed = self._mult * h + self._add
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, token: str, adj_token: str, weight: float = 1) -> float:
+        """Add ``weight`` to the pair and return its updated estimate."""
+        cols = self._columns(_pair_hash(token, adj_token))
+        self.table[self._rows, cols] += weight
+        self.total += weight
+        estimate = float(self.table[self._rows, cols].min())
+        self._offer(token, adj_token, estimate)
+        return estimate
+
+    def add_many(self, token: str, adjacents: Iterable[tuple[str, float]]) -> None:
+        """Add several ``(adj_token, weight)`` pairs for ``token``."""
+        for adj_token, weight in adjacents:
+            self.add(token, adj_token, weight)
+
+    def estimate(self, token: str, adj_token: str) -> float:
+        """Return the estimated weight of a pair (never below the true value)."""
+        cols = self._columns(_pair_hash(token, adj_token))
+        return float(self.table[self._rows, cols].min())
+
+    def error_bound(self) -> float:
+        """Additive error bound ``epsilon * total`` holding with ``1 - delta``."""
+        return self.epsilon * self.total
+
+    def _offer(self, token: str, adj_token: str, estimate: float) -> None:
+        """Insert or refresh a neighbor in the token's top-K table."""
+        neighbors = self.top.setdefault(sys.intern(token), {})
+        if adj_token in neighbors or len(neighbors) < self.top_k:
+            neighbors[sys.intern(adj_token)] = estimate
+            return
+        weakest = min(neighbors, key=neighbors.__getitem__)
+        if estimate > neighbors[weakest]:
+            del neighbors[weakest]
+            neighbors[sys.intern(adj_token)] = estimate
+
+    def neighbors(self, token: str) -> dict[str, float]:
+        """Return a copy of ``token``'s retained neighbors and their estimates."""
+        return dict(self.top.get(token, {}))
+
+    def compatible(self, other: "AdjacencySketch") -> bool:
+        return (
+            self.width == other.width
+            and self.depth == other.depth
+            and self.seed == other.seed
+        )
+
+    def merge(self, other: "AdjacencySketch") -> None:
+        """Fold ``other`` into this sketch in place."""
+        if not self.compatible(other):
+            raise ValueError("Cannot merge sketches with different dimensions or seed")
+        self.table += other.table
+        self.total += other.total
+        tokens = set(self.top) | set(other.top)
+        for token in tokens:
+            candidates = set(self.top.get(token, {})) | set(other.top.get(token, {}))
+            scored = sorted(
+                ((self.estimate(token, adj), adj) for adj in candidates),
+                reverse=True,
+            )[: self.top_k]
+            self.top[token] = {adj: est for est, adj in scored}
+
+    def save(self, path: str) -> None:
+        """Persist the sketch to a compressed ``.npz`` file."""
+        tokens = sorted(self.top)
+        pairs = [(t, a, w) for t in tokens for a, w in self.top[t].items()]
+        np.savez_compressed(
+            path,
+            table=self.table,
+            params=np.array(
+                [self.epsilon, self.delta, self.top_k, self.seed, self.total]
+            ),
+            top_tokens=np.array([p[0] for p in pairs], dtype=object),
+            top_adjs=np.array([p[1] for p in pairs], dtype=object),
+            top_weights=np.array([p[2] for p in pairs], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> Optional["AdjacencySketch"]:
+        """Load a sketch written by :meth:`save`, or ``None`` on failure."""
+        try:
+            with np.load(path, allow_pickle=True) as data:
+                epsilon, delta, top_k, seed, total = data["params"].tolist()
+                sketch = cls(epsilon, delta, int(top_k), int(seed))
+                sketch.table = data["table"]
+                sketch.total = float(total)
+                for token, adj, weight in zip(
+                    data["top_tokens"], data["top_adjs"], data["top_weights"]
+                ):
+                    row = sketch.top.setdefault(sys.intern(str(token)), {})
+                    row[sys.intern(str(adj))] = float(weight)
+            return sketch
+        except Exception:
+            return None
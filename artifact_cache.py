@@ -0,0 +1,246 @@
+"""Content-addressed cache for generated modality artifacts.
+
+Artifacts (TTS audio, FFT data and images, rendered glyphs) are keyed by a
+hash of everything that influences their content: the input text or glyph and
+the generation parameters.  A small JSON index under the cache root records
+which files belong to each key, their size and when they were last used, so
+repeated requests become cache hits and the artifacts can be kept under a
+size budget by evicting the least recently used ones.
+
+The index is a ``cache_index.json`` snapshot plus an append-only
+``cache_index.journal`` of JSON lines, compacted every
+``config.MODALITY_CACHE_COMPACT_EVERY`` records like the glyph manifest.
+Only files recorded through :meth:`ArtifactCache.store` are ever evicted;
+webcam frames, fetched photos and glyph sigils sharing the tree are left
+alone.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any
+
+import config
+from file_lock import FileLock
+
+# Lookups are journaled in batches of this many touched keys
+_TOUCH_BATCH = 64
+
+
+def _stat(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ArtifactCache:
+    """
+    Index of generated artifacts keyed by generation parameters.
+
+    Parameters
+    ----------
+    root : str
+        Directory tree managed by the cache (``modalities`` by default).
+    max_bytes : int | None
+        Size budget for the indexed artifacts.  When exceeded the least
+        recently used entries are deleted until the total drops below
+        ``config.MODALITY_CACHE_LOW_WATERMARK`` of the budget.  ``None``
+        uses ``config.MODALITY_CACHE_MAX_BYTES``.
+    """
+
+    def __init__(self, root: str = "modalities", max_bytes: int | None = None) -> None:
+        self.root = root
+        self.index_path = os.path.join(root, "cache_index.json")
+        self.journal_path = os.path.join(root, "cache_index.journal")
+        self.max_bytes = config.MODALITY_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(root, "cache_index.lock"))
+        self._index_stat: tuple[int, int] | None = None
+        self._loaded = False
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._touched: dict[str, float] = {}
+        self._tracked_bytes = 0
+
+    @staticmethod
+    def key(kind: str, **params: Any) -> str:
+        """Return a stable content key for an artifact ``kind`` and its inputs."""
+        payload = json.dumps({"kind": kind, **params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, subdir: str, key: str, ext: str) -> str:
+        """Return the content-addressed path for ``key`` inside ``subdir``."""
+        return os.path.join(self.root, subdir, f"{key}{ext}")
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        """Apply one journal record to the in-memory index."""
+        key = record["key"]
+        old = self.entries.get(key)
+        if "paths" in record:
+            if old is not None:
+                self._tracked_bytes -= old["size"]
+            self.entries[key] = {
+                "paths": record["paths"],
+                "size": record["size"],
+                "last_used": record["last_used"],
+            }
+            self._tracked_bytes += record["size"]
+        elif old is None:
+            return
+        elif record.get("drop"):
+            self._tracked_bytes -= old["size"]
+            del self.entries[key]
+        else:
+            old["last_used"] = max(old["last_used"], record["last_used"])
+
+    def _refresh(self) -> None:
+        """Load the index and apply journal records written since last read."""
+        index_stat = _stat(self.index_path)
+        journal_stat = _stat(self.journal_path)
+        journal_size = journal_stat[1] if journal_stat else 0
+        if (
+            not self._loaded
+            or index_stat != self._index_stat
+            or journal_size < self._journal_offset
+        ):
+            self._loaded = True
+            self._index_stat = index_stat
+            self.entries = {}
+            self._journal_offset = 0
+            self._journal_lines = 0
+            if index_stat is not None:
+                try:
+                    with open(self.index_path, "r", encoding="utf-8") as f:
+                        self.entries = json.load(f).get("entries", {})
+                except Exception:
+                    self.entries = {}
+            self._tracked_bytes = sum(e["size"] for e in self.entries.values())
+        if journal_size == self._journal_offset:
+            return
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    self._journal_offset += len(line)
+                    self._journal_lines += 1
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+
+    def _append(self, records: list[dict[str, Any]]) -> None:
+        """Journal ``records`` and compact the index when the journal is long."""
+        with self._lock, self._file_lock:
+            self._refresh()
+            touched = [{"key": k, "last_used": t} for k, t in self._touched.items()]
+            self._touched = {}
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in touched + records))
+            # Read our own records back with any appended by other processes
+            self._refresh()
+            if self._journal_lines >= config.MODALITY_CACHE_COMPACT_EVERY:
+                self.flush()
+
+    def flush(self) -> None:
+        """Fold pending updates and the journal into the index file."""
+        with self._lock, self._file_lock:
+            self._refresh()
+            for key, last_used in self._touched.items():
+                self._apply({"key": key, "last_used": last_used})
+            self._touched = {}
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": 1, "entries": self.entries}, f, separators=(",", ":")
+                )
+            os.replace(tmp_path, self.index_path)
+            open(self.journal_path, "w", encoding="utf-8").close()
+            self._index_stat = _stat(self.index_path)
+            self._journal_offset = 0
+            self._journal_lines = 0
+
+    def lookup(self, key: str) -> list[str] | None:
+        """Return the artifact paths for ``key`` if all of them still exist."""
+        with self._lock:
+            self._refresh()
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            paths = entry["paths"]
+            if not all(os.path.exists(p) for p in paths):
+                self._append([{"key": key, "drop": True}])
+                return None
+            entry["last_used"] = self._touched[key] = time.time()
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._append([])
+            return list(paths)
+
+    def store(self, key: str, paths: list[str]) -> None:
+        """Record freshly generated ``paths`` under ``key``."""
+        paths = [p for p in paths if p and os.path.exists(p)]
+        if not paths:
+            return
+        size = sum(os.path.getsize(p) for p in paths)
+        with self._lock:
+            self._append(
+                [{"key": key, "paths": paths, "size": size, "last_used": time.time()}]
+            )
+            if self._tracked_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries once the budget is exceeded.
+
+        Entries are removed oldest first until the indexed artifacts fit in
+        the low watermark fraction of ``max_bytes``.  Files referenced by a
+        remaining entry are kept.  Glyph records may still name deleted
+        files; ``modalities.materialize_modalities`` treats those kinds as
+        pending and regenerates them.  Returns the bytes freed.
+        """
+        with self._lock, self._file_lock:
+            self._refresh()
+            if self._tracked_bytes <= self.max_bytes:
+                return 0
+            target = self.max_bytes * config.MODALITY_CACHE_LOW_WATERMARK
+            remaining = self._tracked_bytes
+            victims = []
+            by_age = sorted(self.entries.items(), key=lambda e: e[1]["last_used"])
+            for key, entry in by_age:
+                if remaining <= target:
+                    break
+                victims.append(key)
+                remaining -= entry["size"]
+            kept = {
+                os.path.normpath(p)
+                for k, e in self.entries.items() if k not in victims
+                for p in e["paths"]
+            }
+            freed = 0
+            removed = 0
+            for key in victims:
+                for path in self.entries[key]["paths"]:
+                    if os.path.normpath(path) in kept:
+                        continue
+                    try:
+                        size = os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    freed += size
+                    removed += 1
+            self._append([{"key": key, "drop": True} for key in victims])
+            print(
+                f"[ArtifactCache] Evicted {len(victims)} entries, "
+                f"{removed} files ({freed} bytes)"
+            )
+            return freed
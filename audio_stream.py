@@ -0,0 +1,456 @@
+"""Continuous speech capture with energy-based segmentation.
+
+One capture thread reads an input source (the microphone, or a WAV file
+standing in for it) into a ring buffer, so no audio is lost between
+utterances.  A segmenter thread splits the stream into utterances by
+short-time energy.  A worker pool writes each utterance to
+``modalities/audio_input`` and transcribes it, while its spectrogram is
+computed concurrently.  Results are yielded in capture order.
+"""
+
+import os
+import time
+import wave
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator
+
+import numpy as np
+
+import config
+
+try:
+    import pyaudio
+except Exception:  # pragma: no cover - optional dependency
+    pyaudio = None  # type: ignore
+
+
+class WavFileSource:
+    """
+    Stand-in for a microphone that streams a 16-bit WAV file in blocks.
+
+    With ``realtime`` the blocks are paced at the file's sample rate, as a
+    device would deliver them; otherwise the file is read as fast as
+    possible (for throughput benchmarks).  A file can wait for the reader,
+    so it asks for ``backpressure`` instead of dropping audio.
+    """
+
+    backpressure = True
+
+    def __init__(self, path: str, block: int = 1024, realtime: bool = False) -> None:
+        self._wav = wave.open(path, "rb")
+        if self._wav.getsampwidth() != 2:
+            self._wav.close()
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        self.rate = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.block = block
+        self.realtime = realtime
+        self._start: float | None = None
+        self._delivered = 0
+
+    def read(self) -> np.ndarray | None:
+        """Return the next block of mono samples, or ``None`` at the end."""
+        frames = self._wav.readframes(self.block)
+        if not frames:
+            return None
+        samples = np.frombuffer(frames, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1).astype(np.int16)
+        if self.realtime:
+            if self._start is None:
+                self._start = time.monotonic()
+            self._delivered += len(samples)
+            delay = self._start + self._delivered / self.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return samples
+
+    def close(self) -> None:
+        self._wav.close()
+
+
+class MicrophoneSource:
+    """Persistent PyAudio input stream delivering mono 16-bit blocks."""
+
+    # The device keeps recording; stalling the reader would overflow it
+    backpressure = False
+
+    def __init__(self, rate: int | None = None, block: int = 1024, device: int | None = None) -> None:
+        if pyaudio is None:
+            raise RuntimeError("pyaudio not installed; cannot open the microphone")
+        self.rate = rate or config.STT_SAMPLE_RATE
+        self.block = block
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=block,
+            input_device_index=device,
+        )
+
+    def read(self) -> np.ndarray | None:
+        data = self._stream.read(self.block, exception_on_overflow=False)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def close(self) -> None:
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+
+class RingBuffer:
+    """
+    Fixed-size sample buffer between the capture and segmenter threads.
+
+    If the reader falls more than ``capacity`` samples behind, the oldest
+    audio is overwritten and counted in ``dropped``.  With ``block`` the
+    writer waits for the reader instead, so no audio is lost.
+    """
+
+    def __init__(self, capacity: int, block: bool = False) -> None:
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.block = block
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def write(self, samples: np.ndarray) -> None:
+        with self._cond:
+            if self.block:
+                for i in range(0, len(samples), self.capacity):
+                    chunk = samples[i:i + self.capacity]
+                    self._cond.wait_for(
+                        lambda: self._closed
+                        or self.capacity - (self._written - self._read) >= len(chunk)
+                    )
+                    if self._closed:
+                        return
+                    self._store(chunk)
+                return
+            if len(samples) > self.capacity:
+                # Only the newest ``capacity`` samples can be kept
+                self._written += len(samples) - self.capacity
+                samples = samples[-self.capacity:]
+            self._store(samples)
+            if self._written - self._read > self.capacity:
+                self.dropped += self._written - self._read - self.capacity
+                self._read = self._written - self.capacity
+
+    def _store(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        self._buf[: n - first] = samples[first:]
+        self._written += n
+        self._cond.notify_all()
+
+    def read(self, max_samples: int, timeout: float | None = None) -> np.ndarray | None:
+        """
+        Return up to ``max_samples`` unread samples (a copy), an empty array
+        on timeout, or ``None`` once the buffer is closed and drained.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._written > self._read or self._closed, timeout)
+            available = self._written - self._read
+            if available == 0:
+                return None if self._closed else np.zeros(0, dtype=np.int16)
+            n = min(available, max_samples)
+            start = self._read % self.capacity
+            idx = (start + np.arange(n)) % self.capacity if start + n > self.capacity else slice(start, start + n)
+            out = self._buf[idx].copy()
+            self._read += n
+            self._cond.notify_all()
+            return out
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class EnergySegmenter:
+    """
+    Split a sample stream into utterances by short-time RMS energy.
+
+    A frame is voiced when its RMS exceeds both ``threshold`` and three
+    times the running noise floor.  An utterance ends after ``hangover_ms``
+    of unvoiced frames or at ``max_segment_s``.  It is kept only if it has
+    at least ``min_speech_ms`` of voiced audio, and ``pre_roll_ms`` of audio
+    before its onset is included so soft word starts are not clipped.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        frame_ms: int = 30,
+        threshold: float | None = None,
+        hangover_ms: int | None = None,
+        min_speech_ms: int = 200,
+        max_segment_s: float = 15.0,
+        pre_roll_ms: int = 200,
+    ) -> None:
+        self.rate = rate
+        self.frame = max(1, rate * frame_ms // 1000)
+        self.threshold = config.STT_VAD_THRESHOLD if threshold is None else threshold
+        hangover_ms = config.STT_VAD_HANGOVER_MS if hangover_ms is None else hangover_ms
+        self.hangover = max(1, hangover_ms // frame_ms)
+        self.min_voiced = max(1, min_speech_ms // frame_ms)
+        self.max_frames = max(1, int(max_segment_s * 1000 // frame_ms))
+        self.noise_floor = self.threshold / 3
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._pre_roll: deque = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._segment: list[np.ndarray] | None = None
+        self._start = 0
+        self._voiced = 0
+        self._silence = 0
+        self._position = 0
+
+    def feed(self, samples: np.ndarray) -> list[tuple[int, np.ndarray]]:
+        """
+        Consume ``samples`` and return the utterances completed by them as
+        ``(start_sample, samples)`` pairs.
+        """
+        data = np.concatenate([self._pending, samples]) if len(self._pending) else samples
+        n_frames = len(data) // self.frame
+        self._pending = data[n_frames * self.frame:]
+        if n_frames == 0:
+            return []
+        frames = data[: n_frames * self.frame].reshape(n_frames, self.frame)
+        rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+        done = []
+        for frame, energy in zip(frames, rms):
+            self._position += self.frame
+            voiced = energy > max(self.threshold, 3 * self.noise_floor)
+            if not voiced:
+                self.noise_floor += 0.05 * (energy - self.noise_floor)
+            if self._segment is None:
+                if voiced:
+                    self._segment = list(self._pre_roll) + [frame]
+                    self._start = self._position - len(self._segment) * self.frame
+                    self._voiced, self._silence = 1, 0
+                else:
+                    self._pre_roll.append(frame)
+                continue
+            self._segment.append(frame)
+            if voiced:
+                self._voiced += 1
+                self._silence = 0
+            else:
+                self._silence += 1
+            if self._silence >= self.hangover or len(self._segment) >= self.max_frames:
+                segment = self._close()
+                if segment is not None:
+                    done.append(segment)
+        return done
+
+    def _close(self) -> tuple[int, np.ndarray] | None:
+        segment, voiced = self._segment, self._voiced
+        self._segment = None
+        self._pre_roll.clear()
+        if not segment or voiced < self.min_voiced:
+            return None
+        return self._start, np.concatenate(segment)
+
+    def flush(self) -> list[tuple[int, np.ndarray]]:
+        """Return the utterance in progress at the end of the stream."""
+        if self._segment is None:
+            return []
+        segment = self._close()
+        return [segment] if segment is not None else []
+
+
+@dataclass
+class SpeechSegment:
+    text: str
+    audio_path: str | None
+    start: float  # seconds since the stream started
+    duration: float
+
+
+def _default_transcriber(samples: np.ndarray, rate: int) -> str:
+    from stt_engine import recognize_samples
+    return recognize_samples(samples, rate)
+
+
+def _default_fft(audio_path: str) -> str | None:
+    from stt_engine import recording_fft
+    return recording_fft(audio_path)
+
+
+class SpeechStream:
+    """
+    Capture, segment and transcribe speech continuously.
+
+    Parameters
+    ----------
+    source
+        Object with ``rate``, ``read()`` (a block of int16 samples or ``None``
+        at the end) and ``close()``: :class:`MicrophoneSource` or
+        :class:`WavFileSource`.  Sources with a true ``backpressure``
+        attribute wait for the segmenter when the ring is full instead of
+        overwriting unread audio.
+    transcribe : Callable | None
+        ``transcribe(samples, rate) -> str``; Google/Sphinx via
+        ``stt_engine`` by default.  ``None`` skips transcription.
+    fft : Callable | None
+        ``fft(audio_path)`` run for every utterance alongside transcription.
+    workers : int
+        Size of the pool that transcribes and FFTs utterances.
+    gate : Callable[[], bool] | None
+        Audio is replaced by silence while ``gate()`` is False, e.g. so the
+        engine's own speech is not transcribed.
+    """
+
+    def __init__(
+        self,
+        source,
+        transcribe: Callable[[np.ndarray, int], str] | None = _default_transcriber,
+        fft: Callable[[str], object] | None = _default_fft,
+        workers: int | None = None,
+        output_dir: str = "modalities/audio_input",
+        gate: Callable[[], bool] | None = None,
+        ring_seconds: float | None = None,
+        segmenter: EnergySegmenter | None = None,
+    ) -> None:
+        self.source = source
+        self.rate = source.rate
+        self.transcribe = transcribe
+        self.fft = fft
+        self.output_dir = output_dir
+        self.gate = gate
+        ring_seconds = config.STT_RING_SECONDS if ring_seconds is None else ring_seconds
+        self.ring = RingBuffer(
+            int(self.rate * ring_seconds), block=getattr(source, "backpressure", False)
+        )
+        self.segmenter = segmenter or EnergySegmenter(self.rate)
+        workers = workers or config.STT_WORKERS
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt")
+        self._fft_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stt-fft")
+        self._results: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._count = 0
+        self.captured = 0
+
+    def start(self) -> "SpeechStream":
+        self._threads = [
+            threading.Thread(target=self._capture, name="stt-capture", daemon=True),
+            threading.Thread(target=self._segment, name="stt-segment", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop capturing; utterances already queued are still processed."""
+        self._stop.set()
+
+    def _capture(self) -> None:
+        try:
+            while not self._stop.is_set():
+                samples = self.source.read()
+                if samples is None:
+                    break
+                if self.gate is not None and not self.gate():
+                    samples = np.zeros_like(samples)
+                self.ring.write(samples)
+                self.captured += len(samples)
+        except Exception as e:
+            print(f"[AudioStream] Capture stopped: {e}")
+        finally:
+            self.ring.close()
+            self.source.close()
+
+    def _segment(self) -> None:
+        while True:
+            samples = self.ring.read(self.rate, timeout=0.5)
+            if samples is None:
+                break
+            for start, segment in self.segmenter.feed(samples):
+                self._submit(segment, start)
+        for start, segment in self.segmenter.flush():
+            self._submit(segment, start)
+        self._pool.shutdown(wait=True)
+        self._fft_pool.shutdown(wait=True)
+        self._results.put(None)
+
+    def _submit(self, samples: np.ndarray, start: int) -> None:
+        self._count += 1
+        self._results.put(
+            self._pool.submit(self._process, self._count, samples, start / self.rate)
+        )
+
+    def _write_wav(self, index: int, samples: np.ndarray) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.output_dir, f"mic_{ts}_{index:05d}.wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.rate)
+            wf.writeframes(samples.tobytes())
+        return path
+
+    def _process(self, index: int, samples: np.ndarray, start: float) -> SpeechSegment:
+        audio_path = None
+        try:
+            audio_path = self._write_wav(index, samples)
+            if self.fft is not None:
+                self._fft_pool.submit(self.fft, audio_path)
+        except Exception as e:
+            print(f"[AudioStream] Failed to save segment {index}: {e}")
+        text = self.transcribe(samples, self.rate) if self.transcribe else ""
+        return SpeechSegment(text, audio_path, start, len(samples) / self.rate)
+
+    def results(self, timeout: float | None = None) -> Iterator[SpeechSegment]:
+        """Yield processed utterances in capture order until the stream ends."""
+        while True:
+            future: Future | None = self._results.get(timeout=timeout)
+            if future is None:
+                return
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"[AudioStream] Error processing segment: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark speech segmentation on a WAV file")
+    parser.add_argument("wav", help="16-bit PCM WAV standing in for the microphone")
+    parser.add_argument("--workers", type=int, default=config.STT_WORKERS, help="Transcription workers")
+    parser.add_argument("--realtime", action="store_true", help="Pace input like a live device")
+    parser.add_argument("--transcribe", action="store_true", help="Run speech recognition on segments")
+    parser.add_argument("--no-fft", action="store_true", help="Skip per-segment spectrograms")
+    parser.add_argument("--out", default="modalities/audio_input", help="Segment output directory")
+    args = parser.parse_args()
+    source = WavFileSource(args.wav, realtime=args.realtime)
+    duration = source._wav.getnframes() / source.rate
+    stream = SpeechStream(
+        source,
+        transcribe=_default_transcriber if args.transcribe else None,
+        fft=None if args.no_fft else _default_fft,
+        workers=args.workers,
+        output_dir=args.out,
+    )
+    started = time.monotonic()
+    segments = list(stream.start().results())
+    elapsed = time.monotonic() - started
+    for seg in segments:
+        print(f"[AudioStream] {seg.start:7.2f}s +{seg.duration:5.2f}s {seg.audio_path} {seg.text!r}")
+    print(
+        f"[AudioStream] {len(segments)} segments from {duration:.1f}s of audio in "
+        f"{elapsed:.2f}s ({duration / max(elapsed, 1e-9):.1f}x real time, "
+        f"{stream.ring.dropped} samples dropped)"
+    )
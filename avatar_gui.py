@@ -4,6 +4,18 @@ import queue
 import tkinter as tk
 from typing import Optional
 
+from PIL import ImageTk
+
+import config
+from glyph_atlas import get_atlas
+from thumbnails import PhotoCache, load_thumbnail, thumbnail_path
+
+
+def _load_photo(path: str) -> tk.PhotoImage:
+    """Decode the display thumbnail of ``path``, writing it if missing."""
+    load_thumbnail(path)
+    return tk.PhotoImage(file=thumbnail_path(path))
+
 
 class AvatarGUI:
     """Minimal Tkinter interface showing glyphs, FFT images and adjacency graph."""
@@ -14,6 +26,8 @@ class AvatarGUI:
         self.root.title("Avatar GUI")
         self.update_queue: queue.Queue = queue.Queue()
         self.images: dict[str, tk.PhotoImage] = {}
+        self.photos = PhotoCache(_load_photo)
+        self.atlas = getattr(engine, "glyph_atlas", None) or get_atlas()
         # glyph display
         self.glyph_label = tk.Label(self.root, text="Glyph", width=256, height=256)
         self.glyph_label.grid(row=0, column=0, padx=5, pady=5)
@@ -46,7 +60,7 @@ class AvatarGUI:
     def _set_image(self, label: tk.Label, path: Optional[str], key: str) -> None:
         if path and os.path.exists(path):
             try:
-                photo = tk.PhotoImage(file=path)
+                photo = self.photos.get(path)
                 label.configure(image=photo, text="")
                 self.images[key] = photo
             except Exception:
@@ -54,11 +68,25 @@ class AvatarGUI:
         else:
             label.configure(text="No image", image="")
 
+    def _set_sprite(self, label: tk.Label, glyph_id: str, key: str) -> None:
+        """Show ``glyph_id`` blitted from the glyph atlas."""
+        size = config.THUMBNAIL_SIZE
+        photo = self.photos.lookup(
+            ("atlas", glyph_id, size),
+            lambda: ImageTk.PhotoImage(self.atlas.sprite(glyph_id, size)),
+        )
+        label.configure(image=photo, text="")
+        self.images[key] = photo
+
     def _update_display(self, glyph: dict, gesture: Optional[str]) -> None:
         self.last_token = glyph.get("token")
         visual = glyph.get("modalities", {}).get("visual", {})
         audio_mod = glyph.get("modalities", {}).get("audio", {})
-        self._set_image(self.glyph_label, visual.get("symbolic_image"), "glyph")
+        glyph_id = glyph.get("glyph_id")
+        if glyph_id in self.atlas:
+            self._set_sprite(self.glyph_label, glyph_id, "glyph")
+        else:
+            self._set_image(self.glyph_label, visual.get("symbolic_image"), "glyph")
         self._set_image(self.audio_fft_label, audio_mod.get("fft_audio"), "audio")
         img_fft = visual.get("fft_from_image") or visual.get("fft_visual")
         self._set_image(self.image_fft_label, img_fft, "imgfft")
@@ -3,12 +3,61 @@
 # Engine communication settings
 ENABLE_ENGINE_COMM = False
 SUBSCRIBE_STREAM = None
+# Transport between engines: "file" (JSON lines, polled), "socket" (Unix
+# domain socket pub/sub) or "shm" (shared-memory ring, one subscriber).
+# SUBSCRIBE_STREAM is the peer's address for that transport.
+ENGINE_TRANSPORT = "file"
+COMM_FILE_POLL_INTERVAL = 1.0
+# File transport log: segment size before rotation, segments retained, and
+# messages read per batch when a subscriber catches up on its backlog.
+COMM_SEGMENT_BYTES = 16 * 1024 ** 2
+COMM_SEGMENT_RETENTION = 8
+COMM_REPLAY_BATCH = 1024
+# Messages batched into one send / ring update, outbound queue bound, ring
+# size, and how long publish blocks on a full queue before dropping.
+COMM_BATCH_SIZE = 256
+COMM_QUEUE_SIZE = 4096
+COMM_SHM_BYTES = 1024 ** 2
+COMM_PUBLISH_TIMEOUT = 0.5
+# Socket subscribers that cannot take a batch within this many seconds are
+# disconnected.
+COMM_SEND_TIMEOUT = 2.0
+# Inbound side: queue bound, seconds a received token is ignored after it
+# was accepted, and the per-source rate limit (messages/s and burst).
+COMM_INBOUND_QUEUE_SIZE = 1024
+COMM_DEDUP_TTL = 30.0
+COMM_RATE_PER_SOURCE = 20.0
+COMM_RATE_BURST = 100
+# Engine cluster (engine_cluster.py): worker processes, each owning a hash
+# partition of the token space, and the root of their memory directories.
+CLUSTER_WORKERS = 4
+CLUSTER_MEMORY_DIR = "./glyph_output/cluster"
+# Seconds between checks for exited workers, and how long stop() waits for
+# workers to drain their queues before terminating them.
+CLUSTER_POLL_INTERVAL = 0.5
+CLUSTER_STOP_TIMEOUT = 30.0
 
 # Centralized file paths
 GLYPH_OUTPUT_DIR = "./glyph_output"
 ADJACENCY_SAMPLE_DIR = "./adjacency_samples"
 OFFLINE_LOOKUP_FILE = "offline_lookup.json"
 
+# Background job queue for enrichment work (modalities, glyph backfill)
+JOB_QUEUE_DB = "./glyph_output/jobs.sqlite3"
+JOB_WORKERS = 2
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 2.0
+# Running jobs are leased to the claiming process for this many seconds and
+# renewed every third of that while they run; jobs whose owner died or whose
+# lease expired are queued again.
+JOB_LEASE_SECONDS = 300.0
+# Number of top adjacents of each input token queued for glyph backfill
+BACKFILL_ADJACENTS = 5
+
+# Number of journal entries appended to glyph_output/manifest.journal before
+# they are compacted into manifest.json
+MANIFEST_COMPACT_EVERY = 1000
+
 # Glyph decision thresholds
 GLYPH_WEIGHT_THRESHOLD = 5.0
 LOW_CONFIDENCE_THRESHOLD = 1.0
@@ -16,6 +65,77 @@ MAX_RECURSION_DEPTH = 3
 CONFIRMATION_THRESHOLD = 3
 REJECTION_COOLDOWN = 1
 
+# Approximate adjacency counting (count-min sketch).  Estimates exceed the
+# true pair weight by at most SKETCH_EPSILON * total weight with probability
+# 1 - SKETCH_DELTA; SKETCH_TOP_K neighbors are retained per token.
+SKETCH_EPSILON = 1e-4
+SKETCH_DELTA = 1e-3
+SKETCH_TOP_K = 16
+# Adjacency updates between rewrites of adjacency_sketch.npz; pending
+# updates are also written by SKGEngine.save_sketch() and at exit.
+SKETCH_SAVE_EVERY = 1000
+
+# Modality generation: worker threads shared by all glyph builds and the
+# per-stage timeout (seconds) after which a stage is dropped from the result.
+MODALITY_WORKERS = 4
+MODALITY_STAGE_TIMEOUT = 30.0
+# Speech synthesis gets its own, longer budget so that slow voices are not
+# dropped; a timed-out kind stays pending and is retried on next access.
+TTS_STAGE_TIMEOUT = 120.0
+# Wall-clock budget for a whole modality build; stages still unfinished when
+# it runs out are dropped like timed-out ones.
+MODALITY_GRAPH_TIMEOUT = 180.0
+# Queued utterances not spoken within this many seconds are dropped as stale
+TTS_SPEECH_MAX_AGE = 10.0
+# Cache of synthesized speech keyed by text, voice and rate; least recently
+# used WAVs are evicted beyond the size cap.
+TTS_CACHE_DIR = "./glyph_output/tts_cache"
+TTS_CACHE_MAX_BYTES = 512 * 1024 ** 2
+# Modality profile for new glyphs: "eager" generates every modality when the
+# glyph is built, "lazy" stores pending descriptors that are generated on
+# first display or externalization and "text" never generates media unless
+# glyph_builder.ensure_modalities is called explicitly (bulk/headless runs).
+MODALITY_PROFILE = "lazy"
+# Storage of audio FFT artifacts (half spectrum in compressed .npz); float16
+# and log scaling shrink modalities/fft_audio further at some precision cost.
+# float16 spectra are always log-scaled, as raw magnitudes overflow it.
+FFT_AUDIO_DTYPE = "float32"
+FFT_AUDIO_LOG_SCALE = False
+# Size budget for the artifacts indexed under modalities/; least recently
+# used ones are evicted once it is exceeded, down to the low watermark
+# fraction so that eviction does not run again on the next store.  Index
+# updates are appended to a journal that is folded into the index every
+# COMPACT_EVERY records.
+MODALITY_CACHE_MAX_BYTES = 2 * 1024 ** 3
+MODALITY_CACHE_LOW_WATERMARK = 0.8
+MODALITY_CACHE_COMPACT_EVERY = 256
+# Side length of the pre-scaled thumbnails written next to glyph and FFT
+# images (the GUI panel size).
+THUMBNAIL_SIZE = 256
+# Glyph atlas: every pool glyph pre-rendered once per size into a sprite
+# sheet that the sigil exporter and GUIs blit from.
+GLYPH_ATLAS_DIR = "./glyph_output/atlas"
+GLYPH_ATLAS_SIZES = (64, 256, 512)
+
+# Streaming speech capture: sample rate of the microphone stream, ring
+# buffer length, transcription workers and the energy VAD settings (int16
+# RMS threshold, silence that ends an utterance).
+STT_SAMPLE_RATE = 16000
+STT_RING_SECONDS = 30
+STT_WORKERS = 2
+STT_VAD_THRESHOLD = 500.0
+STT_VAD_HANGOVER_MS = 400
+
+# Webcam capture: frames held in the preallocated decode ring, and seconds
+# between frames that are tokenized (only those are written to disk).
+VIDEO_RING_SLOTS = 8
+VIDEO_TOKEN_INTERVAL = 3.0
+# Perceptual frame tokens ("dhash" or "phash"): frames within this many of
+# the 64 hash bits of a recently seen frame reuse its token and are skipped.
+VIDEO_HASH_METHOD = "dhash"
+VIDEO_HASH_THRESHOLD = 10
+VIDEO_HASH_INDEX_SIZE = 256
+
 # Log directory for symbolic stream
 LOG_DIR = "logs"
 SYMBOLIC_STREAM_LOG = "symbolic_stream.jsonl"
@@ -0,0 +1,340 @@
+"""Hash-partitioned SKG engines running in worker processes.
+
+Each of ``N`` worker processes owns one :class:`skg_engine.SKGEngine` and
+the tokens whose ``TokenFusion.fuse_token`` id hashes to its partition.  A
+partition's token map, adjacency map and logs live under
+``<memory_root>/partition_<i>``, and so do its glyph output (manifest
+journal, spectral index) and job queue database, so workers never write to
+the same journal, index or SQLite file.  Only the content-addressed
+modality and TTS caches are shared; their indexes take a cross-process
+:class:`file_lock.FileLock`.
+
+The :class:`EngineCluster` router runs in the calling process.  It sends
+each request to the worker that owns the token.  A thought loop runs on the
+owning worker until it reaches an adjacent token owned by another
+partition.  That worker returns the expansion instead of following it, and
+the router forwards it to the owner.  The glyphs visited on every partition
+are gathered back into one result, so ingestion and thought loops use all
+cores instead of one GIL-bound process.  Workers are headless: tokens they
+externalize are spoken or gestured by the router.
+
+``python engine_cluster.py --workers 4 fire water ...`` ingests tokens
+through the cluster and runs their thought loops.
+"""
+
+import os
+import time
+import queue
+import argparse
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable
+
+import config
+from token_fusion import TokenFusion
+
+_fusion = TokenFusion()
+
+
+def partition_for(token: str, partitions: int) -> int:
+    """Return the partition that owns ``token``."""
+    return int(_fusion.fuse_token(token), 16) % partitions
+
+
+def _serve_partition(index: int, partitions: int, memory_root: str, glyph_path, requests, responses) -> None:
+    """Worker process loop: apply requests for one partition's engine."""
+    memory_path = os.path.join(memory_root, f"partition_{index}")
+    # Set before skg_engine (and the modules it imports) read them
+    config.GLYPH_OUTPUT_DIR = os.path.join(memory_path, "glyphs")
+    config.JOB_QUEUE_DB = os.path.join(memory_path, "jobs.sqlite3")
+    from skg_engine import SKGEngine
+
+    engine = SKGEngine(memory_path, glyph_path)
+    engine.partition = lambda token: partition_for(token, partitions) == index
+    # Workers are headless; externalized tokens go back to the router with
+    # the think result
+    engine.speech_enabled = False
+    engine.gesture_enabled = False
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        req_id, op, args = request
+        try:
+            if op == "think":
+                engine.forwarded = []
+                engine.externalized = []
+                glyphs = engine.recursive_thought_loop(*args)
+                result = (glyphs, engine.forwarded, engine.externalized)
+            elif op == "process":
+                result = engine.process_token(*args)
+            elif op == "adjacency":
+                engine.update_adjacency_map(*args)
+                result = engine.get_adjacencies_for_token(args[0])
+            elif op == "traverse":
+                result = engine.traverse_superknowledge(*args)
+            else:
+                raise ValueError(f"Unknown cluster request '{op}'")
+            responses.put((req_id, True, result))
+        except Exception as e:
+            responses.put((req_id, False, f"{type(e).__name__}: {e}"))
+    engine.save_state()
+    # Worker processes skip atexit handlers
+    engine.save_sketch()
+
+
+def externalize(token: str, modality: str) -> None:
+    """Speak or gesture ``token`` in the router process for a worker."""
+    try:
+        if modality == "speak":
+            from tts_engine import speak
+            speak(token, channel="thought")
+        elif modality == "gesture":
+            from gesture_engine import display_gesture
+            display_gesture(token)
+    except Exception as e:
+        print(f"[EngineCluster] Could not externalize '{token}' ({modality}): {e}")
+
+
+class EngineCluster:
+    """
+    Router for ``workers`` partitioned engine processes.
+
+    Parameters
+    ----------
+    workers : int | None
+        Number of partitions / worker processes (``config.CLUSTER_WORKERS``).
+    memory_root : str | None
+        Parent directory of the partition memories
+        (``config.CLUSTER_MEMORY_DIR``).
+    glyph_path : str | None
+        Glyph pool passed to every worker engine.
+    on_externalize : callable | None
+        Called with ``(token, modality)`` for every token a worker
+        externalizes during :meth:`think_batch`; defaults to
+        :func:`externalize`.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        memory_root: str | None = None,
+        glyph_path: str | None = "glossary/extended_glyph_pool.json",
+        on_externalize: Callable[[str, str], None] | None = None,
+    ) -> None:
+        self.workers = workers or config.CLUSTER_WORKERS
+        self.memory_root = memory_root or config.CLUSTER_MEMORY_DIR
+        self.glyph_path = glyph_path
+        self.on_externalize = on_externalize or externalize
+        ctx = mp.get_context("spawn")
+        self._requests = [ctx.Queue() for _ in range(self.workers)]
+        self._responses = ctx.Queue()
+        self._processes = [
+            ctx.Process(
+                target=_serve_partition,
+                args=(i, self.workers, self.memory_root, glyph_path, self._requests[i], self._responses),
+                name=f"skg-partition-{i}",
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        # req_id -> (future, partition)
+        self._pending: dict[int, tuple[Future, int]] = {}
+        self._dead: set[int] = set()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = threading.Thread(target=self._collect, name="cluster-router", daemon=True)
+
+    def start(self) -> "EngineCluster":
+        os.makedirs(self.memory_root, exist_ok=True)
+        for p in self._processes:
+            p.start()
+        self._collector.start()
+        print(f"[EngineCluster] Started {self.workers} partitions in {self.memory_root}")
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stop the workers after they finish queued requests and save state.
+
+        Workers still running ``timeout`` seconds (``config.CLUSTER_STOP_TIMEOUT``)
+        later are terminated, and their unanswered requests fail.
+        """
+        timeout = config.CLUSTER_STOP_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        for q in self._requests:
+            q.put(None)
+        for i, p in enumerate(self._processes):
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                print(f"[EngineCluster] Terminating partition {i} after {timeout}s")
+                p.terminate()
+                p.join(config.CLUSTER_POLL_INTERVAL)
+        self._responses.put(None)
+        self._collector.join(timeout)
+
+    def __enter__(self) -> "EngineCluster":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _collect(self) -> None:
+        checked = time.monotonic()
+        while True:
+            try:
+                response = self._responses.get(timeout=config.CLUSTER_POLL_INTERVAL)
+            except queue.Empty:
+                response = ()
+            if response is None:
+                break
+            if response:
+                self._deliver(response)
+            if time.monotonic() - checked >= config.CLUSTER_POLL_INTERVAL:
+                checked = time.monotonic()
+                if not self._reap():
+                    break
+        # Stopped: every worker has exited, fail what they never answered
+        self._reap()
+        with self._lock:
+            lost = [future for future, _ in self._pending.values()]
+            self._pending.clear()
+        for future in lost:
+            future.set_exception(RuntimeError("Engine cluster stopped"))
+
+    def _deliver(self, response: tuple) -> None:
+        req_id, ok, result = response
+        with self._lock:
+            future, _ = self._pending.pop(req_id, (None, None))
+        if future is None:
+            return
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(RuntimeError(result))
+
+    def _reap(self) -> bool:
+        """
+        Fail the pending requests of workers that have exited.
+
+        Responses a worker sent before exiting are delivered first.  Returns
+        False if the stop sentinel was read meanwhile.
+        """
+        exited = [
+            i for i, p in enumerate(self._processes)
+            if p.exitcode is not None and i not in self._dead
+        ]
+        if not exited:
+            return True
+        running = True
+        while True:
+            try:
+                response = self._responses.get_nowait()
+            except queue.Empty:
+                break
+            if response is None:
+                running = False
+                break
+            self._deliver(response)
+        for i in exited:
+            code = self._processes[i].exitcode
+            with self._lock:
+                self._dead.add(i)
+                lost = [rid for rid, (_, part) in self._pending.items() if part == i]
+                futures = [self._pending.pop(rid)[0] for rid in lost]
+            if code != 0 or futures:
+                print(f"[EngineCluster] Partition {i} exited with code {code}; "
+                      f"failing {len(futures)} pending requests")
+            error = f"Partition {i} exited with code {code}"
+            for future in futures:
+                future.set_exception(RuntimeError(error))
+        return running
+
+    def owner(self, token: str) -> int:
+        return partition_for(token, self.workers)
+
+    def _submit(self, token: str, op: str, *args) -> Future:
+        future: Future = Future()
+        req_id = next(self._ids)
+        owner = self.owner(token)
+        with self._lock:
+            dead = owner in self._dead
+            if not dead:
+                self._pending[req_id] = (future, owner)
+        if dead:
+            future.set_exception(RuntimeError(f"Partition {owner} has exited"))
+        else:
+            self._requests[owner].put((req_id, op, (token, *args)))
+        return future
+
+    def process_tokens(self, tokens: list) -> list:
+        """Run ``SKGEngine.process_token`` for each token on its owner, in parallel."""
+        futures = [self._submit(token, "process") for token in tokens]
+        return [f.result() for f in futures]
+
+    def process_token(self, token: str) -> dict:
+        return self.process_tokens([token])[0]
+
+    def update_adjacency_map(self, token: str, adjacencies: list) -> dict:
+        """Merge ``adjacencies`` into the owner's map; returns the merged map."""
+        return self._submit(token, "adjacency", adjacencies).result()
+
+    def traverse_superknowledge(self, token: str, steps: int = 5) -> list:
+        return self._submit(token, "traverse", steps).result()
+
+    def think_batch(self, tokens: list, max_depth: int = 5) -> dict:
+        """
+        Run thought loops for ``tokens`` across the cluster.
+
+        Expansions that leave a partition are forwarded to their owner, and
+        the glyphs visited on all partitions are gathered per start token.
+        Each partition's run is kept in local depth-first order; runs are
+        ordered by the depth they start at, then by their position among
+        the expansions forwarded before them, whatever order workers finish in.
+        """
+        runs: dict[str, list] = {token: [] for token in tokens}
+        # future -> (start token, depth, slot path of the forwarded expansion)
+        pending = {
+            self._submit(token, "think", 0, max_depth, None): (token, 0, ())
+            for token in runs
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, depth, slot = pending.pop(future)
+                glyphs, forwarded, externalized = future.result()
+                runs[start].append(((depth, slot), glyphs))
+                for token, modality in externalized:
+                    self.on_externalize(token, modality)
+                for i, (token, next_depth, parent) in enumerate(forwarded):
+                    if next_depth < max_depth:
+                        request = self._submit(
+                            token, "think", next_depth, max_depth, parent
+                        )
+                        pending[request] = (start, next_depth, slot + (i,))
+        return {
+            start: [g for _, run in sorted(chunks, key=lambda c: c[0]) for g in run]
+            for start, chunks in runs.items()
+        }
+
+    def recursive_thought_loop(self, token: str, max_depth: int = 5) -> list:
+        return self.think_batch([token], max_depth)[token]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run tokens through a partitioned engine cluster")
+    parser.add_argument("tokens", nargs="+")
+    parser.add_argument("--workers", type=int, default=None, help="partitions (default: config.CLUSTER_WORKERS)")
+    parser.add_argument("--memory", default=None, help="partition memory root (default: config.CLUSTER_MEMORY_DIR)")
+    parser.add_argument("--depth", type=int, default=5, help="thought loop depth")
+    args = parser.parse_args()
+    with EngineCluster(args.workers, args.memory) as cluster:
+        start = time.perf_counter()
+        cluster.process_tokens(args.tokens)
+        loops = cluster.think_batch(args.tokens, args.depth)
+        elapsed = time.perf_counter() - start
+    for token, glyphs in loops.items():
+        print(f"[EngineCluster] {token} (partition {partition_for(token, cluster.workers)}): {len(glyphs)} glyphs")
+    print(f"[EngineCluster] {len(args.tokens)} tokens in {elapsed:.2f}s")
@@ -1,37 +1,780 @@
+"""Engine-to-engine message transports.
+
+An engine publishes the tokens it externalizes and other engines subscribe
+to them.  Three transports share one interface, selected by
+``config.ENGINE_TRANSPORT``:
+
+``file``
+    JSON lines appended to rotating segments under ``engine_stream/`` and
+    tailed by polling.  Durable and resumable through per-subscriber
+    offsets, but a hop can wait up to one poll interval.
+``socket``
+    Unix-domain-socket pub/sub.  The publisher listens on a socket path and
+    pushes each batch to every connected subscriber.
+``shm``
+    A single-producer single-consumer ring buffer in
+    ``multiprocessing.shared_memory``.  Lowest latency, one subscriber.
+
+``socket`` and ``shm`` batch queued messages into one send or one ring
+update.  When subscribers fall behind, ``publish`` blocks up to
+``config.COMM_PUBLISH_TIMEOUT`` seconds per batch, then drops the messages
+and counts them in ``dropped``; a socket subscriber that cannot take a
+batch within ``config.COMM_SEND_TIMEOUT`` is disconnected.  Both deliver
+only what is published while a subscriber is attached.
+
+Received messages reach the engine through an :class:`InboundQueue`, which
+deduplicates, rate limits and serializes them.
+
+``python engine_comm.py --transport shm`` measures publish-to-callback
+latency.
+"""
+
 import os
+import re
 import json
-import threading
 import time
-from typing import Optional
+import queue
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import config
+
+Callback = Callable[[dict], None]
+BatchCallback = Callable[[list[dict]], None]
+# Seconds between attempts to attach to a publisher that is not up yet
+_RETRY_INTERVAL = 0.05
 
 
 def write_message(stream_path: str, token: str, glyph: str) -> None:
-    """Append a token/glyph pair to the stream file as a JSON line."""
-    os.makedirs(os.path.dirname(stream_path), exist_ok=True)
-    with open(stream_path, "a", encoding="utf-8") as f:
-        f.write(json.dumps({"token": token, "glyph": glyph}) + "\n")
+    """Append a token/glyph pair to the segmented stream at ``stream_path``."""
+    FileTransport(stream_path).publish([{"token": token, "glyph": glyph}])
 
 
 def subscribe_to_stream(stream_path: str, callback, poll_interval: float = 1.0) -> threading.Thread:
-    """Watch a stream file and invoke callback(token) for each new entry."""
-    def monitor() -> None:
-        # Wait for file to exist
-        while not os.path.exists(stream_path):
-            time.sleep(poll_interval)
-        with open(stream_path, "r", encoding="utf-8") as f:
-            f.seek(0, os.SEEK_END)
-            while True:
+    """Watch a stream and invoke callback(token) for each new entry."""
+    return FileTransport(stream_path, poll_interval).subscribe(lambda msg: callback(msg["token"]))
+
+
+def _encode(messages: list[dict]) -> list[bytes]:
+    return [(json.dumps(m, ensure_ascii=False) + "\n").encode("utf-8") for m in messages]
+
+
+def _decode(lines: list[bytes]) -> list[dict]:
+    messages = []
+    for line in lines:
+        try:
+            data = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(data, dict) and data.get("token"):
+            messages.append(data)
+    return messages
+
+
+def _dispatch(messages: list[dict], callback: Callback | None, batch_callback: BatchCallback | None) -> None:
+    if not messages:
+        return
+    if batch_callback is not None:
+        batch_callback(messages)
+    else:
+        for msg in messages:
+            callback(msg)
+
+
+_SEGMENT_RE = re.compile(r"^(\d{20})\.jsonl$")
+
+
+class FileTransport:
+    """
+    Segmented, durable JSON lines log tailed by polling.
+
+    ``path`` is a directory of segment files named after the stream offset
+    (byte position) they start at.  The active segment is rotated once it
+    exceeds ``config.COMM_SEGMENT_BYTES`` and only the newest
+    ``config.COMM_SEGMENT_RETENTION`` segments are kept.
+
+    A named subscriber commits its offset under ``offsets/`` after each
+    delivered batch and resumes from there after a restart, so nothing
+    written while it was down is lost (delivery is at-least-once).  Backlog
+    is read ``config.COMM_REPLAY_BATCH`` messages at a time.  Unnamed
+    subscribers start at the end of the stream.
+
+    A ``path`` naming a single-file stream written by older versions is
+    followed as the only segment, with offsets committed beside it under
+    ``<path>.offsets/``, so subscribers keep working next to a publisher that
+    has not been upgraded.  The first publish from an upgraded publisher
+    migrates it in place: the directory takes its name and the file becomes
+    the first segment, keeping every offset valid.
+    """
+
+    # Delivered batches are committed and replayed after a restart
+    durable = True
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float | None = None,
+        segment_bytes: int | None = None,
+        retention: int | None = None,
+    ) -> None:
+        self.path = path
+        self.poll_interval = config.COMM_FILE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.segment_bytes = segment_bytes or config.COMM_SEGMENT_BYTES
+        self.retention = retention or config.COMM_SEGMENT_RETENTION
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _migrate_legacy_file(self) -> None:
+        """Turn a legacy single-file stream into a directory with one segment."""
+        tmp_path = self.path + ".legacy"
+        try:
+            os.replace(self.path, tmp_path)
+            os.makedirs(self.path)
+            os.replace(tmp_path, self._segment_path(0))
+        except OSError as e:
+            # Another process may have migrated it first
+            if not os.path.isdir(self.path):
+                raise NotADirectoryError(
+                    f"{self.path} is a legacy single-file engine stream and could not "
+                    f"be migrated to a segment directory: {e}"
+                ) from e
+            return
+        print(f"[EngineComm] Migrated legacy stream file {self.path} to segments")
+
+    def _segment_path(self, base: int) -> str:
+        if os.path.isfile(self.path):
+            return self.path
+        return os.path.join(self.path, f"{base:020d}.jsonl")
+
+    def segments(self) -> list[int]:
+        """Base offsets of the segments on disk, oldest first."""
+        if os.path.isfile(self.path):
+            return [0]
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT_RE.match, names) if m)
+
+    def end_offset(self) -> int:
+        bases = self.segments()
+        if not bases:
+            return 0
+        return bases[-1] + os.path.getsize(self._segment_path(bases[-1]))
+
+    def publish(self, messages: list[dict]) -> None:
+        data = b"".join(_encode(messages))
+        with self._lock:
+            if os.path.isfile(self.path):
+                self._migrate_legacy_file()
+            os.makedirs(self.path, exist_ok=True)
+            bases = self.segments()
+            base = bases[-1] if bases else 0
+            size = os.path.getsize(self._segment_path(base)) if bases else 0
+            if size >= self.segment_bytes:
+                base += size
+                bases.append(base)
+                for old in bases[:-self.retention]:
+                    os.remove(self._segment_path(old))
+            with open(self._segment_path(base), "ab") as f:
+                f.write(data)
+
+    def _offset_path(self, subscriber: str, legacy: bool | None = None) -> str:
+        if legacy is None:
+            legacy = os.path.isfile(self.path)
+        if legacy:
+            return os.path.join(f"{self.path}.offsets", f"{subscriber}.offset")
+        return os.path.join(self.path, "offsets", f"{subscriber}.offset")
+
+    def committed(self, subscriber: str) -> int | None:
+        """Return the offset ``subscriber`` last committed, if any."""
+        # Offsets committed before the legacy file was migrated still apply
+        for legacy in (False, True):
+            path = self._offset_path(subscriber, legacy)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return int(f.read().strip())
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def commit(self, subscriber: str, offset: int) -> None:
+        path = self._offset_path(subscriber)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, path)
+
+    def read(self, offset: int, max_messages: int | None = None) -> tuple[list[dict], int]:
+        """
+        Read up to ``max_messages`` from ``offset`` and return them with the
+        offset to continue from.  An offset older than the retained
+        segments skips ahead to the oldest one.
+        """
+        max_messages = max_messages or config.COMM_REPLAY_BATCH
+        bases = self.segments()
+        if not bases:
+            return [], offset
+        if offset < bases[0]:
+            print(f"[EngineComm] Offset {offset} is past retention; resuming at {bases[0]}")
+            offset = bases[0]
+        i = max(j for j, b in enumerate(bases) if b <= offset)
+        lines: list[bytes] = []
+        with open(self._segment_path(bases[i]), "rb") as f:
+            f.seek(offset - bases[i])
+            while len(lines) < max_messages:
                 line = f.readline()
-                if not line:
-                    time.sleep(poll_interval)
+                if not line.endswith(b"\n"):
+                    break  # end of segment or a line still being written
+                lines.append(line)
+                offset += len(line)
+            else:
+                return _decode(lines), offset
+            if not line and i + 1 < len(bases):
+                # This segment is complete; continue in the next one
+                offset = bases[i + 1]
+        return _decode(lines), offset
+
+    def subscribe(
+        self,
+        callback: Callback | None = None,
+        subscriber: str | None = None,
+        batch_callback: BatchCallback | None = None,
+    ) -> threading.Thread:
+        def follow() -> None:
+            offset = self.committed(subscriber) if subscriber else None
+            if offset is None:
+                # Wait for the stream to exist
+                while not self.segments() and not self._closed.is_set():
+                    time.sleep(self.poll_interval)
+                offset = self.end_offset()
+            while not self._closed.is_set():
+                messages, next_offset = self.read(offset)
+                if next_offset == offset:
+                    time.sleep(self.poll_interval)
+                    continue
+                _dispatch(messages, callback, batch_callback)
+                offset = next_offset
+                if subscriber:
+                    self.commit(subscriber, offset)
+
+        def monitor() -> None:
+            try:
+                follow()
+            except Exception as e:
+                print(f"[EngineComm] Stopped following {self.path}: {e}")
+
+        t = threading.Thread(target=monitor, name="comm-file", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return t
+
+    def close(self) -> None:
+        self._closed.set()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout=self.poll_interval + 1)
+
+
+class SocketTransport:
+    """
+    Unix-domain-socket pub/sub.
+
+    The publishing side listens on ``path`` as soon as it first publishes (or
+    :meth:`listen` is called).  A sender thread drains up to ``batch_size``
+    queued messages at a time and writes them to every subscriber with one
+    ``sendall``.  Subscribers reconnect if the publisher restarts.
+    """
+
+    def __init__(self, path: str, queue_size: int | None = None, batch_size: int | None = None) -> None:
+        self.path = path
+        self.batch_size = batch_size or config.COMM_BATCH_SIZE
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(queue_size or config.COMM_QUEUE_SIZE)
+        self._server: socket.socket | None = None
+        self._conns: list[socket.socket] = []
+        self._subscribers: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def listen(self) -> None:
+        with self._lock:
+            if self._server is not None:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self.path)
+            server.listen()
+            self._server = server
+        threading.Thread(target=self._accept, name="comm-socket-accept", daemon=True).start()
+        threading.Thread(target=self._send, name="comm-socket-send", daemon=True).start()
+
+    def _accept(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            # A subscriber that stops reading must not stall the sender
+            conn.settimeout(config.COMM_SEND_TIMEOUT)
+            with self._lock:
+                self._conns.append(conn)
+
+    def _send(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._closed.is_set():
+                return
+            payload = b"".join(batch)
+            with self._lock:
+                conns = list(self._conns)
+            for conn in conns:
+                try:
+                    conn.sendall(payload)
+                except OSError as e:
+                    print(f"[EngineComm] Dropping socket subscriber: {e}")
+                    with self._lock:
+                        self._conns.remove(conn)
+                    conn.close()
+
+    def publish(self, messages: list[dict]) -> None:
+        self.listen()
+        for data in _encode(messages):
+            try:
+                self._queue.put(data, timeout=config.COMM_PUBLISH_TIMEOUT)
+            except queue.Full:
+                self.dropped += 1
+
+    def subscribe(
+        self,
+        callback: Callback | None = None,
+        subscriber: str | None = None,
+        batch_callback: BatchCallback | None = None,
+    ) -> threading.Thread:
+        def monitor() -> None:
+            while not self._closed.is_set():
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(self.path)
+                except OSError:
+                    sock.close()
+                    time.sleep(_RETRY_INTERVAL)
                     continue
+                with self._lock:
+                    self._subscribers.append(sock)
+                pending = b""
                 try:
-                    data = json.loads(line.strip())
-                    token = data.get("token")
-                    if token:
-                        callback(token)
-                except json.JSONDecodeError:
+                    while chunk := sock.recv(65536):
+                        *lines, pending = (pending + chunk).split(b"\n")
+                        _dispatch(_decode(lines), callback, batch_callback)
+                except OSError:
+                    pass
+                finally:
+                    with self._lock:
+                        if sock in self._subscribers:
+                            self._subscribers.remove(sock)
+                    sock.close()
+
+        t = threading.Thread(target=monitor, name="comm-socket", daemon=True)
+        t.start()
+        return t
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            server, self._server = self._server, None
+            conns, self._conns = self._conns, []
+            conns += self._subscribers
+        if server is not None:
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            server.close()
+            try:
+                self._queue.put_nowait(b"")
+            except queue.Full:
+                pass
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+
+# Ring header: total bytes ever written (producer-owned), read
+# (consumer-owned) and whether a consumer is attached, each on its own
+# 8-byte word.
+_POS = struct.Struct("<Q")
+_LEN = struct.Struct("<I")
+_HEADER_SIZE = 24
+_ATTACHED = 16
+# Segments created by this process (and registered with its resource tracker)
+_created_segments: set[str] = set()
+
+
+class SharedMemoryTransport:
+    """
+    Single-producer single-consumer byte ring in shared memory.
+
+    Records are length-prefixed JSON.  The producer copies a whole batch into
+    the ring before advancing the write position once, and waits while the
+    ring lacks room for a record, for at most ``config.COMM_PUBLISH_TIMEOUT``
+    per batch.  With no consumer attached, or one that has not read anything
+    since it last made the producer time out, messages are dropped without
+    waiting.  The consumer spins briefly when the ring
+    is empty, then backs off to short sleeps, which keeps an idle subscriber
+    cheap while a busy one stays well under a millisecond behind.
+    """
+
+    def __init__(self, name: str, capacity: int | None = None) -> None:
+        self.name = name
+        self.capacity = capacity or config.COMM_SHM_BYTES
+        self.dropped = 0
+        self._shm = None
+        self._owner = False
+        self._write = 0
+        # Consumer read position when the producer last timed out on it
+        self._stalled_at: int | None = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def _attach(self, create: bool):
+        from multiprocessing import shared_memory
+
+        if create:
+            try:
+                shm = shared_memory.SharedMemory(self.name, create=True, size=_HEADER_SIZE + self.capacity)
+            except FileExistsError:
+                # Left over from a previous run of this publisher
+                shm = shared_memory.SharedMemory(self.name)
+            shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            self._owner = True
+            _created_segments.add(self.name)
+            return shm
+        shm = shared_memory.SharedMemory(self.name)
+        if self.name in _created_segments:
+            return shm
+        try:
+            # Only the creator may unlink the segment; stop the resource
+            # tracker from removing it when this process exits.
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+    def _copy_in(self, pos: int, data: bytes) -> None:
+        start = _HEADER_SIZE + pos % self.capacity
+        first = min(len(data), _HEADER_SIZE + self.capacity - start)
+        self._shm.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self._shm.buf[_HEADER_SIZE:_HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _copy_out(self, shm, pos: int, n: int) -> bytes:
+        start = _HEADER_SIZE + pos % self.capacity
+        first = min(n, _HEADER_SIZE + self.capacity - start)
+        data = bytes(shm.buf[start:start + first])
+        if first < n:
+            data += bytes(shm.buf[_HEADER_SIZE:_HEADER_SIZE + n - first])
+        return data
+
+    def _wait_for_room(self, n: int, deadline: float) -> bool:
+        read = _POS.unpack_from(self._shm.buf, 8)[0]
+        if self._write + n - read <= self.capacity:
+            return True
+        if read == self._stalled_at:
+            return False  # no progress since the consumer last stalled us
+        while self._write + n - read > self.capacity:
+            if time.monotonic() > deadline:
+                self._stalled_at = read
+                return False
+            # Expose what is already written so the consumer can make room
+            _POS.pack_into(self._shm.buf, 0, self._write)
+            time.sleep(0.0001)
+            read = _POS.unpack_from(self._shm.buf, 8)[0]
+        self._stalled_at = None
+        return True
+
+    def publish(self, messages: list[dict]) -> None:
+        with self._lock:
+            if self._shm is None:
+                self._shm = self._attach(create=True)
+            if not _POS.unpack_from(self._shm.buf, _ATTACHED)[0]:
+                self.dropped += len(messages)
+                return
+            deadline = time.monotonic() + config.COMM_PUBLISH_TIMEOUT
+            for data in _encode(messages):
+                record = _LEN.pack(len(data)) + data
+                if len(record) > self.capacity or not self._wait_for_room(
+                    len(record), deadline
+                ):
+                    self.dropped += 1
+                    continue
+                self._copy_in(self._write, record)
+                self._write += len(record)
+            _POS.pack_into(self._shm.buf, 0, self._write)
+
+    def subscribe(
+        self,
+        callback: Callback | None = None,
+        subscriber: str | None = None,
+        batch_callback: BatchCallback | None = None,
+    ) -> threading.Thread:
+        def monitor() -> None:
+            shm = None
+            while shm is None and not self._closed.is_set():
+                try:
+                    shm = self._attach(create=False)
+                except FileNotFoundError:
+                    time.sleep(_RETRY_INTERVAL)
+            idle = 0
+            read = _POS.unpack_from(shm.buf, 8)[0]
+            while not self._closed.is_set():
+                if not _POS.unpack_from(shm.buf, _ATTACHED)[0]:
+                    # Announce ourselves (again, if the publisher restarted)
+                    _POS.pack_into(shm.buf, _ATTACHED, 1)
+                write = _POS.unpack_from(shm.buf, 0)[0]
+                if write < read:
+                    # The publisher restarted and reset the ring
+                    read = write
+                if write == read:
+                    idle += 1
+                    time.sleep(0 if idle < 1000 else 0.0002 if idle < 10000 else 0.005)
+                    continue
+                idle = 0
+                lines = []
+                while read < write:
+                    (n,) = _LEN.unpack(self._copy_out(shm, read, _LEN.size))
+                    lines.append(self._copy_out(shm, read + _LEN.size, n))
+                    read += _LEN.size + n
+                _POS.pack_into(shm.buf, 8, read)
+                _dispatch(_decode(lines), callback, batch_callback)
+            _POS.pack_into(shm.buf, _ATTACHED, 0)
+            shm.close()
+
+        t = threading.Thread(target=monitor, name="comm-shm", daemon=True)
+        t.start()
+        return t
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            if self._shm is not None:
+                self._shm.close()
+                if self._owner:
+                    self._shm.unlink()
+                    _created_segments.discard(self.name)
+                self._shm = None
+
+
+class InboundQueue:
+    """
+    Bounded queue between stream subscriptions and the engine.
+
+    Transport threads :meth:`offer` received messages and return at once.
+    A single consumer thread drains them in batches into ``handler``
+    (``SKGEngine.think_batch``), so received tokens are processed serially.
+    Messages are dropped, and counted in :meth:`metrics`, when:
+
+    * the token was already accepted within the last ``dedup_ttl`` seconds,
+      which stops two engines echoing a thought back and forth;
+    * its source engine exceeds ``rate`` messages per second (token bucket
+      of ``burst``);
+    * the queue already holds ``maxsize`` tokens.
+
+    Durable transports offer with ``lossless``: only duplicates are dropped,
+    a full queue blocks the transport and the call returns once the tokens
+    have been handled, so the transport commits only processed offsets.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[str]], object],
+        maxsize: int | None = None,
+        dedup_ttl: float | None = None,
+        rate: float | None = None,
+        burst: int | None = None,
+        batch_size: int | None = None,
+    ) -> None:
+        self.handler = handler
+        self.dedup_ttl = config.COMM_DEDUP_TTL if dedup_ttl is None else dedup_ttl
+        self.rate = rate or config.COMM_RATE_PER_SOURCE
+        self.burst = burst or config.COMM_RATE_BURST
+        self.batch_size = batch_size or config.COMM_BATCH_SIZE
+        self._queue: queue.Queue = queue.Queue(maxsize or config.COMM_INBOUND_QUEUE_SIZE)
+        self._seen: OrderedDict[str, float] = OrderedDict()
+        self._buckets: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ("received", "processed", "duplicate", "rate_limited", "overflow", "max_depth"), 0
+        )
+        self._thread = threading.Thread(target=self._run, name="comm-inbound", daemon=True)
+        self._thread.start()
+
+    def _allow(self, source: str, now: float) -> bool:
+        tokens, last = self._buckets.get(source, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[source] = [tokens - 1 if allowed else tokens, now]
+        return allowed
+
+    def offer(
+        self, messages: list[dict], source: str = "", lossless: bool = False
+    ) -> int:
+        """
+        Queue the tokens of ``messages``; returns how many were accepted.
+
+        With ``lossless`` the rate limit is skipped, a full queue is waited
+        on rather than dropped and the call blocks until the accepted tokens
+        have been handled.
+        """
+        accepted: list[str] = []
+        now = time.monotonic()
+        with self._lock:
+            while self._seen and next(iter(self._seen.values())) < now - self.dedup_ttl:
+                self._seen.popitem(last=False)
+            for msg in messages:
+                token = msg["token"]
+                self._counts["received"] += 1
+                if token in self._seen:
+                    self._counts["duplicate"] += 1
                     continue
-    t = threading.Thread(target=monitor, daemon=True)
-    t.start()
-    return t
+                if not lossless:
+                    if not self._allow(msg.get("source") or source, now):
+                        self._counts["rate_limited"] += 1
+                        continue
+                    try:
+                        self._queue.put_nowait((token, None))
+                    except queue.Full:
+                        self._counts["overflow"] += 1
+                        continue
+                self._seen[token] = now
+                accepted.append(token)
+            self._record_depth()
+        if lossless and accepted:
+            handled = threading.Event()
+            for i, token in enumerate(accepted):
+                # The consumer is FIFO: the last token done means all are
+                self._queue.put((token, handled if i == len(accepted) - 1 else None))
+                with self._lock:
+                    self._record_depth()
+            handled.wait()
+        return len(accepted)
+
+    def _record_depth(self) -> None:
+        self._counts["max_depth"] = max(self._counts["max_depth"], self._queue.qsize())
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.handler([token for token, _ in batch])
+            except Exception as e:
+                print(f"[EngineComm] Error handling inbound tokens: {e}")
+            with self._lock:
+                self._counts["processed"] += len(batch)
+            for _, handled in batch:
+                if handled is not None:
+                    handled.set()
+                self._queue.task_done()
+
+    def join(self) -> None:
+        """Block until every accepted token has been handled."""
+        self._queue.join()
+
+    def metrics(self) -> dict:
+        """Current queue depth plus received/processed/dropped counters."""
+        with self._lock:
+            return {"depth": self._queue.qsize(), **self._counts}
+
+
+TRANSPORTS = {"file": FileTransport, "socket": SocketTransport, "shm": SharedMemoryTransport}
+
+
+def stream_address(memory_path: str, kind: str | None = None) -> str:
+    """Return where an engine persisted in ``memory_path`` publishes."""
+    kind = kind or config.ENGINE_TRANSPORT
+    if kind == "socket":
+        return os.path.join(memory_path, "engine_stream.sock")
+    if kind == "shm":
+        return "skg_" + hashlib.sha1(os.path.abspath(memory_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(memory_path, "engine_stream.jsonl")
+
+
+def open_transport(address: str, kind: Optional[str] = None):
+    """Return the ``kind`` transport (``config.ENGINE_TRANSPORT``) for ``address``."""
+    kind = kind or config.ENGINE_TRANSPORT
+    if kind not in TRANSPORTS:
+        raise ValueError(f"Unknown engine transport '{kind}'")
+    return TRANSPORTS[kind](address)
+
+
+def measure_latency(kind: str, address: str, count: int = 1000, interval: float = 0.0005) -> list[float]:
+    """Publish ``count`` messages and return their delivery latencies in seconds."""
+    publisher = open_transport(address, kind)
+    subscriber = open_transport(address, kind)
+    latencies: list[float] = []
+    done = threading.Event()
+
+    def received(msg: dict) -> None:
+        latencies.append(time.perf_counter() - msg["ts"])
+        if len(latencies) >= count:
+            done.set()
+
+    if kind == "socket":
+        publisher.listen()
+    subscriber.subscribe(received)
+    # Publish until the subscriber is attached, then start measuring
+    while not latencies:
+        publisher.publish([{"token": "warmup", "ts": time.perf_counter()}])
+        time.sleep(0.01)
+    latencies.clear()
+    for i in range(count):
+        publisher.publish([{"token": f"t{i}", "ts": time.perf_counter()}])
+        time.sleep(interval)
+    done.wait(timeout=10)
+    subscriber.close()
+    publisher.close()
+    return latencies
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Measure engine transport latency")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="shm")
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        latencies = np.array(measure_latency(args.transport, stream_address(tmp, args.transport), args.count)) * 1e6
+    print(
+        f"[EngineComm] {args.transport}: {len(latencies)} messages, "
+        f"p50 {np.percentile(latencies, 50):.0f}us, p99 {np.percentile(latencies, 99):.0f}us"
+    )
@@ -1,14 +1,163 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import scipy.io.wavfile as wav
-import os
+from PIL import Image, ImageDraw, ImageFont
 
 
-def generate_fft_from_audio(audio_path: str, fft_data_path: str, fft_image_path: str) -> None:
+# Spectrum image layout in pixels (matches the former 12x4 inch figure)
+SPECTRUM_WIDTH = 1200
+SPECTRUM_HEIGHT = 400
+_MARGIN_LEFT, _MARGIN_RIGHT, _MARGIN_TOP, _MARGIN_BOTTOM = 60, 15, 25, 30
+_LINE_COLOR = (31, 119, 180)
+_AXIS_COLOR = (0, 0, 0)
+_GRID_COLOR = (220, 220, 220)
+
+
+def _column_envelope(values: np.ndarray, columns: int) -> tuple[np.ndarray, np.ndarray]:
+    """Reduce ``values`` to per-pixel-column ``(min, max)`` envelopes."""
+    n = len(values)
+    if n >= columns:
+        starts = np.linspace(0, n, columns + 1).astype(np.intp)[:-1]
+        lo = np.minimum.reduceat(values, starts)
+        hi = np.maximum.reduceat(values, starts)
+    else:
+        idx = np.arange(columns) * n // columns
+        lo = hi = values[idx]
+    # Join neighboring columns so the trace reads as a continuous line
+    prev_lo = np.concatenate(([lo[0]], lo[:-1]))
+    prev_hi = np.concatenate(([hi[0]], hi[:-1]))
+    return np.minimum(lo, prev_hi), np.maximum(hi, prev_lo)
+
+
+def render_spectrum_image(
+    magnitude: np.ndarray,
+    max_freq: float,
+    image_path: str,
+    width: int = SPECTRUM_WIDTH,
+    height: int = SPECTRUM_HEIGHT,
+    title: str = "FFT Spectrum",
+) -> None:
+    """
+    Rasterize a half spectrum directly with NumPy and Pillow.
+
+    ``magnitude`` holds the bins from 0 Hz to ``max_freq``.  Each pixel column
+    shows the min/max envelope of the bins that fall into it, so the cost is
+    one pass over the data plus a fixed-size image, independent of how many
+    bins the spectrum has.
+    """
+    plot_w = width - _MARGIN_LEFT - _MARGIN_RIGHT
+    plot_h = height - _MARGIN_TOP - _MARGIN_BOTTOM
+    values = np.asarray(magnitude, dtype=np.float32)
+    lo, hi = _column_envelope(values, plot_w)
+    peak = float(hi.max()) if hi.size and hi.max() > 0 else 1.0
+    scale = (plot_h - 1) / peak
+    bottom = _MARGIN_TOP + plot_h - 1
+    top_px = bottom - (hi * scale).astype(np.intp)
+    low_px = bottom - (lo * scale).astype(np.intp)
+
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    # Light grid every quarter of the plot
+    for frac in (0.25, 0.5, 0.75):
+        canvas[_MARGIN_TOP + int(plot_h * frac), _MARGIN_LEFT:_MARGIN_LEFT + plot_w] = _GRID_COLOR
+        canvas[_MARGIN_TOP:_MARGIN_TOP + plot_h, _MARGIN_LEFT + int(plot_w * frac)] = _GRID_COLOR
+    rows = np.arange(_MARGIN_TOP, _MARGIN_TOP + plot_h)[:, None]
+    mask = (rows >= top_px[None, :]) & (rows <= low_px[None, :])
+    region = canvas[_MARGIN_TOP:_MARGIN_TOP + plot_h, _MARGIN_LEFT:_MARGIN_LEFT + plot_w]
+    region[mask] = _LINE_COLOR
+
+    img = Image.fromarray(canvas, mode="RGB")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    draw.rectangle(
+        [_MARGIN_LEFT - 1, _MARGIN_TOP - 1, _MARGIN_LEFT + plot_w, _MARGIN_TOP + plot_h],
+        outline=_AXIS_COLOR,
+    )
+    for frac in (0.0, 0.25, 0.5, 0.75, 1.0):
+        label = f"{max_freq * frac:.0f}"
+        label_w = draw.textlength(label, font=font)
+        x = _MARGIN_LEFT + int((plot_w - 1) * frac) - label_w / 2
+        x = min(max(x, 0), width - label_w - 1)
+        draw.text((x, _MARGIN_TOP + plot_h + 4), label, fill=_AXIS_COLOR, font=font)
+    draw.text((2, _MARGIN_TOP), f"{peak:.3g}", fill=_AXIS_COLOR, font=font)
+    draw.text((2, _MARGIN_TOP + plot_h - 10), "0", fill=_AXIS_COLOR, font=font)
+    draw.text((width // 2 - 30, 5), title, fill=_AXIS_COLOR, font=font)
+    draw.text((_MARGIN_LEFT + plot_w // 2 - 40, height - 12), "Frequency (Hz)", fill=_AXIS_COLOR, font=font)
+    # Fast PNG compression: encoding otherwise dominates the render time
+    img.save(image_path, compress_level=1)
+
+
+def save_audio_spectrum(
+    path: str,
+    magnitude: np.ndarray,
+    rate: int,
+    n_samples: int,
+    dtype: str = "float32",
+    log_scale: bool = False,
+) -> None:
+    """
+    Store a half spectrum with its metadata.
+
+    The file is a compressed ``.npz`` archive, whatever ``path``'s extension,
+    holding ``magnitude`` (optionally ``log1p``-scaled and cast to ``dtype``)
+    plus ``sample_rate``, ``bin_hz``, ``n_samples`` and ``log_scale``.
+    Magnitudes of 16-bit PCM audio overflow float16, so ``float16`` storage
+    is always log-scaled.
+    """
+    if np.dtype(dtype) == np.float16:
+        log_scale = True
+    stored = np.log1p(magnitude) if log_scale else magnitude
+    stored = stored.astype(dtype)
+    # A file object keeps numpy from appending ".npz" to other extensions
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            magnitude=stored,
+            sample_rate=np.int64(rate),
+            bin_hz=np.float64(rate / n_samples),
+            n_samples=np.int64(n_samples),
+            log_scale=np.bool_(log_scale),
+        )
+
+
+def load_audio_spectrum(path: str) -> tuple[np.ndarray, dict]:
+    """
+    Load a stored audio spectrum as linear float32 magnitudes.
+
+    Returns ``(magnitude, meta)``; ``meta`` holds ``sample_rate``, ``bin_hz``
+    and ``n_samples`` for archives written by :func:`save_audio_spectrum`.
+    Legacy bare ``.npy`` arrays, which hold the full symmetric spectrum, are
+    reduced to their first half.
+    """
+    data = np.load(path)
+    if not isinstance(data, np.lib.npyio.NpzFile):
+        magnitude = data.astype(np.float32)
+        return magnitude[: len(magnitude) // 2], {}
+    with data:
+        magnitude = data["magnitude"].astype(np.float32)
+        if bool(data["log_scale"]):
+            magnitude = np.expm1(magnitude)
+        meta = {
+            "sample_rate": int(data["sample_rate"]),
+            "bin_hz": float(data["bin_hz"]),
+            "n_samples": int(data["n_samples"]),
+        }
+    return magnitude, meta
+
+
+def generate_fft_from_audio(
+    audio_path: str,
+    fft_data_path: str,
+    fft_image_path: str,
+    dtype: str = "float32",
+    log_scale: bool = False,
+) -> None:
     """
     Compute the FFT spectrum of an audio file and save both the raw data and a
     plotted image.  Any errors during processing are printed and silently
     ignored.
+
+    The signal is transformed with a real FFT in float32 and only the
+    non-negative half of the spectrum is kept; see
+    :func:`save_audio_spectrum` for the storage format.
     """
     try:
         print(f"[FFT] Processing FFT from audio: {audio_path}")
@@ -16,22 +165,95 @@ def generate_fft_from_audio(audio_path: str, fft_data_path: str, fft_image_path:
         # If stereo, reduce to mono
         if len(data.shape) == 2:
             data = data.mean(axis=1)
-        # Compute FFT
-        fft_spectrum = np.fft.fft(data)
-        freq = np.fft.fftfreq(len(fft_spectrum), d=1 / rate)
-        magnitude = np.abs(fft_spectrum)
-        # Save raw FFT data
-        np.save(fft_data_path, magnitude)
-        # Plot FFT spectrum
-        plt.figure(figsize=(12, 4))
-        plt.plot(freq[: len(freq) // 2], magnitude[: len(magnitude) // 2])
-        plt.title("FFT Spectrum")
-        plt.xlabel("Frequency (Hz)")
-        plt.ylabel("Magnitude")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(fft_image_path)
-        plt.close()
+        data = data.astype(np.float32, copy=False)
+        # Real FFT: the negative-frequency half is redundant for real input
+        magnitude = np.abs(np.fft.rfft(data)).astype(np.float32, copy=False)
+        save_audio_spectrum(fft_data_path, magnitude, rate, len(data), dtype, log_scale)
+        render_spectrum_image(magnitude, rate / 2, fft_image_path)
         print(f"[FFT] FFT image saved to: {fft_image_path}")
     except Exception as e:
-        print(f"[FFT] Error processing FFT from {audio_path}: {e}")
\ No newline at end of file
+        print(f"[FFT] Error processing FFT from {audio_path}: {e}")
+
+
+def _read_wav_mmap(audio_path: str) -> tuple[int, np.ndarray]:
+    """Open a WAV file memory-mapped, falling back to a full read."""
+    try:
+        return wav.read(audio_path, mmap=True)
+    except ValueError:
+        # Formats scipy cannot map (e.g. 24-bit PCM) are read into memory
+        return wav.read(audio_path)
+
+
+def generate_stft_from_audio(
+    audio_path: str,
+    spectrogram_path: str,
+    image_path: str | None = None,
+    frame_size: int = 1024,
+    hop: int | None = None,
+    batch_frames: int = 512,
+    image_width: int = SPECTRUM_WIDTH,
+    image_height: int = SPECTRUM_HEIGHT,
+) -> tuple[int, int] | None:
+    """
+    Compute a short-time Fourier transform of a WAV file in constant memory.
+
+    The audio is memory-mapped and processed ``batch_frames`` Hann-windowed
+    frames at a time.  Magnitudes are written incrementally to a float32
+    ``.npy`` memmap of shape ``(frames, frame_size // 2 + 1)`` at
+    ``spectrogram_path``.  If ``image_path`` is given, a fixed-size
+    spectrogram image (time left to right, low frequencies at the bottom) is
+    accumulated alongside and saved at the end.
+
+    Returns the spectrogram shape, or ``None`` if processing failed.
+    """
+    try:
+        print(f"[FFT] Processing STFT from audio: {audio_path}")
+        rate, data = _read_wav_mmap(audio_path)
+        hop = hop or frame_size // 2
+        n_samples = data.shape[0]
+        n_frames = 1 + max(0, n_samples - frame_size) // hop
+        bins = frame_size // 2 + 1
+        spectrogram = np.lib.format.open_memmap(
+            spectrogram_path, mode="w+", dtype=np.float32, shape=(n_frames, bins)
+        )
+        window = np.hanning(frame_size).astype(np.float32)
+        width = min(image_width, n_frames)
+        image_acc = np.zeros((width, image_height), dtype=np.float32)
+        if bins >= image_height:
+            row_starts = np.linspace(0, bins, image_height + 1).astype(np.intp)[:-1]
+        else:
+            row_starts = np.arange(image_height) * bins // image_height
+
+        for start in range(0, n_frames, batch_frames):
+            stop = min(n_frames, start + batch_frames)
+            chunk = np.asarray(data[start * hop:(stop - 1) * hop + frame_size])
+            if chunk.ndim == 2:
+                chunk = chunk.mean(axis=1)
+            chunk = chunk.astype(np.float32, copy=False)
+            if len(chunk) < frame_size:
+                chunk = np.pad(chunk, (0, frame_size - len(chunk)))
+            frames = np.lib.stride_tricks.sliding_window_view(chunk, frame_size)[::hop]
+            magnitude = np.abs(np.fft.rfft(frames[: stop - start] * window, axis=1))
+            spectrogram[start:stop] = magnitude
+            if image_path:
+                if bins >= image_height:
+                    binned = np.maximum.reduceat(np.log1p(magnitude), row_starts, axis=1)
+                else:
+                    binned = np.log1p(magnitude)[:, row_starts]
+                columns = np.arange(start, stop) * width // n_frames
+                np.maximum.at(image_acc, columns, binned.astype(np.float32))
+        spectrogram.flush()
+        del spectrogram
+
+        if image_path:
+            peak = float(image_acc.max()) or 1.0
+            pixels = (255 - image_acc.T[::-1] / peak * 255).astype(np.uint8)
+            img = Image.fromarray(pixels, mode="L")
+            if width != image_width:
+                img = img.resize((image_width, image_height), Image.Resampling.NEAREST)
+            img.save(image_path, compress_level=1)
+            print(f"[FFT] Spectrogram image saved to: {image_path}")
+        return n_frames, bins
+    except Exception as e:
+        print(f"[FFT] Error processing STFT from {audio_path}: {e}")
+        return None
@@ -0,0 +1,56 @@
+"""Advisory file locks shared by every process writing to a glyph directory.
+
+Several on-disk structures (the glyph manifest journal, the artifact cache
+index, the spectral index) are appended to and rewritten by the GUI, the
+background job queue and engine cluster workers at the same time.
+:class:`FileLock` serializes those writers with ``flock`` on a sidecar
+``.lock`` file.  On platforms without :mod:`fcntl` it only serializes
+threads of the current process.
+"""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+
+class FileLock:
+    """
+    Exclusive lock on ``path`` across processes and threads.
+
+    The lock is reentrant within a thread, so a method holding it may call
+    another that takes it again.  Use it as a context manager.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def __enter__(self) -> "FileLock":
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
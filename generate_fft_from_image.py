@@ -1,7 +1,60 @@
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable
+
 import numpy as np
 from PIL import Image
 
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+
+
+@lru_cache(maxsize=32)
+def _fade_mask(shape: tuple[int, int]) -> np.ndarray:
+    """Radial fade from 1 at the spectrum centre to 0 at the corners."""
+    center = (shape[0] // 2, shape[1] // 2)
+    y, x = np.ogrid[: shape[0], : shape[1]]
+    distance = np.sqrt((x - center[1]) ** 2 + (y - center[0]) ** 2)
+    fade = 1 - (distance / np.max(distance))
+    fade.setflags(write=False)
+    return fade
+
+
+def _load_grayscale(image_path: str, max_dim: int) -> np.ndarray:
+    """Load an image as grayscale, scaled so its longer side is ``max_dim``."""
+    img = Image.open(image_path).convert("L")
+    width, height = img.size
+    scale = min(max_dim / width, max_dim / height)
+    new_width, new_height = int(width * scale), int(height * scale)
+    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    return np.array(img)
+
+
+def _fft_images(stack: np.ndarray) -> list[np.ndarray | None]:
+    """
+    FFT a ``(n, h, w)`` stack of same-shaped images in one ``fft2`` call and
+    return the faded, inverted uint8 magnitude image for each (``None`` for
+    images whose spectrum is all zero).
+    """
+    fft = np.fft.fftshift(np.fft.fft2(stack, axes=(-2, -1)), axes=(-2, -1))
+    magnitude = np.log1p(np.abs(fft))
+    fade = _fade_mask(stack.shape[1:])
+    results: list[np.ndarray | None] = []
+    for mag in magnitude:
+        peak = np.max(mag)
+        if peak == 0:
+            results.append(None)
+            continue
+        mag = 255 - (mag / peak * 255).astype(np.uint8)
+        results.append((mag * fade).astype(np.uint8))
+    return results
+
+
+def _output_path(image_path: str, output_dir: str) -> str:
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    return os.path.join(output_dir, f"{base_name}_fft_spark.png")
+
 
 def generate_fft_from_image(image_path: str, output_dir: str = "modalities/fft_visual", max_dim: int = 512) -> str | None:
     """
@@ -15,31 +68,102 @@ def generate_fft_from_image(image_path: str, output_dir: str = "modalities/fft_v
         print(f"[FFT] Image not found: {image_path}")
         return None
     try:
-        img = Image.open(image_path).convert("L")
-        width, height = img.size
-        scale = min(max_dim / width, max_dim / height)
-        new_width, new_height = int(width * scale), int(height * scale)
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        arr = np.array(img)
-        fft = np.fft.fftshift(np.fft.fft2(arr))
-        magnitude = np.abs(fft)
-        magnitude = np.log1p(magnitude)
-        if np.max(magnitude) == 0:
+        arr = _load_grayscale(image_path, max_dim)
+        magnitude = _fft_images(arr[np.newaxis])[0]
+        if magnitude is None:
             print("[FFT] Warning: zero magnitude in FFT result")
             return None
-        magnitude = (magnitude / np.max(magnitude) * 255).astype(np.uint8)
-        magnitude = 255 - magnitude
-        center = (magnitude.shape[0] // 2, magnitude.shape[1] // 2)
-        y, x = np.ogrid[: magnitude.shape[0], : magnitude.shape[1]]
-        distance = np.sqrt((x - center[1]) ** 2 + (y - center[0]) ** 2)
-        fade = 1 - (distance / np.max(distance))
-        magnitude = (magnitude * fade).astype(np.uint8)
-        base_name = os.path.splitext(os.path.basename(image_path))[0]
-        fft_filename = f"{base_name}_fft_spark.png"
-        fft_output_path = os.path.join(output_dir, fft_filename)
+        fft_output_path = _output_path(image_path, output_dir)
         Image.fromarray(magnitude, mode="L").save(fft_output_path)
         print(f"[FFT] FFT image saved to: {fft_output_path}")
         return fft_output_path
     except Exception as e:
         print(f"[FFT] Error generating FFT from image: {e}")
         return None
+
+
+def _fft_batch(image_paths: list[str], output_dir: str, max_dim: int) -> dict[str, str | None]:
+    """Load ``image_paths``, FFT them grouped by shape and save the results."""
+    results: dict[str, str | None] = {}
+    groups: dict[tuple[int, int], list[tuple[str, np.ndarray]]] = {}
+    for path in image_paths:
+        try:
+            arr = _load_grayscale(path, max_dim)
+        except Exception as e:
+            print(f"[FFT] Error loading image {path}: {e}")
+            results[path] = None
+            continue
+        groups.setdefault(arr.shape, []).append((path, arr))
+    for items in groups.values():
+        stack = np.stack([arr for _, arr in items])
+        for (path, _), magnitude in zip(items, _fft_images(stack)):
+            if magnitude is None:
+                results[path] = None
+                continue
+            out = _output_path(path, output_dir)
+            try:
+                Image.fromarray(magnitude, mode="L").save(out)
+                results[path] = out
+            except Exception as e:
+                print(f"[FFT] Error saving FFT for {path}: {e}")
+                results[path] = None
+    return results
+
+
+def generate_fft_from_images(
+    image_paths: Iterable[str],
+    output_dir: str = "modalities/fft_visual",
+    max_dim: int = 512,
+    workers: int = 1,
+    batch_size: int = 32,
+) -> dict[str, str | None]:
+    """
+    Generate FFT images for many files.
+
+    Images are split into batches of ``batch_size`` that are processed in
+    ``workers`` processes.  Within a batch, images that resize to the same
+    shape are stacked and transformed with a single ``fft2`` call, and the
+    fade mask is computed once per shape.  Returns a mapping from each input
+    path to its FFT image path (``None`` on failure).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [p for p in image_paths if os.path.exists(p)]
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    results: dict[str, str | None] = {}
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fft_batch, b, output_dir, max_dim) for b in batches]
+            for fut in futures:
+                results.update(fut.result())
+    else:
+        for batch in batches:
+            results.update(_fft_batch(batch, output_dir, max_dim))
+    done = sum(1 for v in results.values() if v)
+    print(f"[FFT] Generated {done}/{len(paths)} image FFTs into {output_dir}")
+    return results
+
+
+def list_images(directory: str) -> list[str]:
+    """Return the image files directly inside ``directory``, sorted."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate FFT images for a directory of images")
+    parser.add_argument("directory", help="Directory containing sigils, webcam frames or photos")
+    parser.add_argument("--out", default="modalities/fft_visual", help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--max-dim", type=int, default=512, help="Longest side after resizing")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per worker batch")
+    args = parser.parse_args()
+    generate_fft_from_images(
+        list_images(args.directory),
+        output_dir=args.out,
+        max_dim=args.max_dim,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
@@ -0,0 +1,231 @@
+"""Pre-rendered sprite sheets for the glyph pool.
+
+Every glyph in ``glossary/extended_glyph_pool.json`` is rasterized once per
+size in ``config.GLYPH_ATLAS_SIZES``.  Its ink is cropped and shelf-packed
+into one grayscale sheet per size, stored as a memory-mapped ``.npy`` file.
+The atlas index records the glyph order in ``atlas_index.json`` and the
+bounding boxes in ``atlas_bboxes.npy``.  Each box is
+``(sheet_x, sheet_y, w, h, offset_x, offset_y)``, where the offset places
+the sprite in a ``size`` square.  Drawing a glyph is then an array copy
+instead of a TrueType rasterization.  New pool glyphs are appended to the
+existing sheets.
+"""
+
+import os
+import json
+import argparse
+import threading
+from typing import Iterable
+
+import numpy as np
+from PIL import Image
+
+import config
+import glyph_visualizer
+
+INDEX_VERSION = 1
+# Sheet width in cells of the atlas size; sheets grow downward
+SHEET_COLUMNS = 8
+
+
+class GlyphAtlas:
+    """
+    Sprite sheets of rendered glyphs in several sizes.
+
+    Parameters
+    ----------
+    directory : str | None
+        Where the sheets and index live (``config.GLYPH_ATLAS_DIR``).
+    sizes : Iterable[int] | None
+        Square sizes to pre-render (``config.GLYPH_ATLAS_SIZES``).
+    font_path : str | None
+        Font to render with; defaults to the visualizer's Symbola font.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        sizes: Iterable[int] | None = None,
+        font_path: str | None = None,
+    ) -> None:
+        self.directory = directory or config.GLYPH_ATLAS_DIR
+        self.sizes = tuple(sorted(sizes or config.GLYPH_ATLAS_SIZES))
+        self.font_path = font_path or glyph_visualizer.DEFAULT_FONT_PATH
+        self.index_path = os.path.join(self.directory, "atlas_index.json")
+        self.boxes_path = os.path.join(self.directory, "atlas_bboxes.npy")
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.glyphs: list[str] = []
+        self.slots: dict[str, int] = {}
+        self.boxes = np.zeros((len(self.sizes), 0, 6), dtype=np.int32)
+        self.cursors = {size: [0, 0, 0] for size in self.sizes}
+        self.sheets: dict[int, np.ndarray] = {}
+
+    def sheet_path(self, size: int) -> str:
+        return os.path.join(self.directory, f"sheet_{size}.npy")
+
+    def _signature(self) -> dict:
+        return {
+            "font": os.path.basename(self.font_path),
+            "image_size": glyph_visualizer.GLYPH_IMAGE_SIZE,
+            "font_size": glyph_visualizer.GLYPH_FONT_SIZE,
+            "sizes": list(self.sizes),
+        }
+
+    def _load(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != INDEX_VERSION or index.get("signature") != self._signature():
+                print("[GlyphAtlas] Atlas was built with other settings; it will be rebuilt")
+                return
+            self.boxes = np.load(self.boxes_path)
+            self.sheets = {s: np.load(self.sheet_path(s), mmap_mode="r") for s in self.sizes}
+            self.cursors = {int(s): c for s, c in index["cursors"].items()}
+            self.glyphs = index["glyphs"]
+            self.slots = {g: i for i, g in enumerate(self.glyphs)}
+        except Exception as e:
+            print(f"[GlyphAtlas] Error loading atlas: {e}")
+            self._reset()
+
+    def _save_index(self) -> None:
+        np.save(self.boxes_path, self.boxes)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "signature": self._signature(),
+                    "glyphs": self.glyphs,
+                    "cursors": self.cursors,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    def __contains__(self, glyph: str) -> bool:
+        return glyph in self.slots
+
+    def __len__(self) -> int:
+        return len(self.glyphs)
+
+    def _writable_sheet(self, size: int) -> np.ndarray:
+        path = self.sheet_path(size)
+        if self.glyphs and os.path.exists(path):
+            return np.load(path, mmap_mode="r+")
+        sheet = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.uint8, shape=(size * 2, size * SHEET_COLUMNS)
+        )
+        sheet[:] = 255
+        return sheet
+
+    def _grow(self, size: int, sheet: np.ndarray) -> np.ndarray:
+        path = self.sheet_path(size)
+        tmp_path = path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8, shape=(sheet.shape[0] * 2, sheet.shape[1])
+        )
+        grown[: sheet.shape[0]] = sheet
+        grown[sheet.shape[0]:] = 255
+        grown.flush()
+        del grown
+        del sheet
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r+")
+
+    def _rasterize(self, glyph: str, size: int) -> tuple[np.ndarray, int, int]:
+        """Render ``glyph`` in a ``size`` square and crop it to its ink."""
+        font_size = max(1, round(glyph_visualizer.GLYPH_FONT_SIZE * size / glyph_visualizer.GLYPH_IMAGE_SIZE))
+        pixels = np.asarray(
+            glyph_visualizer._draw_glyph(glyph, self.font_path, size, font_size).convert("L")
+        )
+        rows = np.flatnonzero((pixels < 255).any(axis=1))
+        cols = np.flatnonzero((pixels < 255).any(axis=0))
+        if rows.size == 0:
+            return np.zeros((0, 0), dtype=np.uint8), 0, 0
+        return pixels[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], int(cols[0]), int(rows[0])
+
+    def add(self, glyphs: Iterable[str]) -> int:
+        """
+        Render the glyphs that are not in the atlas yet and append them to
+        the sheets.  Returns the number of glyphs added.
+        """
+        new = [g for g in dict.fromkeys(glyphs) if g and g not in self.slots]
+        if not new:
+            return 0
+        with self._lock:
+            new = [g for g in new if g not in self.slots]
+            if not new:
+                return 0
+            os.makedirs(self.directory, exist_ok=True)
+            sheets = {size: self._writable_sheet(size) for size in self.sizes}
+            boxes = np.zeros((len(self.sizes), len(new), 6), dtype=np.int32)
+            for i, size in enumerate(self.sizes):
+                x, y, shelf = self.cursors[size]
+                for j, glyph in enumerate(new):
+                    sprite, off_x, off_y = self._rasterize(glyph, size)
+                    h, w = sprite.shape
+                    if x + w > sheets[size].shape[1]:
+                        x, y, shelf = 0, y + shelf, 0
+                    while y + h > sheets[size].shape[0]:
+                        sheets[size] = self._grow(size, sheets[size])
+                    sheets[size][y:y + h, x:x + w] = sprite
+                    boxes[i, j] = (x, y, w, h, off_x, off_y)
+                    x, shelf = x + w, max(shelf, h)
+                self.cursors[size] = [x, y, shelf]
+                sheets[size].flush()
+            self.sheets = sheets
+            self.boxes = np.concatenate([self.boxes, boxes], axis=1)
+            for glyph in new:
+                self.slots[glyph] = len(self.glyphs)
+                self.glyphs.append(glyph)
+            self._save_index()
+        print(f"[GlyphAtlas] Added {len(new)} glyphs ({len(self.glyphs)} total)")
+        return len(new)
+
+    def sprite(self, glyph: str, size: int) -> Image.Image | None:
+        """
+        Return ``glyph`` black on white in a ``size`` square, copied from the
+        nearest pre-rendered size (scaled if ``size`` is not one of them).
+        """
+        slot = self.slots.get(glyph)
+        if slot is None:
+            return None
+        i = next((i for i, s in enumerate(self.sizes) if s >= size), len(self.sizes) - 1)
+        cell = self.sizes[i]
+        x, y, w, h, off_x, off_y = (int(v) for v in self.boxes[i, slot])
+        canvas = np.full((cell, cell), 255, dtype=np.uint8)
+        canvas[off_y:off_y + h, off_x:off_x + w] = self.sheets[cell][y:y + h, x:x + w]
+        img = Image.fromarray(canvas, mode="L")
+        return img if cell == size else img.resize((size, size), Image.Resampling.LANCZOS)
+
+
+_atlas: GlyphAtlas | None = None
+_atlas_lock = threading.Lock()
+
+
+def get_atlas() -> GlyphAtlas:
+    """Return the process-wide atlas stored in ``config.GLYPH_ATLAS_DIR``."""
+    global _atlas
+    with _atlas_lock:
+        if _atlas is None:
+            _atlas = GlyphAtlas()
+        return _atlas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the glyph atlas from a glyph pool file")
+    parser.add_argument("pool", nargs="?", default="glossary/extended_glyph_pool.json", help="Glyph pool JSON list")
+    parser.add_argument("--out", default=None, help="Atlas directory (default: config.GLYPH_ATLAS_DIR)")
+    args = parser.parse_args()
+    with open(args.pool, "r", encoding="utf-8") as f:
+        pool = json.load(f)
+    atlas = GlyphAtlas(args.out)
+    atlas.add(pool)
+    print(f"[GlyphAtlas] {len(atlas)} glyphs in {atlas.directory}")
@@ -1,73 +1,44 @@
 import os
 import json
 import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import repeat
+from typing import Iterable
 
 import config
 from adjacency_seed import generate_adjacents
-from modalities import generate_modalities
+from modalities import generate_modalities, materialize_modalities
 from glyph_decision_engine import choose_glyph_for_token
 from token_fusion import TokenFusion
+from file_lock import FileLock
+try:
+    from spectral_index import index_glyph
+except Exception:
+    index_glyph = None  # type: ignore
 
 fusion = TokenFusion()
 
+# Striped per-token locks serializing ensure_modalities() across the GUI,
+# externalization and job-queue threads.
+_token_locks = [threading.Lock() for _ in range(64)]
 
-def build_glyph_if_needed(
-    token: str,
-    base_dir: str | None = None,
-    adj_count: int = 50,
-) -> dict:
-    """
-    Create a glyph representation for a token if it does not already exist.
 
-    The glyph building process performs several steps:
-      1. Generate a list of adjacent tokens to provide context.
-      2. Select an appropriate glyph identifier from the pool.
-      3. Produce modality data (audio, image, FFTs).
-      4. Persist the resulting glyph object to disk.
+def _token_lock(token_id: str) -> threading.Lock:
+    return _token_locks[hash(token_id) % len(_token_locks)]
 
-    Errors in any of the sub‑steps are caught and sensible fallbacks are
-    returned so that glyph creation does not abort the entire pipeline.
 
-    Parameters
-    ----------
-    token : str
-        The token for which a glyph is being created.
-    base_dir : str | None
-        Directory where glyph JSON files are stored.  If ``None`` the
-        location defined in :mod:`config` will be used.
-    adj_count : int
-        Number of adjacents to request when generating adjacency context.
+def _compose_glyph(token: str, adj_count: int = 50, profile: str = "eager") -> dict:
+    """
+    Run adjacency, glyph selection and modality generation for ``token``.
 
-    Returns
-    -------
-    dict
-        The created glyph object.
+    With the ``"lazy"`` and ``"text"`` profiles no media is generated; the
+    record lists every modality kind as pending instead.
     """
-    if base_dir is None:
-        base_dir = config.GLYPH_OUTPUT_DIR
-    print(f"[GlyphBuilder] Building glyph for unknown token: '{token}'")
     now = datetime.utcnow().isoformat() + "Z"
     token_id = fusion.fuse_token(token)
-    path = os.path.join(base_dir, f"{token_id}.json")
-    manifest_path = os.path.join(base_dir, "manifest.json")
-
-    # Determine if we already built this glyph
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    manifest: dict[str, str] = {}
-    if os.path.exists(manifest_path):
-        try:
-            with open(manifest_path, "r", encoding="utf-8") as f:
-                manifest = json.load(f)
-        except Exception:
-            manifest = {}
-
-    if os.path.exists(path) and manifest.get(token_id) == token_hash:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            pass
 
     # Step 1: Generate adjacents first (required for glyph decision)
     try:
@@ -85,7 +56,8 @@ def build_glyph_if_needed(
 
     # Step 3: Generate modalities (FFT, TTS, image, etc.)
     try:
-        modalities = generate_modalities(token, glyph_id, token_id)
+        kinds = None if profile == "eager" else ()
+        modalities = generate_modalities(token, glyph_id, token_id, kinds=kinds)
     except Exception as e:
         print(f"[GlyphBuilder] Error generating modalities for '{token}': {e}")
         # Provide a minimal modalities structure
@@ -108,16 +80,368 @@ def build_glyph_if_needed(
         "agency_trace": [],
         "self_notes": [f"Auto-generated from token '{token}' on {now}."]
     }
+    return glyph
+
+
+class GlyphManifest:
+    """
+    In-memory ``token_id -> token hash`` index for a glyph directory.
+
+    The on-disk form is a compact ``manifest.json`` snapshot plus an
+    append-only ``manifest.journal`` of JSON lines.  New entries are appended
+    to the journal and folded into the snapshot every
+    ``config.MANIFEST_COMPACT_EVERY`` entries.  The cache is reloaded when
+    either file's mtime or size changes underneath it, e.g. because another
+    process built glyphs into the same directory.  Appends and compaction
+    hold a cross-process lock on ``manifest.lock`` so that no process
+    truncates the journal while another is writing to it.
+    """
+
+    def __init__(self, base_dir: str) -> None:
+        self.snapshot_path = os.path.join(base_dir, "manifest.json")
+        self.journal_path = os.path.join(base_dir, "manifest.journal")
+        self.entries: dict[str, str] = {}
+        self._journal_lines = 0
+        # Bytes of the journal read so far; a partial trailing line is
+        # left for the next read.
+        self._journal_offset = 0
+        self._snapshot_stat: tuple[int, int] | None = None
+        self._journal_stat: tuple[int, int] | None = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(base_dir, "manifest.lock"))
+        self._reload()
+
+    @staticmethod
+    def _stat(path: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_journal(self, offset: int = 0) -> None:
+        self._journal_stat = self._stat(self.journal_path)
+        self._journal_offset = offset
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    self._journal_offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry["id"]] = entry["hash"]
+                    self._journal_lines += 1
+        except OSError:
+            pass
+
+    def _reload(self) -> None:
+        self.entries = {}
+        self._journal_lines = 0
+        self._snapshot_stat = self._stat(self.snapshot_path)
+        if self._snapshot_stat is not None:
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+        self._read_journal()
+
+    def _refresh(self) -> None:
+        """Pick up changes made by other processes since the last access."""
+        if self._stat(self.snapshot_path) != self._snapshot_stat:
+            self._reload()
+            return
+        journal_stat = self._stat(self.journal_path)
+        if journal_stat == self._journal_stat:
+            return
+        if journal_stat is not None and journal_stat[1] >= self._journal_offset:
+            self._read_journal(self._journal_offset)
+        else:
+            self._reload()
+
+    def get(self, token_id: str) -> str | None:
+        with self._lock:
+            self._refresh()
+            return self.entries.get(token_id)
+
+    def add_many(self, items: dict[str, str]) -> None:
+        """Record several entries with a single journal append."""
+        if not items:
+            return
+        with self._lock, self._file_lock:
+            self._refresh()
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("".join(
+                    json.dumps({"id": k, "hash": v}) + "\n" for k, v in items.items()
+                ))
+            # Our own lines are complete; read them back with any appended
+            # by other processes since the refresh.
+            self._read_journal(self._journal_offset)
+            self.entries.update(items)
+            if self._journal_lines >= config.MANIFEST_COMPACT_EVERY:
+                self.compact()
+
+    def add(self, token_id: str, token_hash: str) -> None:
+        self.add_many({token_id: token_hash})
+
+    def compact(self) -> None:
+        """Fold the journal into the snapshot and truncate the journal."""
+        with self._lock, self._file_lock:
+            # Entries appended by other processes must reach the snapshot
+            # before the journal is truncated.
+            self._refresh()
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+            open(self.journal_path, "w", encoding="utf-8").close()
+            self._journal_lines = 0
+            self._journal_offset = 0
+            self._snapshot_stat = self._stat(self.snapshot_path)
+            self._journal_stat = self._stat(self.journal_path)
+
+
+_manifests: dict[str, GlyphManifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(base_dir: str) -> GlyphManifest:
+    """Return the process-wide manifest cache for ``base_dir``."""
+    key = os.path.abspath(base_dir)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = GlyphManifest(base_dir)
+        return manifest
+
+
+def _write_glyph(path: str, glyph: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(glyph, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_glyph_if_needed(
+    token: str,
+    base_dir: str | None = None,
+    adj_count: int = 50,
+    profile: str | None = None,
+) -> dict:
+    """
+    Create a glyph representation for a token if it does not already exist.
+
+    The glyph building process performs several steps:
+      1. Generate a list of adjacent tokens to provide context.
+      2. Select an appropriate glyph identifier from the pool.
+      3. Produce modality data (audio, image, FFTs).
+      4. Persist the resulting glyph object to disk.
+
+    Errors in any of the sub‑steps are caught and sensible fallbacks are
+    returned so that glyph creation does not abort the entire pipeline.
+
+    Parameters
+    ----------
+    token : str
+        The token for which a glyph is being created.
+    base_dir : str | None
+        Directory where glyph JSON files are stored.  If ``None`` the
+        location defined in :mod:`config` will be used.
+    adj_count : int
+        Number of adjacents to request when generating adjacency context.
+    profile : str | None
+        Modality profile (``"eager"``, ``"lazy"`` or ``"text"``).  ``None``
+        uses ``config.MODALITY_PROFILE``.  Lazy and text-only records defer
+        media generation to :func:`ensure_modalities`.
+
+    Returns
+    -------
+    dict
+        The created glyph object.
+    """
+    if base_dir is None:
+        base_dir = config.GLYPH_OUTPUT_DIR
+    print(f"[GlyphBuilder] Building glyph for unknown token: '{token}'")
+    token_id = fusion.fuse_token(token)
+    path = os.path.join(base_dir, f"{token_id}.json")
+    manifest = get_manifest(base_dir)
+
+    # Determine if we already built this glyph; a missing or unreadable file
+    # falls through to a rebuild.
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    if manifest.get(token_id) == token_hash:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+
+    glyph = _compose_glyph(token, adj_count, profile or config.MODALITY_PROFILE)
 
     # Save glyph object and update manifest
     try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(glyph, f, indent=2)
-        manifest[token_id] = token_hash
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            json.dump(manifest, f, indent=2)
+        _write_glyph(path, glyph)
+        manifest.add(token_id, token_hash)
     except Exception as e:
         print(f"[GlyphBuilder] Error saving glyph to '{path}': {e}")
 
     return glyph
+
+
+def lazy_materialization_enabled() -> bool:
+    """Return True if display paths should materialize pending modalities."""
+    return config.MODALITY_PROFILE != "text"
+
+
+def ensure_modalities(
+    token: str,
+    kinds: Iterable[str] | None = None,
+    base_dir: str | None = None,
+    build_missing: bool = True,
+) -> dict | None:
+    """
+    Make sure the given modality ``kinds`` of ``token``'s glyph exist.
+
+    Pending kinds, and kinds whose cached files were evicted, are generated
+    and the glyph file is rewritten.  If no glyph has been built for the
+    token it is built first, unless ``build_missing`` is False in which case
+    ``None`` is returned.  Concurrent calls for the same token are
+    serialized, so later callers find the media generated by the first
+    instead of generating it again.
+    """
+    if base_dir is None:
+        base_dir = config.GLYPH_OUTPUT_DIR
+    token_id = fusion.fuse_token(token)
+    with _token_lock(token_id):
+        return _ensure_modalities(token, token_id, kinds, base_dir, build_missing)
+
+
+def _ensure_modalities(
+    token: str,
+    token_id: str,
+    kinds: Iterable[str] | None,
+    base_dir: str,
+    build_missing: bool,
+) -> dict | None:
+    path = os.path.join(base_dir, f"{token_id}.json")
+    glyph = None
+    if get_manifest(base_dir).get(token_id) == hashlib.sha256(token.encode()).hexdigest():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                glyph = json.load(f)
+        except Exception:
+            glyph = None
+    if glyph is None:
+        if not build_missing:
+            return None
+        glyph = build_glyph_if_needed(token, base_dir)
+    if materialize_modalities(glyph, kinds):
+        try:
+            _write_glyph(path, glyph)
+        except Exception as e:
+            print(f"[GlyphBuilder] Error saving glyph to '{path}': {e}")
+        if index_glyph is not None:
+            try:
+                index_glyph(glyph, os.path.join(base_dir, "spectral"))
+            except Exception as e:
+                print(f"[GlyphBuilder] Error indexing spectra of '{token}': {e}")
+    return glyph
+
+
+def build_glyphs(
+    tokens: Iterable[str],
+    workers: int = 4,
+    base_dir: str | None = None,
+    adj_count: int = 50,
+    batch_size: int = 64,
+    profile: str = "text",
+) -> int:
+    """
+    Build glyphs for many tokens in parallel worker processes.
+
+    Tokens already recorded in the manifest (with their glyph file present)
+    are skipped, so an interrupted run can simply be restarted with the same
+    vocabulary.  Glyph files are written and the manifest journal is appended
+    once per batch of ``batch_size`` tokens.  The default ``"text"``
+    profile skips media generation; pass ``profile="eager"`` to produce
+    every modality up front.
+
+    Returns the number of glyphs built.
+    """
+    if base_dir is None:
+        base_dir = config.GLYPH_OUTPUT_DIR
+    os.makedirs(base_dir, exist_ok=True)
+    manifest = get_manifest(base_dir)
+
+    todo: list[str] = []
+    seen: set[str] = set()
+    for token in tokens:
+        token_id = fusion.fuse_token(token)
+        if token_id in seen:
+            continue
+        seen.add(token_id)
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        path = os.path.join(base_dir, f"{token_id}.json")
+        if manifest.get(token_id) == token_hash and os.path.exists(path):
+            continue
+        todo.append(token)
+    print(f"[GlyphBuilder] {len(seen) - len(todo)} glyphs already built; {len(todo)} to build")
+
+    built = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            if pool is not None:
+                glyphs = list(pool.map(_compose_glyph, batch, repeat(adj_count), repeat(profile)))
+            else:
+                glyphs = [_compose_glyph(token, adj_count, profile) for token in batch]
+            written: dict[str, str] = {}
+            for token, glyph in zip(batch, glyphs):
+                token_id = fusion.fuse_token(token)
+                try:
+                    _write_glyph(os.path.join(base_dir, f"{token_id}.json"), glyph)
+                except Exception as e:
+                    print(f"[GlyphBuilder] Error saving glyph for '{token}': {e}")
+                    continue
+                written[token_id] = hashlib.sha256(token.encode()).hexdigest()
+            manifest.add_many(written)
+            built += len(written)
+            print(f"[GlyphBuilder] Built {built}/{len(todo)} glyphs")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if built:
+            manifest.compact()
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-build glyphs from a vocabulary file")
+    parser.add_argument("vocab", help="Text file with one token per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Glyphs written per manifest update")
+    parser.add_argument("--adj-count", type=int, default=50, help="Adjacents requested per token")
+    parser.add_argument("--out", default=None, help="Glyph output directory")
+    parser.add_argument(
+        "--profile",
+        choices=["eager", "lazy", "text"],
+        default="text",
+        help="Modality profile; 'text' builds text-only records",
+    )
+    args = parser.parse_args()
+    with open(args.vocab, "r", encoding="utf-8") as f:
+        vocab = [line.strip() for line in f if line.strip()]
+    build_glyphs(
+        vocab,
+        workers=args.workers,
+        base_dir=args.out,
+        adj_count=args.adj_count,
+        batch_size=args.batch_size,
+        profile=args.profile,
+    )
@@ -2,6 +2,7 @@ import os
 import re
 import hashlib
 import sys
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
 
@@ -25,42 +26,99 @@ else:
             if os.path.exists(alt_path):
                 DEFAULT_FONT_PATH = alt_path
 
+# Rendering parameters; also part of the modality cache key
+GLYPH_IMAGE_SIZE = 512
+GLYPH_FONT_SIZE = 220
+# Rendered glyph bitmaps kept in memory
+GLYPH_BITMAP_CACHE = 256
+
+
+@lru_cache(maxsize=16)
+def _load_font(font_path: str, font_size: int) -> ImageFont.ImageFont:
+    """Load a TrueType font once per ``(path, size)``."""
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except Exception:
+        fallback = os.path.join("fonts", "Symbola.ttf")
+        try:
+            return ImageFont.truetype(fallback, font_size)
+        except Exception:
+            print("[GlyphVisualizer] Warning: Could not load Symbola font — using default")
+            return ImageFont.load_default()
+
+
+def render_glyph_bitmap(
+    token: str,
+    font_path: str | None = None,
+    size: int = GLYPH_IMAGE_SIZE,
+    font_size: int = GLYPH_FONT_SIZE,
+) -> Image.Image:
+    """
+    Return ``token`` rendered black on white, centred in a ``size`` square.
+
+    Bitmaps are kept in an LRU so that the GUIs and repeated exports reuse
+    them; each call returns a private copy that the caller may draw on.
+    """
+    return _render_glyph(token, font_path or DEFAULT_FONT_PATH, size, font_size).copy()
+
+
+@lru_cache(maxsize=GLYPH_BITMAP_CACHE)
+def _render_glyph(token: str, font_path: str, size: int, font_size: int) -> Image.Image:
+    return _draw_glyph(token, font_path, size, font_size)
+
+
+def _draw_glyph(token: str, font_path: str, size: int, font_size: int) -> Image.Image:
+    font = _load_font(font_path, font_size)
+    img = Image.new("RGB", (size, size), color="white")
+    draw = ImageDraw.Draw(img)
+    bbox = draw.textbbox((0, 0), token, font=font)
+    text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    text_position = ((size - text_w) // 2, (size - text_h) // 2)
+    draw.text(text_position, token, fill="black", font=font)
+    return img
+
+
+def glyph_image_path(token: str, output_dir: str = "modalities/images", font_path: str | None = None) -> str:
+    """
+    Return the content-addressed PNG path for ``token``.  The hash covers the
+    font and sizes so that changing them produces a new file.
+    """
+    font_path = font_path or DEFAULT_FONT_PATH
+    params = f"{token}|{os.path.basename(font_path)}|{GLYPH_IMAGE_SIZE}|{GLYPH_FONT_SIZE}"
+    hash_id = hashlib.sha1(params.encode()).hexdigest()[:8]
+    safe_token = re.sub(r"[^a-zA-Z0-9_-]", "_", token)
+    return os.path.join(output_dir, f"{safe_token}_{hash_id}_sigil.png")
+
+
+def _atlas_sprite(token: str, font_path: str | None) -> Image.Image | None:
+    """Blit ``token`` from the glyph atlas if it holds the glyph in this font."""
+    if font_path not in (None, DEFAULT_FONT_PATH):
+        return None
+    try:
+        from glyph_atlas import get_atlas
+        atlas = get_atlas()
+        if token not in atlas:
+            return None
+        return atlas.sprite(token, GLYPH_IMAGE_SIZE).convert("RGB")
+    except Exception as e:
+        print(f"[GlyphVisualizer] Atlas unavailable, rendering directly: {e}")
+        return None
+
 
 def generate_glyph_image(token: str, output_dir: str = "modalities/images", font_path: str | None = None) -> str | None:
     """
     Render a Unicode glyph into an image file.  The resulting PNG is saved
-    into `output_dir` and the path returned.  If font loading or drawing
-    fails, None is returned and a warning printed.
+    into `output_dir` and the path returned; if it already exists it is
+    returned without rendering.  If font loading or drawing fails, None is
+    returned and a warning printed.
     """
+    image_path = glyph_image_path(token, output_dir, font_path)
+    if os.path.exists(image_path):
+        return image_path
     print(f"[GlyphVisualizer] Generating glyph image for: {token}")
-    if font_path is None:
-        font_path = DEFAULT_FONT_PATH
-    # Create a hashed and sanitized filename
-    hash_id = hashlib.sha1(token.encode()).hexdigest()[:8]
-    safe_token = re.sub(r"[^a-zA-Z0-9_-]", "_", token)
-    image_filename = f"{safe_token}_{hash_id}_sigil.png"
-    image_path = os.path.join(output_dir, image_filename)
-    os.makedirs(output_dir, exist_ok=True)
-    width, height = 512, 512
-    background_color = "white"
-    text_color = "black"
-    font_size = 220
     try:
-        try:
-            font = ImageFont.truetype(font_path, font_size)
-        except Exception:
-            fallback = os.path.join("fonts", "Symbola.ttf")
-            try:
-                font = ImageFont.truetype(fallback, font_size)
-            except Exception:
-                print("[GlyphVisualizer] Warning: Could not load Symbola font — using default")
-                font = ImageFont.load_default()
-        img = Image.new("RGB", (width, height), color=background_color)
-        draw = ImageDraw.Draw(img)
-        bbox = draw.textbbox((0, 0), token, font=font)
-        text_w, text_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-        text_position = ((width - text_w) // 2, (height - text_h) // 2)
-        draw.text(text_position, token, fill=text_color, font=font)
+        os.makedirs(output_dir, exist_ok=True)
+        img = _atlas_sprite(token, font_path) or render_glyph_bitmap(token, font_path)
         img.save(image_path)
         print(f"[GlyphVisualizer] Saved to: {image_path}")
         return image_path
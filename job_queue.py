@@ -0,0 +1,415 @@
+"""Persistent, prioritized background queue for slow enrichment work.
+
+Jobs (modality generation, glyph/adjacency backfill) are stored in a small
+SQLite database so that queued work survives restarts.  A bounded pool of
+worker threads executes them in priority order: interactive input uses
+:data:`PRIORITY_INTERACTIVE` and overtakes backfill of tokens discovered
+during traversal (:data:`PRIORITY_BACKFILL`).  Identical jobs are coalesced,
+failures are retried with exponential backoff and completion callbacks
+deliver results to the caller (e.g. the GUI) asynchronously.
+
+Several processes may share one database.  A running job records the pid of
+the process that claimed it and a lease that a heartbeat thread renews while
+the job runs; only jobs whose owner is gone or whose lease expired are
+queued again.  Completion callbacks are held in memory, so they only fire
+for jobs this process runs; those of jobs finished elsewhere are dropped.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+import config
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKFILL = 10
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists but owned by another user
+    return True
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with a bounded worker pool.
+
+    Parameters
+    ----------
+    db_path : str
+        Location of the SQLite database.  Use ``":memory:"`` for a
+        non-persistent queue.
+    workers : int | None
+        Number of worker threads; defaults to ``config.JOB_WORKERS``.
+    max_attempts : int | None
+        Attempts before a job is marked failed; defaults to
+        ``config.JOB_MAX_ATTEMPTS``.
+    backoff : float | None
+        Base retry delay in seconds, doubled after every failure; defaults to
+        ``config.JOB_RETRY_BACKOFF``.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        workers: int | None = None,
+        max_attempts: int | None = None,
+        backoff: float | None = None,
+    ) -> None:
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.workers = config.JOB_WORKERS if workers is None else workers
+        self.max_attempts = config.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.backoff = config.JOB_RETRY_BACKOFF if backoff is None else backoff
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " run_at REAL NOT NULL,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " owner INTEGER,"
+            " lease_until REAL)"
+        )
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "INTEGER"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, priority, id)"
+        )
+        self._owner = os.getpid()
+        # Jobs interrupted by a crash are picked up again
+        self._requeue_orphans()
+        self._cond = threading.Condition()
+        self._handlers: dict[str, Callable[[dict], Any]] = {}
+        self._callbacks: dict[str, list[Callable[[Any], None]]] = {}
+        self._running: set[int] = set()
+        self._threads: list[threading.Thread] = []
+        self._beat: threading.Thread | None = None
+        self._stopping = False
+
+    def register(self, kind: str, handler: Callable[[dict], Any]) -> None:
+        """Register the function that executes jobs of ``kind``."""
+        self._handlers[kind] = handler
+
+    @staticmethod
+    def _key(kind: str, payload: dict) -> str:
+        return kind + ":" + json.dumps(payload, sort_keys=True)
+
+    def submit(
+        self,
+        kind: str,
+        payload: dict,
+        priority: int = PRIORITY_BACKFILL,
+        callback: Optional[Callable[[Any], None]] = None,
+    ) -> int:
+        """
+        Queue a job and return its id.
+
+        If an identical job is already queued or running no new job is
+        created; the existing one is promoted to ``priority`` if that is more
+        urgent and ``callback`` is attached to it.  ``callback`` is dropped
+        without being called if another process runs the job.
+        """
+        key = self._key(kind, payload)
+        now = time.time()
+        with self._cond:
+            row = self._conn.execute(
+                "SELECT id, priority, status FROM jobs"
+                " WHERE key = ? AND status IN ('queued', 'running')",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                job_id = row[0]
+                if row[2] == "queued" and priority < row[1]:
+                    self._conn.execute(
+                        "UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id)
+                    )
+            else:
+                job_id = self._conn.execute(
+                    "INSERT INTO jobs (kind, key, payload, priority, run_at, status)"
+                    " VALUES (?, ?, ?, ?, ?, 'queued')",
+                    (kind, key, json.dumps(payload), priority, now),
+                ).lastrowid
+            if callback is not None:
+                self._callbacks.setdefault(key, []).append(callback)
+            self._cond.notify()
+        return job_id
+
+    def pending(self) -> int:
+        """Number of queued or running jobs."""
+        with self._cond:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def failed(self) -> list[dict]:
+        """Return jobs that exhausted their retries."""
+        with self._cond:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, attempts, error FROM jobs WHERE status = 'failed'"
+            ).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "payload": json.loads(r[2]), "attempts": r[3], "error": r[4]}
+            for r in rows
+        ]
+
+    def start(self) -> "JobQueue":
+        """Start the worker threads and the lease heartbeat (idempotent)."""
+        with self._cond:
+            self._stopping = False
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._worker, daemon=True, name=f"job-worker-{len(self._threads)}")
+                self._threads.append(t)
+                t.start()
+            if self._beat is None:
+                self._beat = threading.Thread(
+                    target=self._heartbeat, daemon=True, name="job-heartbeat"
+                )
+                self._beat.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the workers after their current job."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        if self._beat is not None:
+            self._beat.join(timeout)
+            self._beat = None
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until no jobs are queued or running; return False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _claim(self) -> Optional[tuple]:
+        now = time.time()
+        # Select and mark the job in one write transaction so that workers
+        # of other processes sharing the database cannot claim it too.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT id, kind, key, payload, attempts FROM jobs"
+                " WHERE status = 'queued' AND run_at <= ?"
+                " ORDER BY priority, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?"
+                    " WHERE id = ?",
+                    (self._owner, now + config.JOB_LEASE_SECONDS, row[0]),
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _requeue_orphans(self) -> int:
+        """Queue again running jobs whose owner died or whose lease expired."""
+        now = time.time()
+        rows = self._conn.execute(
+            "SELECT id, owner, lease_until FROM jobs WHERE status = 'running'"
+        ).fetchall()
+        orphans = [
+            job_id for job_id, owner, lease_until in rows
+            if owner is None
+            or (owner != self._owner and not _pid_alive(owner))
+            or (lease_until or 0) < now
+        ]
+        for job_id in orphans:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL"
+                " WHERE id = ? AND status = 'running'",
+                (job_id,),
+            )
+        return len(orphans)
+
+    def _renew_leases(self) -> None:
+        """Extend the leases of the jobs this queue's workers are running."""
+        if not self._running:
+            return
+        marks = ", ".join("?" * len(self._running))
+        self._conn.execute(
+            f"UPDATE jobs SET lease_until = ? WHERE owner = ? AND id IN ({marks})",
+            (time.time() + config.JOB_LEASE_SECONDS, self._owner, *self._running),
+        )
+
+    def _drop_stale_callbacks(self) -> None:
+        """Forget callbacks of jobs that another process finished."""
+        if not self._callbacks:
+            return
+        keys = list(self._callbacks)
+        marks = ", ".join("?" * len(keys))
+        live = {
+            r[0] for r in self._conn.execute(
+                "SELECT key FROM jobs WHERE status IN ('queued', 'running')"
+                f" AND key IN ({marks})",
+                keys,
+            )
+        }
+        for key in keys:
+            if key not in live:
+                del self._callbacks[key]
+
+    def _heartbeat(self) -> None:
+        # Renew well before the lease runs out, however long the jobs take
+        interval = config.JOB_LEASE_SECONDS / 3
+        with self._cond:
+            while not self._stopping:
+                try:
+                    self._renew_leases()
+                    self._drop_stale_callbacks()
+                except sqlite3.Error as e:
+                    print(f"[JobQueue] Database error renewing leases: {e}")
+                self._cond.wait(interval)
+
+    def _next_run_at(self) -> Optional[float]:
+        return self._conn.execute(
+            "SELECT MIN(run_at) FROM jobs WHERE status = 'queued'"
+        ).fetchone()[0]
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopping:
+                    try:
+                        job = self._claim()
+                        if job is not None:
+                            self._running.add(job[0])
+                            break
+                        self._requeue_orphans()
+                        next_run = self._next_run_at()
+                    except sqlite3.Error as e:
+                        print(f"[JobQueue] Database error while claiming a job: {e}")
+                        next_run = None
+                    wait = 1.0 if next_run is None else min(1.0, max(0.0, next_run - time.time()))
+                    self._cond.wait(wait)
+                if self._stopping:
+                    if job is not None:
+                        self._running.discard(job[0])
+                        self._release(job[0])
+                    return
+            job_id, kind, key, payload, attempts = job
+            handler = self._handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job kind '{kind}'")
+                result = handler(json.loads(payload))
+            except Exception as e:
+                self._fail(job_id, key, attempts + 1, e, retry=handler is not None)
+                continue
+            with self._cond:
+                self._running.discard(job_id)
+                try:
+                    self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                except sqlite3.Error as e:
+                    print(f"[JobQueue] Database error completing job {job_id}: {e}")
+                callbacks = self._callbacks.pop(key, [])
+            for cb in callbacks:
+                try:
+                    cb(result)
+                except Exception as e:
+                    print(f"[JobQueue] Callback for {kind} job {job_id} failed: {e}")
+
+    def _release(self, job_id: int) -> None:
+        try:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE id = ?",
+                (job_id,),
+            )
+        except sqlite3.Error as e:
+            print(f"[JobQueue] Database error releasing job {job_id}: {e}")
+
+    def _fail(self, job_id: int, key: str, attempts: int, error: Exception, retry: bool) -> None:
+        with self._cond:
+            self._running.discard(job_id)
+            try:
+                if retry and attempts < self.max_attempts:
+                    delay = self.backoff * (2 ** (attempts - 1))
+                    print(
+                        f"[JobQueue] Job {job_id} failed ({error}); "
+                        f"retrying in {delay:.1f}s"
+                    )
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, attempts = ?,"
+                        " run_at = ?, error = ? WHERE id = ?",
+                        (attempts, time.time() + delay, str(error), job_id),
+                    )
+                else:
+                    print(f"[JobQueue] Job {job_id} failed permanently: {error}")
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', owner = NULL, attempts = ?,"
+                        " error = ? WHERE id = ?",
+                        (attempts, str(error), job_id),
+                    )
+                    self._callbacks.pop(key, None)
+            except sqlite3.Error as e:
+                print(f"[JobQueue] Database error recording job {job_id} failure: {e}")
+            self._cond.notify_all()
+
+
+def _modalities_job(payload: dict) -> Optional[dict]:
+    from glyph_builder import ensure_modalities
+    return ensure_modalities(
+        payload["token"], payload.get("kinds"), build_missing=payload.get("build_missing", False)
+    )
+
+
+def _glyph_job(payload: dict) -> dict:
+    from glyph_builder import build_glyph_if_needed
+    return build_glyph_if_needed(
+        payload["token"], adj_count=payload.get("adj_count", 50), profile=payload.get("profile")
+    )
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide queue with the default handlers, started."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(config.JOB_QUEUE_DB)
+            _queue.register("modalities", _modalities_job)
+            _queue.register("glyph", _glyph_job)
+            _queue.start()
+        return _queue
+
+
+def submit_modalities(
+    token: str,
+    kinds: Iterable[str] | None = None,
+    priority: int = PRIORITY_BACKFILL,
+    callback: Optional[Callable[[Any], None]] = None,
+) -> int:
+    """Queue materialization of ``token``'s pending modalities."""
+    payload = {"token": token, "kinds": sorted(kinds) if kinds is not None else None}
+    return get_job_queue().submit("modalities", payload, priority, callback)
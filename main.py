@@ -6,15 +6,16 @@ import time
 import traceback
 from skg_engine import SKGEngine
 import config
-from glyph_builder import build_glyph_if_needed
+from glyph_builder import build_glyph_if_needed, lazy_materialization_enabled
+from job_queue import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, get_job_queue, submit_modalities
 from token_fusion import TokenFusion
 
 fusion = TokenFusion()
 from agency_gate import process_agency_gates  # noqa: F401  # imported for side effects
-from tts_engine import speak
+from tts_engine import cancel_speech, speak, wait_for_speech
 from stt_engine import transcribe_speech
+from audio_stream import MicrophoneSource, SpeechStream
 from video_capture import capture_frame
-from glyph_visualizer import generate_glyph_image
 from skg_gui import SKGGUI
 
 # Setup required directories on program start
@@ -55,6 +56,8 @@ def save_glyph(glyph: dict) -> None:
 
 def process_input(user_input: str, skg: SKGEngine, gui: SKGGUI | None = None) -> None:
     token = user_input.lower()
+    # Thoughts about the previous input that were not spoken yet are stale
+    cancel_speech("thought")
     if gui:
         gui.append_message(f"Input: {token}")
         gui.append_message(
@@ -68,20 +71,29 @@ def process_input(user_input: str, skg: SKGEngine, gui: SKGGUI | None = None) ->
         skg.add_glyph_to_pool(glyph_id)
     # Update SKG adjacency map
     adjacents = glyph_data.get("adjacents", [])
-    skg.update_adjacency_map(token, adjacents)
-    # Visual glyph rendering
-    generate_glyph_image(glyph_id)
+    with skg.state_lock:
+        skg.update_adjacency_map(token, adjacents)
+    save_glyph(glyph_data)
+    # Media is generated in the background while the thought loop runs; the
+    # GUI is refreshed from the job queue once it exists.
+    if lazy_materialization_enabled():
+        submit_modalities(
+            token,
+            priority=PRIORITY_INTERACTIVE,
+            callback=(lambda g: g and gui.update_from_token(g)) if gui else None,
+        )
     # Run symbolic recursion if enabled
     if skg.recursion_enabled:
-        skg.recursive_thought_loop(token)
-    save_glyph(glyph_data)
+        with skg.state_lock:
+            skg.recursive_thought_loop(token)
 
     # Top adjacents report
-    top_three = sorted(
+    ranked = sorted(
         skg.get_adjacencies_for_token(token).items(),
         key=lambda x: x[1],
         reverse=True,
-    )[:3]
+    )
+    top_three = ranked[:3]
     print("[Top Adjacents]", top_three)
     if gui:
         gui.append_message(
@@ -101,18 +113,29 @@ def process_input(user_input: str, skg: SKGEngine, gui: SKGGUI | None = None) ->
             print(" -> ".join(skg.thought_history[-10:]))
         skg.externalized_last = False
 
+    # Backfill glyph records for the strongest adjacents at low priority
+    jobs = get_job_queue()
+    for adj_token, _ in ranked[:config.BACKFILL_ADJACENTS]:
+        jobs.submit("glyph", {"token": adj_token, "profile": "text"}, PRIORITY_BACKFILL)
+
     if gui:
         gui.update_from_token(glyph_data)
 
 
 def voice_listener_loop(skg: SKGEngine, gui: SKGGUI | None) -> None:
     """Continuously listen on the microphone and process any recognized speech."""
-    while True:
-        spoken, _ = transcribe_speech()
-        if spoken:
-            speak(f"You said {spoken}")
-            process_input(spoken, skg, gui)
-        time.sleep(0.5)
+    try:
+        source = MicrophoneSource()
+    except Exception as e:
+        print(f"[Main] Microphone stream unavailable: {e}")
+        return
+    # The microphone stays open; audio is muted while we are speaking so
+    # that our own voice is not transcribed.
+    stream = SpeechStream(source, gate=lambda: wait_for_speech(0)).start()
+    for segment in stream.results():
+        if segment.text:
+            speak(f"You said {segment.text}")
+            process_input(segment.text, skg, gui)
 
 
 def webcam_listener_loop(skg: SKGEngine, gui: SKGGUI | None) -> None:
@@ -125,16 +148,23 @@ def webcam_listener_loop(skg: SKGEngine, gui: SKGGUI | None) -> None:
             print(f"[Webcam] Token {token} from {image_path}")
             skg.assign_glyph_to_token(token)
             process_input(token, skg, gui)
-        time.sleep(3)
+        time.sleep(config.VIDEO_TOKEN_INTERVAL)
 
 
 def main() -> None:
     # Initialize symbolic cognition engine with communication options
     parser = argparse.ArgumentParser(description="SKG Engine")
     parser.add_argument("--no-gui", action="store_true", help="disable Tkinter GUI")
+    parser.add_argument(
+        "--profile",
+        choices=["eager", "lazy", "text"],
+        default=config.MODALITY_PROFILE,
+        help="modality profile for new glyphs ('text' for fast headless runs)",
+    )
     args = parser.parse_args()
+    config.MODALITY_PROFILE = args.profile
 
-    skg = SKGEngine(data_path, comm_enabled=config.ENABLE_ENGINE_COMM)
+    skg = SKGEngine(data_path, comm_enabled=config.ENABLE_ENGINE_COMM, glyph_atlas=True)
     if config.ENABLE_ENGINE_COMM and config.SUBSCRIBE_STREAM:
         skg.subscribe_to_engine(config.SUBSCRIBE_STREAM)
     # Load extended glyph pool if available
@@ -164,7 +194,7 @@ def main() -> None:
                     process_input(spoken, skg, gui)
                 continue
             elif user_input.lower() == 'webcam':
-                token, image_path = capture_frame()
+                token, image_path = capture_frame(skip_duplicates=False)
                 if token:
                     print(f"[Webcam] Token {token} from {image_path}")
                     skg.assign_glyph_to_token(token)
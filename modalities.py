@@ -1,23 +1,20 @@
 import os
 import json
-from typing import List
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List
 import time
 
-
-def wait_for_file(path: str, timeout: float = 3.0) -> None:
-    """Wait until ``path`` exists and is non-empty or raise ``TimeoutError``."""
-    start = time.time()
-    while not os.path.exists(path) or os.path.getsize(path) == 0:
-        if time.time() - start > timeout:
-            raise TimeoutError(f"File not available: {path}")
-        time.sleep(0.1)
+import config
+from artifact_cache import ArtifactCache
+from token_fusion import TokenFusion
 
 # Import optional dependencies within try/except so that missing libraries
 # do not break modality generation.
 try:
-    from tts_engine import generate_tts
+    from tts_engine import generate_tts_async
 except Exception:
-    generate_tts = None  # type: ignore
+    generate_tts_async = None  # type: ignore
 try:
     from fft_generator import generate_fft_from_audio
 except Exception:
@@ -31,12 +28,220 @@ try:
 except Exception:
     fetch_images_from_serpapi = None  # type: ignore
 try:
+    from thumbnails import make_thumbnail
+except Exception:
+    make_thumbnail = None  # type: ignore
+try:
+    import glyph_visualizer
     from glyph_visualizer import generate_glyph_image
 except Exception:
+    glyph_visualizer = None  # type: ignore
     generate_glyph_image = None  # type: ignore
 
+# Generation settings that are not function arguments but change the output;
+# bump these when the corresponding generator changes.
+FFT_AUDIO_PARAMS = {
+    "transform": "rfft",
+    "dtype": config.FFT_AUDIO_DTYPE,
+    "log_scale": config.FFT_AUDIO_LOG_SCALE,
+    "renderer": "pil",
+}
+FFT_IMAGE_PARAMS = {"max_dim": 512}
+
+artifact_cache = ArtifactCache()
+_token_fusion = TokenFusion()
+
+
+def _with_thumbnail(paths: list[str | None]) -> list[str | None]:
+    """Append the display thumbnail of the image that ends ``paths``."""
+    if make_thumbnail and paths and paths[-1]:
+        return paths + [make_thumbnail(paths[-1])]
+    return paths
+
+
+# Shared pool for modality stages.  Stages that exceed their timeout keep
+# running in the background but their results are discarded.
+_executor = ThreadPoolExecutor(
+    max_workers=config.MODALITY_WORKERS, thread_name_prefix="modality"
+)
+
+# Stages that wait on other services (the TTS worker, the image search API)
+# and can hang.  They run on threads of their own instead of the shared pool,
+# so a hung call cannot hold a pool worker and starve later builds.
+ISOLATED_STAGES = frozenset({"tts", "image_search"})
+
+# Marker for stages that failed, timed out or were skipped.
+_FAILED = object()
+
+# Pool stages that timed out but are still running.  Until their call
+# returns, further runs of the same stage go to threads of their own, and
+# once they hold every pool worker all stages do.
+_hung_lock = threading.Lock()
+_hung_stages: dict[str, int] = {}
+
+
+def _mark_hung(name: str, future: Future) -> None:
+    with _hung_lock:
+        _hung_stages[name] = _hung_stages.get(name, 0) + 1
+
+    def released(_: Future) -> None:
+        with _hung_lock:
+            _hung_stages[name] -= 1
+            if not _hung_stages[name]:
+                del _hung_stages[name]
+
+    future.add_done_callback(released)
+
 
-def generate_modalities(token: str, glyph_id: str, token_id: str) -> dict:
+def _runs_isolated(name: str) -> bool:
+    with _hung_lock:
+        saturated = sum(_hung_stages.values()) >= config.MODALITY_WORKERS
+        return saturated or name in _hung_stages
+
+
+def _run_isolated(fn: Callable[..., Any], *args: Any) -> Future:
+    """Run ``fn`` on a dedicated daemon thread and return its future."""
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="modality-isolated", daemon=True).start()
+    return future
+
+
+def run_stage_graph(
+    stages: dict[str, tuple[Callable[..., Any], list[str]]],
+    timeouts: dict[str, float] | None = None,
+    default_timeout: float | None = None,
+    timed_out: set[str] | None = None,
+    isolated: Iterable[str] = (),
+    budget: float | None = None,
+) -> dict[str, Any]:
+    """
+    Run a small dependency graph of stages on the modality thread pool.
+
+    ``stages`` maps a stage name to ``(fn, deps)``; ``fn`` is called with the
+    results of ``deps`` in order once all of them have completed.  Each stage
+    is given its own timeout, measured from the moment it starts running; it
+    may also wait that long for a pool worker before it is dropped.  The
+    whole graph is cut off after ``budget`` seconds
+    (``config.MODALITY_GRAPH_TIMEOUT``).  Stages named in ``isolated``, and
+    stages whose previous run timed out and still holds a pool worker, run
+    on their own threads rather than the pool.  The returned dict holds the
+    result of every stage that finished in time; failed, timed-out stages
+    and their dependents are omitted.  Names of stages that timed out are
+    added to ``timed_out`` if given.
+    """
+    timeouts = timeouts or {}
+    if default_timeout is None:
+        default_timeout = config.MODALITY_STAGE_TIMEOUT
+    if budget is None:
+        budget = config.MODALITY_GRAPH_TIMEOUT
+    isolated = set(isolated)
+    results: dict[str, Any] = {}
+    remaining = dict(stages)
+    pending: dict[Any, str] = {}
+    submitted: dict[str, float] = {}
+    started: dict[str, float] = {}
+    pooled: set[str] = set()
+    cutoff = time.monotonic() + budget
+
+    def give_up(name: str) -> None:
+        results[name] = _FAILED
+        if timed_out is not None:
+            timed_out.add(name)
+
+    def timed(name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def run(*args: Any) -> Any:
+            started[name] = time.monotonic()
+            return fn(*args)
+
+        return run
+
+    def deadline(name: str) -> float:
+        limit = timeouts.get(name, default_timeout)
+        start = started.get(name)
+        if start is None:
+            # Still queued: give up once it has waited a full timeout
+            return min(submitted[name] + limit, cutoff)
+        return min(start + limit, cutoff)
+
+    while remaining or pending:
+        for name, (fn, deps) in list(remaining.items()):
+            if not all(d in results for d in deps):
+                continue
+            del remaining[name]
+            args = [results[d] for d in deps]
+            if any(a is _FAILED for a in args):
+                results[name] = _FAILED
+                continue
+            if time.monotonic() >= cutoff:
+                give_up(name)
+                continue
+            if name in isolated or _runs_isolated(name):
+                future = _run_isolated(timed(name, fn), *args)
+            else:
+                future = _executor.submit(timed(name, fn), *args)
+                pooled.add(name)
+            submitted[name] = time.monotonic()
+            pending[future] = name
+        if not pending:
+            break
+        wait_for = max(0.0, min(map(deadline, pending.values())) - time.monotonic())
+        done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for fut in done:
+            name = pending.pop(fut)
+            try:
+                results[name] = fut.result()
+            except Exception as e:
+                print(f"[Modalities] Warning: stage '{name}' failed: {e}")
+                results[name] = _FAILED
+        now = time.monotonic()
+        for fut, name in list(pending.items()):
+            if now >= deadline(name):
+                print(f"[Modalities] Warning: stage '{name}' timed out; continuing without it")
+                if not fut.cancel() and name in pooled:
+                    # Still running: it keeps its pool worker until it returns
+                    _mark_hung(name, fut)
+                del pending[fut]
+                give_up(name)
+    return {k: v for k, v in results.items() if v is not _FAILED}
+
+
+# Modality kinds that can be materialized independently.  "audio" covers the
+# TTS WAV and its FFT, "image" the rendered sigil and its FFT and "photos" the
+# image search.
+MODALITY_KINDS = ("audio", "image", "photos")
+
+# Kind produced by each stage of generate_modalities
+_STAGE_KINDS = {
+    "tts": "audio",
+    "fft_audio": "audio",
+    "glyph_image": "image",
+    "fft_from_image": "image",
+    "image_search": "photos",
+}
+
+# Fields of the modalities structure filled in by each kind
+_KIND_FIELDS = {
+    "audio": [("audio", "tts"), ("audio", "fft_audio"), ("visual", "fft_visual")],
+    "image": [("visual", "symbolic_image"), ("visual", "fft_from_image")],
+    "photos": [("visual", "photographic")],
+}
+
+
+def generate_modalities(
+    token: str,
+    glyph_id: str,
+    token_id: str,
+    kinds: Iterable[str] | None = None,
+) -> dict:
     """
     Generate and store multimodal representations for a token/glyph.
 
@@ -44,60 +249,128 @@ def generate_modalities(token: str, glyph_id: str, token_id: str) -> dict:
     for the glyph and computing its FFT, performing an image search for
     additional visual context and generating a simple ASCII representation.
 
+    The stages run concurrently as two chains (TTS → audio FFT and glyph
+    image → image FFT) alongside the image search.  Each stage is bounded by
+    ``config.MODALITY_STAGE_TIMEOUT``; stages that time out are left out of
+    the returned structure instead of blocking the glyph build.
+
+    ``kinds`` restricts generation to a subset of :data:`MODALITY_KINDS`.
+    Kinds that are not generated, or whose stages timed out, are listed under
+    ``"pending"`` so that they can be produced later by
+    :func:`materialize_modalities`.
+
     Missing or failing dependencies are handled gracefully; if a modality
     cannot be produced its entry will either be omitted or set to None.
     """
-    print(f"[Modalities] Generating modalities for: {token} / {glyph_id}")
+    kinds = MODALITY_KINDS if kinds is None else tuple(k for k in kinds if k in MODALITY_KINDS)
+    if kinds:
+        print(f"[Modalities] Generating {', '.join(kinds)} modalities for: {token} / {glyph_id}")
 
-    # Construct file paths using the shared token_id
-    audio_path = f"modalities/audio/{token_id}.wav"
-    fft_audio_path = f"modalities/fft_audio/{token_id}.npy"
-    fft_visual_path = f"modalities/fft_visual/{token_id}.png"
+    # Artifacts are content-addressed by their generation parameters so that
+    # identical requests skip TTS, rendering and FFT entirely.
+    voice = os.getenv("TTS_VOICE")
+    rate = int(os.getenv("TTS_RATE", "160"))
+    tts_key = artifact_cache.key("tts", text=token, voice=voice, rate=rate)
+    fft_key = artifact_cache.key("fft_audio", source=tts_key, **FFT_AUDIO_PARAMS)
+    audio_path = artifact_cache.path("audio", tts_key, ".wav")
+    fft_audio_path = artifact_cache.path("fft_audio", fft_key, ".npz")
+    fft_visual_path = artifact_cache.path("fft_visual", fft_key, ".png")
     symbolic_image_path = f"modalities/images/{token_id}_sigil.png"
 
     # Ensure directories exist
     for p in [audio_path, fft_audio_path, fft_visual_path, symbolic_image_path]:
         os.makedirs(os.path.dirname(p), exist_ok=True)
 
+    stages: dict[str, tuple[Callable[..., Any], list[str]]] = {}
+
     # --- AUDIO + AUDIO-FFT ---
-    if generate_tts:
-        try:
-            generate_tts(token, audio_path)
-            wait_for_file(audio_path)
-            if generate_fft_from_audio:
-                generate_fft_from_audio(audio_path, fft_audio_path, fft_visual_path)
-        except Exception as e:
-            print(f"[Modalities] Warning: audio modalities failed for '{token}': {e}")
-    else:
+    if "audio" in kinds and generate_tts_async:
+        def tts_stage() -> str:
+            if artifact_cache.lookup(tts_key):
+                return audio_path
+            # The TTS worker resolves the future once the WAV has been moved
+            # into place, so the FFT stage starts on a complete file.
+            generate_tts_async(token, audio_path, rate=rate, voice_id=voice).result()
+            artifact_cache.store(tts_key, [audio_path])
+            return audio_path
+
+        stages["tts"] = (tts_stage, [])
+        if generate_fft_from_audio:
+            def audio_fft_stage(wav_path: str) -> str:
+                if artifact_cache.lookup(fft_key):
+                    return fft_audio_path
+                generate_fft_from_audio(
+                    wav_path,
+                    fft_audio_path,
+                    fft_visual_path,
+                    dtype=FFT_AUDIO_PARAMS["dtype"],
+                    log_scale=FFT_AUDIO_PARAMS["log_scale"],
+                )
+                artifact_cache.store(fft_key, _with_thumbnail([fft_audio_path, fft_visual_path]))
+                return fft_audio_path
+
+            stages["fft_audio"] = (audio_fft_stage, ["tts"])
+    elif "audio" in kinds:
         print("[Modalities] Warning: tts_engine not available; skipping audio modalities")
 
     # --- GLYPH IMAGE + GLYPH FFT ---
-    generated_glyph_path = None
-    if generate_glyph_image:
-        try:
-            generated_glyph_path = generate_glyph_image(glyph_id)
-        except Exception as e:
-            print(f"[Modalities] Warning: glyph image generation failed for '{glyph_id}': {e}")
-    if generated_glyph_path and os.path.exists(generated_glyph_path) and generate_fft_from_image:
-        try:
-            fft_from_image_path = generate_fft_from_image(generated_glyph_path)
-            symbolic_image_path = generated_glyph_path
-        except Exception as e:
-            print(f"[Modalities] Warning: FFT-from-image failed: {e}")
-            fft_from_image_path = None
-    else:
-        fft_from_image_path = None
+    if "image" in kinds and generate_glyph_image:
+        image_key = artifact_cache.key(
+            "glyph_image",
+            glyph=glyph_id,
+            font=glyph_visualizer.DEFAULT_FONT_PATH,
+            size=glyph_visualizer.GLYPH_IMAGE_SIZE,
+            font_size=glyph_visualizer.GLYPH_FONT_SIZE,
+        )
+        image_fft_key = artifact_cache.key("fft_from_image", source=image_key, **FFT_IMAGE_PARAMS)
+
+        def glyph_image_stage() -> str | None:
+            cached = artifact_cache.lookup(image_key)
+            if cached:
+                return cached[0]
+            path = generate_glyph_image(glyph_id)
+            artifact_cache.store(image_key, _with_thumbnail([path]) if path else [])
+            return path
+
+        stages["glyph_image"] = (glyph_image_stage, [])
+        if generate_fft_from_image:
+            def image_fft_stage(glyph_path: str | None) -> str | None:
+                cached = artifact_cache.lookup(image_fft_key)
+                if cached:
+                    return cached[0]
+                if glyph_path and os.path.exists(glyph_path):
+                    path = generate_fft_from_image(glyph_path, max_dim=FFT_IMAGE_PARAMS["max_dim"])
+                    artifact_cache.store(image_fft_key, _with_thumbnail([path]) if path else [])
+                    return path
+                return None
+
+            stages["fft_from_image"] = (image_fft_stage, ["glyph_image"])
 
     # --- IMAGE SEARCH ---
-    if fetch_images_from_serpapi:
-        try:
-            fetched_images: List[str] = fetch_images_from_serpapi(token, glyph_id, max_results=3)  # type: ignore
-        except Exception as e:
-            print(f"[Modalities] Warning: image search failed for '{token}': {e}")
-            fetched_images = []
-    else:
+    if "photos" in kinds and fetch_images_from_serpapi:
+        stages["image_search"] = (
+            lambda: fetch_images_from_serpapi(token, glyph_id, max_results=3),  # type: ignore
+            [],
+        )
+    elif "photos" in kinds:
         print("[Modalities] Warning: image_search not available; skipping image search")
-        fetched_images = []
+
+    timed_out: set[str] = set()
+    results = run_stage_graph(
+        stages,
+        timeouts={"tts": config.TTS_STAGE_TIMEOUT},
+        timed_out=timed_out,
+        isolated=ISOLATED_STAGES,
+    ) if stages else {}
+    retry_kinds = {_STAGE_KINDS[name] for name in timed_out}
+
+    generated_glyph_path = results.get("glyph_image")
+    fft_from_image_path = results.get("fft_from_image")
+    if fft_from_image_path and generated_glyph_path:
+        symbolic_image_path = generated_glyph_path
+    fetched_images: List[str] = results.get("image_search") or []
+    audio_ok = "tts" in results
+    fft_ok = "fft_audio" in results
 
     # --- TEXTUAL/ASCII REPRESENTATION ---
     ascii_art = f"<{token.upper()}>"
@@ -107,16 +380,64 @@ def generate_modalities(token: str, glyph_id: str, token_id: str) -> dict:
             "weight": 1
         },
         "audio": {
-            "tts": audio_path if os.path.exists(audio_path) else None,
-            "fft_audio": fft_audio_path if os.path.exists(fft_audio_path) else None
+            "tts": audio_path if audio_ok and os.path.exists(audio_path) else None,
+            "fft_audio": fft_audio_path if fft_ok and os.path.exists(fft_audio_path) else None
         },
         "visual": {
-            "fft_visual": fft_visual_path if os.path.exists(fft_visual_path) else None,
+            "fft_visual": fft_visual_path if fft_ok and os.path.exists(fft_visual_path) else None,
             "photographic": fetched_images,
-            "symbolic_image": symbolic_image_path if os.path.exists(symbolic_image_path) else None,
+            "symbolic_image": symbolic_image_path if "image" in kinds and os.path.exists(symbolic_image_path) else None,
             "fft_from_image": fft_from_image_path
         },
         "extra": {
             "ascii_art": ascii_art
-        }
+        },
+        "pending": [k for k in MODALITY_KINDS if k not in kinds or k in retry_kinds],
     }
+
+
+# Kinds whose files live in the artifact cache and can be evicted from it
+_CACHED_KINDS = ("audio", "image")
+
+
+def _missing_kinds(modalities: dict, kinds: Iterable[str] | None = None) -> list[str]:
+    """Return materialized ``kinds`` whose recorded files no longer exist."""
+    missing = []
+    for kind in _CACHED_KINDS if kinds is None else kinds:
+        if kind not in _CACHED_KINDS:
+            continue
+        fields = _KIND_FIELDS[kind]
+        paths = [modalities.get(section, {}).get(field) for section, field in fields]
+        if any(isinstance(p, str) and not os.path.exists(p) for p in paths):
+            missing.append(kind)
+    return missing
+
+
+def materialize_modalities(glyph: dict, kinds: Iterable[str] | None = None) -> bool:
+    """
+    Generate pending modalities of a glyph record in place.
+
+    ``kinds`` limits which pending kinds are produced; by default all of them
+    are.  Kinds whose files have since been evicted from the artifact cache
+    count as pending again.  Returns True if the record was changed.
+    """
+    modalities = glyph.setdefault("modalities", {})
+    pending = modalities.get("pending", [])
+    missing = [k for k in _missing_kinds(modalities, kinds) if k not in pending]
+    if missing:
+        print(f"[Modalities] Artifacts of {', '.join(missing)} are gone; regenerating")
+        pending = modalities["pending"] = pending + missing
+    wanted = [k for k in (pending if kinds is None else kinds) if k in pending]
+    if not wanted:
+        return False
+    token = glyph.get("token", "")
+    generated = generate_modalities(
+        token, glyph.get("glyph_id", "□"), _token_fusion.fuse_token(token), kinds=wanted
+    )
+    for kind in wanted:
+        for section, field in _KIND_FIELDS[kind]:
+            modalities.setdefault(section, {})[field] = generated[section][field]
+    modalities["pending"] = [
+        k for k in pending if k not in wanted or k in generated["pending"]
+    ]
+    return True
@@ -1,18 +1,27 @@
 import os
 import json
+import atexit
+import weakref
+import hashlib
 import pickle
 import random
+import threading
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Callable
 
-from engine_comm import write_message, subscribe_to_stream
+from engine_comm import InboundQueue, open_transport, stream_address
 import config
 
 from superknowledge_graph import SuperKnowledgeGraph
 from agency_gate import process_agency_gates
 from skg_thought_tracker import SKGThoughtTracker
-from glyph_builder import build_glyph_if_needed
+from glyph_builder import (
+    build_glyph_if_needed,
+    ensure_modalities,
+    lazy_materialization_enabled,
+)
+from job_queue import submit_modalities
 try:
     from tts_engine import speak
 except Exception:
@@ -30,6 +39,17 @@ class AgencyGateDecision:
     confidence: float = 0.0
 
 
+# Engines with an adjacency sketch, whose pending updates are saved at exit
+_sketch_engines: "weakref.WeakSet[SKGEngine]" = weakref.WeakSet()
+
+
+@atexit.register
+def save_sketches() -> None:
+    """Write the unsaved adjacency sketch updates of every live engine."""
+    for engine in list(_sketch_engines):
+        engine.save_sketch()
+
+
 class SKGEngine:
     """
     Core symbolic knowledge graph engine.  This class manages the mapping of
@@ -47,8 +67,20 @@ class SKGEngine:
         select from.  If omitted or invalid a default pool containing a
         single placeholder glyph ("□") is used.
     comm_enabled : bool, optional
-        If True the engine will broadcast externalized tokens to a stream file
-        and process tokens received from subscribed engines.
+        If True the engine will broadcast externalized tokens over the
+        ``config.ENGINE_TRANSPORT`` transport (a stream file by default) and
+        process tokens received from subscribed engines.
+    approximate_adjacency : bool, optional
+        If True adjacency weights are counted in an
+        :class:`adjacency_sketch.AdjacencySketch` and ``adjacency_map`` only
+        retains the heaviest neighbors of each token.  Intended for
+        corpus-scale ingestion where exact per-pair counters do not fit in
+        memory.  The sketch is written every ``config.SKETCH_SAVE_EVERY``
+        updates, by :meth:`save_sketch` and at exit.
+    glyph_atlas : bool, optional
+        If True the glyph pool is pre-rendered into the shared
+        :class:`glyph_atlas.GlyphAtlas`, and glyphs added later through
+        :meth:`add_glyph_to_pool` are appended to it.
     """
 
     def __init__(
@@ -59,16 +91,32 @@ class SKGEngine:
         binary: bool = False,
         encrypt_key: Optional[bytes] = None,
         comm_enabled: bool = False,
+        approximate_adjacency: bool = False,
+        glyph_atlas: bool = False,
     ):
         self.comm_enabled = comm_enabled
-        self.comm_out_file = os.path.join(memory_path, "engine_stream.jsonl")
+        self.comm_out_file = stream_address(memory_path)
+        self._publisher = None
         self._subscriptions: list = []
+        self.inbound: Optional[InboundQueue] = None
+        # Held while thinking so subscribed tokens and direct input do not
+        # mutate the maps concurrently.
+        self.state_lock = threading.RLock()
         self.memory_path = memory_path
         self.glyph_list_path = glyph_path
         self.binary = binary
         self.encrypt_key = encrypt_key
         self.token_map: dict[str, dict] = {}
         self.adjacency_map: dict[str, dict[str, int]] = {}
+        self.adjacency_sketch = None
+        # Sketch updates not yet written to adjacency_sketch.npz
+        self._sketch_unsaved = 0
+        if approximate_adjacency:
+            from adjacency_sketch import AdjacencySketch
+            self.adjacency_sketch = AdjacencySketch(
+                config.SKETCH_EPSILON, config.SKETCH_DELTA, config.SKETCH_TOP_K
+            )
+            _sketch_engines.add(self)
         self.glyph_pool: List[str] = []
         self.graph = SuperKnowledgeGraph()
         self.thought_tracker = SKGThoughtTracker()
@@ -79,10 +127,23 @@ class SKGEngine:
         self.speech_enabled: bool = True
         self.gesture_enabled: bool = True
         self.recursion_enabled: bool = True
+        # Set on cluster workers: whether this engine owns a token.  Thought
+        # loops collect expansions into tokens it does not own in
+        # ``forwarded`` as (token, depth, parent) instead of recursing, and
+        # externalized tokens in ``externalized`` as (token, modality) for
+        # the router to speak or gesture.
+        self.partition: Optional[Callable[[str], bool]] = None
+        self.forwarded: list = []
+        self.externalized: list = []
 
         # Load glyph pool and persisted state
         self._load_glyph_pool(self.glyph_list_path)
         self._load_state()
+        self.glyph_atlas = None
+        if glyph_atlas:
+            from glyph_atlas import get_atlas
+            self.glyph_atlas = get_atlas()
+            self.glyph_atlas.add(self.glyph_pool)
 
         from glyph_decision_engine import AGIDecision
         self.glyph_decider = AGIDecision(self.glyph_pool)
@@ -92,17 +153,55 @@ class SKGEngine:
         os.makedirs(self.log_dir, exist_ok=True)
         self.adj_log = os.path.join(self.log_dir, "adjacency_walk.log")
         self.weight_log = os.path.join(self.log_dir, "weight_updates.log")
+        if comm_enabled:
+            self.enable_communication()
 
     def enable_communication(self, enabled: bool = True) -> None:
         """Toggle engine-to-engine communication."""
         self.comm_enabled = enabled
+        if enabled and hasattr(self.publisher, "listen"):
+            # Let subscribers connect before the first token is published
+            self.publisher.listen()
+
+    @property
+    def publisher(self):
+        """Transport this engine's externalized tokens are published on."""
+        if self._publisher is None:
+            self._publisher = open_transport(self.comm_out_file)
+        return self._publisher
+
+    @property
+    def subscriber_id(self) -> str:
+        """Name under which this engine commits its stream offsets."""
+        return hashlib.sha1(os.path.abspath(self.memory_path).encode("utf-8")).hexdigest()[:12]
 
     def subscribe_to_engine(self, stream_path: str) -> None:
-        """Subscribe to another engine's output stream."""
+        """
+        Subscribe to another engine's output stream (its transport address).
+
+        On the file transport the subscription resumes from this engine's
+        committed offset, replaying what was published while it was down.
+        Received tokens go through :attr:`inbound`, a bounded queue drained
+        into :meth:`think_batch` by one consumer thread.  Durable transports
+        offer losslessly: their offsets are committed only once the tokens
+        have been thought about, and a full queue holds back the stream
+        instead of dropping it.
+        """
         if not self.comm_enabled:
             return
-        t = subscribe_to_stream(stream_path, lambda tok: self.recursive_thought_loop(tok))
-        self._subscriptions.append(t)
+        if self.inbound is None:
+            self.inbound = InboundQueue(self.think_batch)
+        transport = open_transport(stream_path)
+        lossless = getattr(transport, "durable", False)
+        transport.subscribe(
+            subscriber=self.subscriber_id,
+            batch_callback=lambda msgs: self.inbound.offer(msgs, stream_path, lossless),
+        )
+        self._subscriptions.append(transport)
+
+    def inbound_metrics(self) -> dict:
+        """Depth and counters of the inbound queue (empty if not subscribed)."""
+        return self.inbound.metrics() if self.inbound is not None else {}
 
     def _log(self, log_path: str, entry: dict) -> None:
         """Append a JSON log entry to the specified file."""
@@ -171,6 +270,31 @@ class SKGEngine:
                     self.adjacency_map = json.loads(data)
             except Exception:
                 self.adjacency_map = {}
+        if self.adjacency_sketch is not None:
+            sketch_path = os.path.join(self.memory_path, "adjacency_sketch.npz")
+            if os.path.exists(sketch_path):
+                loaded = type(self.adjacency_sketch).load(sketch_path)
+                if loaded is not None:
+                    self.adjacency_sketch = loaded
+            self._sync_adjacency_from_sketch()
+
+    def _sync_adjacency_from_sketch(self) -> None:
+        """Expose the sketch's retained neighbors through ``adjacency_map``."""
+        self.adjacency_map = {
+            token: self.adjacency_sketch.neighbors(token)
+            for token in self.adjacency_sketch.top
+        }
+
+    def merge_adjacency_sketch(self, other) -> None:
+        """Combine a sketch built by another worker into this engine's sketch."""
+        if self.adjacency_sketch is None:
+            raise ValueError("Engine is not running in approximate adjacency mode")
+        self.adjacency_sketch.merge(other)
+        self._sync_adjacency_from_sketch()
+        for token, neighbors in self.adjacency_map.items():
+            for adj_token in neighbors:
+                self.graph.connect("global", token, adj_token)
+        self._sketch_unsaved += 1
 
     def save_state(self) -> None:
         """Persist token and adjacency maps to disk."""
@@ -208,6 +332,22 @@ class SKGEngine:
                     f.write(data)
         except Exception:
             pass
+        # The compressed sketch is only rewritten every SKETCH_SAVE_EVERY
+        # updates; see save_sketch().
+        if self._sketch_unsaved >= config.SKETCH_SAVE_EVERY:
+            self.save_sketch()
+
+    def save_sketch(self) -> None:
+        """Write pending adjacency sketch updates to ``adjacency_sketch.npz``."""
+        if self.adjacency_sketch is None or not self._sketch_unsaved:
+            return
+        path = os.path.join(self.memory_path, "adjacency_sketch.npz")
+        try:
+            self.adjacency_sketch.save(path)
+        except Exception as e:
+            print(f"[SKGEngine] Error saving adjacency sketch to '{path}': {e}")
+            return
+        self._sketch_unsaved = 0
 
     def update_glyph_weight(self, glyph: dict) -> dict:
         """Increment the text weight for a glyph and log the update."""
@@ -270,14 +410,33 @@ class SKGEngine:
         for adj in adjacencies:
             adj_token = adj.get("token", adj) if isinstance(adj, dict) else adj
             weight = adj.get("weight", 1) if isinstance(adj, dict) else 1
-            mapping[adj_token] = mapping.get(adj_token, 0) + weight
+            if self.adjacency_sketch is not None:
+                self.adjacency_sketch.add(token, adj_token, weight)
+            else:
+                mapping[adj_token] = mapping.get(adj_token, 0) + weight
             # Add an edge in the superknowledge graph
             self.graph.connect("global", token, adj_token)
+        if self.adjacency_sketch is not None:
+            self.adjacency_map[token] = self.adjacency_sketch.neighbors(token)
+            self._sketch_unsaved += 1
         self.save_state()
 
     def get_adjacencies_for_token(self, token: str) -> dict:
         return self.adjacency_map.get(token, {})
 
+    def similar_tokens(self, token: str, modality: str = "audio", k: int = 5) -> list:
+        """
+        Return up to ``k`` ``(token, similarity)`` pairs whose ``"audio"`` or
+        ``"image"`` spectra are closest to ``token``'s.  Only tokens whose
+        modalities have been materialized are indexed.
+        """
+        try:
+            from spectral_index import open_index
+        except Exception:
+            return []
+        index = open_index(os.path.join(config.GLYPH_OUTPUT_DIR, "spectral"), modality)
+        return index.neighbors(token, k)
+
     def recursive_thought_loop(self, token: str, depth: int = 0, max_depth: int = 5, parent: Optional[str] = None) -> list:
         """
         Recursively traverse adjacent tokens up to a maximum depth.  At each
@@ -313,9 +472,25 @@ class SKGEngine:
         result = [current_glyph]
         for slot_index, adj_token in enumerate(adjacents.keys()):
             self.thought_tracker.log_adjacency(token, adj_token, slot_index, weight_delta=adjacents[adj_token])
+            if self.partition is not None and not self.partition(adj_token):
+                # Owned by another cluster worker; the router continues there
+                self.forwarded.append((adj_token, depth + 1, token))
+                continue
             result.extend(self.recursive_thought_loop(adj_token, depth + 1, max_depth, parent=token))
         return result
 
+    def think_batch(self, tokens: list, max_depth: int = 5) -> dict:
+        """
+        Run thought loops for a batch of tokens, e.g. a replayed stream
+        backlog.  Repeated tokens are thought about once; the result maps
+        each distinct token to its traversal.
+        """
+        results = {}
+        with self.state_lock:
+            for token in dict.fromkeys(tokens):
+                results[token] = self.recursive_thought_loop(token, max_depth=max_depth)
+        return results
+
     def evaluate_agency_gate(self, token: str) -> tuple[str, str, float]:
         """
         Determine which agency gate should fire for the given token.  A simple
@@ -353,19 +528,35 @@ class SKGEngine:
         display = glyph.get("glyph_id", glyph) if isinstance(glyph, dict) else glyph
         weight = glyph.get("modalities", {}).get("text", {}).get("weight") if isinstance(glyph, dict) else None
         print(f"[SKGEngine] Externalizing '{token}' → '{display}' (weight: {weight if weight is not None else 'N/A'}, modality: {modality})")
+        if self.partition is not None:
+            self.externalized.append((token, modality))
         if modality == "speak" and speak and self.speech_enabled:
-            speak(token)
+            # Thoughts supersede each other while waiting to be spoken
+            speak(token, channel="thought")
         elif modality == "gesture" and display_gesture and self.gesture_enabled:
             display_gesture(token)
         self.externalized_last = True
         self.last_modality = modality
+        # Externalized glyphs are the ones worth rendering: queue the pending
+        # media for the chosen modality (a no-op if the glyph was never built).
+        if lazy_materialization_enabled():
+            kinds = ["audio"] if modality == "speak" else ["image"]
+            try:
+                submit_modalities(token, kinds)
+            except Exception as e:
+                print(f"[SKGEngine] Error queueing modalities for '{token}': {e}")
         if self.comm_enabled:
-            write_message(self.comm_out_file, token, display)
+            self.publisher.publish([{"token": token, "glyph": display, "source": self.subscriber_id}])
 
     def add_glyph_to_pool(self, glyph: str) -> None:
         self.glyph_pool.append(glyph)
         if hasattr(self, "glyph_decider"):
             self.glyph_decider.glyph_pool = self.glyph_pool
+        if self.glyph_atlas is not None and glyph not in self.glyph_atlas:
+            try:
+                self.glyph_atlas.add([glyph])
+            except Exception as e:
+                print(f"[SKGEngine] Error adding '{glyph}' to glyph atlas: {e}")
 
     def traverse_superknowledge(self, start_token: str, steps: int = 5) -> list:
         return self.graph.traverse(start_token, max_steps=steps)
@@ -398,6 +589,8 @@ class SKGEngine:
     def process_token(self, token: str) -> dict:
         """High level pipeline for CLI use."""
         glyph = build_glyph_if_needed(token)
+        if lazy_materialization_enabled():
+            glyph = ensure_modalities(token, ["audio"]) or glyph
         self.update_adjacency_map(token, glyph.get("adjacents", []))
         result = self.assign_glyph_to_token(token, glyph.get("adjacents", []))
         fft_image = glyph.get("modalities", {}).get("visual", {}).get("fft_visual")
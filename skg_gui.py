@@ -3,9 +3,18 @@ import json
 import queue
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
+from PIL import ImageTk
 from typing import Optional
 
+import config
+from glyph_atlas import get_atlas
+from glyph_builder import lazy_materialization_enabled
+from job_queue import PRIORITY_INTERACTIVE, submit_modalities
+from thumbnails import PhotoCache, load_thumbnail
+
+# Modality kinds shown in the display panels
+DISPLAY_KINDS = ("audio", "image")
+
 class SKGGUI:
     """Simple Tkinter interface for SKGEngine."""
 
@@ -16,6 +25,12 @@ class SKGGUI:
 
         self.update_queue: queue.Queue = queue.Queue()
         self.images: dict[str, ImageTk.PhotoImage] = {}
+        # Decoded panel images; webcam frames are not worth a thumbnail file
+        self.photos = PhotoCache(lambda p: ImageTk.PhotoImage(load_thumbnail(p)))
+        self.frames = PhotoCache(
+            lambda p: ImageTk.PhotoImage(load_thumbnail(p, persist=False)), max_items=8
+        )
+        self.atlas = getattr(engine, "glyph_atlas", None) or get_atlas()
 
         # Layout frames for four panels
         self.video_frame = tk.Frame(self.root)
@@ -92,22 +107,35 @@ class SKGGUI:
         self.update_queue.put(glyph)
 
     def _update_display(self, glyph: dict) -> None:
+        pending = glyph.get("modalities", {}).get("pending", [])
+        kinds = [k for k in DISPLAY_KINDS if k in pending]
+        if kinds and glyph.get("token") and lazy_materialization_enabled():
+            # Generate the missing media in the background and redisplay
+            submit_modalities(glyph["token"], kinds, PRIORITY_INTERACTIVE, self._on_materialized)
         visual = glyph.get("modalities", {}).get("visual", {})
         audio_mod = glyph.get("modalities", {}).get("audio", {})
         glyph_path = visual.get("symbolic_image")
         audio_fft = audio_mod.get("fft_audio")
         img_fft = visual.get("fft_from_image") or visual.get("fft_visual")
 
-        self._set_image(self.avatar_label, glyph_path, "avatar")
+        glyph_id = glyph.get("glyph_id")
+        if glyph_id in self.atlas:
+            self._set_sprite(self.avatar_label, glyph_id, "avatar")
+        else:
+            self._set_image(self.avatar_label, glyph_path, "avatar")
         self._set_image(self.audio_fft_label, audio_fft, "audio")
         self._set_image(self.image_fft_label, img_fft, "imgfft")
         self.update_memory_list()
 
+    def _on_materialized(self, glyph: Optional[dict]) -> None:
+        """Job queue callback; runs on a worker thread."""
+        if glyph:
+            self.update_queue.put(glyph)
+
     def _set_image(self, label: tk.Label, path: Optional[str], key: str) -> None:
         if path and os.path.exists(path):
             try:
-                img = Image.open(path).resize((256, 256))
-                photo = ImageTk.PhotoImage(img)
+                photo = self.photos.get(path)
                 label.config(image=photo, text="")
                 self.images[key] = photo
             except Exception:
@@ -115,6 +143,16 @@ class SKGGUI:
         else:
             label.config(text="No image", image="")
 
+    def _set_sprite(self, label: tk.Label, glyph_id: str, key: str) -> None:
+        """Show ``glyph_id`` blitted from the glyph atlas."""
+        size = config.THUMBNAIL_SIZE
+        photo = self.photos.lookup(
+            ("atlas", glyph_id, size),
+            lambda: ImageTk.PhotoImage(self.atlas.sprite(glyph_id, size)),
+        )
+        label.config(image=photo, text="")
+        self.images[key] = photo
+
     def update_memory_list(self) -> None:
         self.memory_list.delete(0, tk.END)
         for token in sorted(self.engine.token_map.keys()):
@@ -133,8 +171,7 @@ class SKGGUI:
         """Display the latest webcam frame."""
         if path and os.path.exists(path):
             try:
-                img = Image.open(path).resize((256, 256))
-                photo = ImageTk.PhotoImage(img)
+                photo = self.frames.get(path)
                 self.video_label.config(image=photo, text="")
                 self.images["video"] = photo
             except Exception:
@@ -0,0 +1,261 @@
+"""Spectral fingerprints and a similarity index over modality FFTs.
+
+Each token's audio spectrum is reduced to mel-spaced band energies and its
+sigil image to radial band energies of its 2-D spectrum.  Fingerprints are
+L2-normalized float32 vectors stored as rows of one memory-mapped matrix per
+modality, so cosine top-k search over 100k tokens is a single matrix-vector
+product.  This gives the engine "tokens that sound/look alike" neighbors.
+"""
+
+import os
+import json
+import atexit
+import argparse
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from file_lock import FileLock
+
+AUDIO_BANDS = 64
+IMAGE_BANDS = 32
+# Inserted rows are msync'ed to disk in batches of this many
+FLUSH_EVERY = 64
+# Assumed sample rate for legacy spectra saved without metadata
+DEFAULT_SAMPLE_RATE = 22050
+
+
+def _normalize(vec: np.ndarray) -> np.ndarray:
+    vec = vec.astype(np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+def _mel(freq: np.ndarray) -> np.ndarray:
+    return 2595.0 * np.log10(1.0 + freq / 700.0)
+
+
+def _mel_inverse(mel: np.ndarray) -> np.ndarray:
+    return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+
+def audio_fingerprint(magnitude: np.ndarray, bin_hz: float, n_bands: int = AUDIO_BANDS) -> np.ndarray:
+    """Return log mel-band energies of a half spectrum, L2-normalized."""
+    n = len(magnitude)
+    nyquist = bin_hz * max(n - 1, 1)
+    edges_hz = _mel_inverse(np.linspace(_mel(np.float64(20.0)), _mel(np.float64(nyquist)), n_bands + 1))
+    edges = np.clip(np.round(edges_hz / bin_hz).astype(np.intp), 0, n)
+    cumulative = np.concatenate(([0.0], np.cumsum(np.square(magnitude, dtype=np.float64))))
+    energies = cumulative[edges[1:]] - cumulative[edges[:-1]]
+    return _normalize(np.log1p(energies))
+
+
+@lru_cache(maxsize=16)
+def _radial_bands(shape: tuple[int, int], n_bands: int) -> np.ndarray:
+    y, x = np.ogrid[: shape[0], : shape[1]]
+    distance = np.sqrt((x - shape[1] // 2) ** 2 + (y - shape[0] // 2) ** 2)
+    bands = np.minimum((distance / distance.max() * n_bands).astype(np.intp), n_bands - 1)
+    return bands.ravel()
+
+
+def image_fingerprint(image: np.ndarray, n_bands: int = IMAGE_BANDS) -> np.ndarray:
+    """Return log radial-band energies of a grayscale image's spectrum."""
+    power = np.abs(np.fft.fftshift(np.fft.fft2(image))) ** 2
+    energies = np.bincount(
+        _radial_bands(image.shape, n_bands), weights=power.ravel(), minlength=n_bands
+    )
+    return _normalize(np.log1p(energies))
+
+
+def fingerprint_audio_file(path: str) -> np.ndarray:
+    """Fingerprint a stored audio FFT artifact (``.npz`` or legacy ``.npy``)."""
+    from fft_generator import load_audio_spectrum
+    magnitude, meta = load_audio_spectrum(path)
+    bin_hz = meta.get("bin_hz") or (DEFAULT_SAMPLE_RATE / 2) / max(len(magnitude) - 1, 1)
+    return audio_fingerprint(magnitude, bin_hz)
+
+
+def fingerprint_image_file(path: str, max_dim: int = 128) -> np.ndarray:
+    """Fingerprint an image file (e.g. a glyph sigil) by its 2-D spectrum."""
+    from generate_fft_from_image import _load_grayscale
+    return image_fingerprint(_load_grayscale(path, max_dim).astype(np.float32))
+
+
+class SpectralIndex:
+    """
+    Memory-mapped matrix of fingerprints with cosine top-k search.
+
+    Rows live in ``<path>.npy`` (grown by doubling) and the token of each row
+    is appended to ``<path>.tokens`` as a JSON line.  Inserts and searches
+    first pick up rows added by other processes, and inserts hold a
+    cross-process lock on ``<path>.lock``, so several workers can share one
+    index.  Rows are
+    flushed to disk every :data:`FLUSH_EVERY` inserts and by :meth:`flush`.
+    """
+
+    def __init__(self, path: str, dim: int) -> None:
+        self.matrix_path = path + ".npy"
+        self.tokens_path = path + ".tokens"
+        self.dim = dim
+        self.tokens: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path + ".lock")
+        self._tokens_offset = 0
+        self._matrix_ino: int | None = None
+        self._unflushed = 0
+        with self._file_lock:
+            if not os.path.exists(self.matrix_path):
+                np.lib.format.open_memmap(
+                    self.matrix_path, mode="w+", dtype=np.float32, shape=(1024, dim)
+                ).flush()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def _refresh(self) -> None:
+        """Load token lines and matrix growth written since the last call."""
+        try:
+            with open(self.tokens_path, "rb") as f:
+                f.seek(self._tokens_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    self._tokens_offset += len(line)
+                    token, row = json.loads(line)
+                    if row == len(self.tokens):
+                        self.tokens.append(token)
+                    self.rows[token] = row
+        except OSError:
+            pass
+        ino = os.stat(self.matrix_path).st_ino
+        if ino != self._matrix_ino:
+            # First open, or another process grew the matrix
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+            self._matrix_ino = ino
+
+    def _grow(self) -> None:
+        capacity = self.matrix.shape[0] * 2
+        tmp_path = self.matrix_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        grown[: len(self.tokens)] = self.matrix[: len(self.tokens)]
+        grown.flush()
+        del grown
+        self.matrix.flush()
+        del self.matrix
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+        self._matrix_ino = os.stat(self.matrix_path).st_ino
+        self._unflushed = 0
+
+    def add(self, token: str, fingerprint: np.ndarray) -> None:
+        """Insert or replace the fingerprint of ``token``."""
+        vec = _normalize(np.asarray(fingerprint).ravel())
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"Fingerprint has {vec.shape[0]} values, index expects {self.dim}")
+        with self._lock, self._file_lock:
+            self._refresh()
+            row = self.rows.get(token)
+            if row is None:
+                if len(self.tokens) >= self.matrix.shape[0]:
+                    self._grow()
+                row = len(self.tokens)
+                self.tokens.append(token)
+                self.rows[token] = row
+                with open(self.tokens_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([token, row]) + "\n")
+                self._tokens_offset = os.path.getsize(self.tokens_path)
+            self.matrix[row] = vec
+            self._unflushed += 1
+            if self._unflushed >= FLUSH_EVERY:
+                self.matrix.flush()
+                self._unflushed = 0
+
+    def flush(self) -> None:
+        """Write inserted rows that are not yet on disk."""
+        with self._lock:
+            if self._unflushed:
+                self.matrix.flush()
+                self._unflushed = 0
+
+    def search(self, fingerprint: np.ndarray, k: int = 5, exclude: str | None = None) -> list[tuple[str, float]]:
+        """Return up to ``k`` ``(token, cosine similarity)`` pairs, best first."""
+        with self._lock:
+            self._refresh()
+            n = len(self.tokens)
+            if n == 0:
+                return []
+            scores = self.matrix[:n] @ _normalize(np.asarray(fingerprint).ravel())
+            if exclude is not None and exclude in self.rows:
+                scores[self.rows[exclude]] = -np.inf
+            k = min(k, n - (1 if exclude in self.rows else 0))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.tokens[i], float(scores[i])) for i in top]
+
+    def neighbors(self, token: str, k: int = 5) -> list[tuple[str, float]]:
+        """Return the ``k`` tokens most similar to an indexed ``token``."""
+        row = self.rows.get(token)
+        if row is None:
+            return []
+        return self.search(np.array(self.matrix[row]), k, exclude=token)
+
+
+_MODALITY_DIMS = {"audio": AUDIO_BANDS, "image": IMAGE_BANDS}
+_indexes: dict[str, SpectralIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def open_index(directory: str, modality: str) -> SpectralIndex:
+    """Return the shared ``audio`` or ``image`` index stored in ``directory``."""
+    path = os.path.abspath(os.path.join(directory, modality))
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = SpectralIndex(path, _MODALITY_DIMS[modality])
+        return index
+
+
+@atexit.register
+def flush_indexes() -> None:
+    """Flush every index opened through :func:`open_index`."""
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.flush()
+
+
+def index_glyph(glyph: dict, directory: str) -> None:
+    """Add the fingerprints of a glyph's materialized modalities to the index."""
+    token = glyph.get("token")
+    modalities = glyph.get("modalities", {})
+    fft_audio = modalities.get("audio", {}).get("fft_audio")
+    sigil = modalities.get("visual", {}).get("symbolic_image")
+    if token and fft_audio and os.path.exists(fft_audio):
+        open_index(directory, "audio").add(token, fingerprint_audio_file(fft_audio))
+    if token and sigil and os.path.exists(sigil):
+        open_index(directory, "image").add(token, fingerprint_image_file(sigil))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build spectral fingerprint indexes from glyph files")
+    parser.add_argument("glyph_dir", help="Directory containing glyph JSON files")
+    parser.add_argument("--out", default=None, help="Index directory (default: <glyph_dir>/spectral)")
+    args = parser.parse_args()
+    out_dir = args.out or os.path.join(args.glyph_dir, "spectral")
+    count = 0
+    for name in sorted(os.listdir(args.glyph_dir)):
+        if not name.endswith(".json") or name == "manifest.json":
+            continue
+        try:
+            with open(os.path.join(args.glyph_dir, name), "r", encoding="utf-8") as f:
+                index_glyph(json.load(f), out_dir)
+            count += 1
+        except Exception as e:
+            print(f"[SpectralIndex] Skipping {name}: {e}")
+    print(f"[SpectralIndex] Indexed {count} glyphs into {out_dir}")
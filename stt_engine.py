@@ -1,4 +1,5 @@
 import os
+import threading
 from datetime import datetime
 
 try:
@@ -7,9 +8,74 @@ except Exception:
     sr = None  # type: ignore
 
 try:
-    from fft_generator import generate_fft_from_audio
+    from fft_generator import generate_stft_from_audio
 except Exception:
-    generate_fft_from_audio = None  # type: ignore
+    generate_stft_from_audio = None  # type: ignore
+
+
+_local = threading.local()
+
+
+def recording_fft(
+    audio_path: str,
+    fft_dir: str = "modalities/fft_audio",
+    image_dir: str = "modalities/fft_visual",
+) -> str | None:
+    """
+    Generate a streaming spectrogram and image for a captured WAV file;
+    memory stays constant however long the capture is.  Returns the
+    spectrogram path, or ``None`` on failure.
+    """
+    if generate_stft_from_audio is None:
+        return None
+    try:
+        os.makedirs(fft_dir, exist_ok=True)
+        os.makedirs(image_dir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(audio_path))[0]
+        spectrogram_path = os.path.join(fft_dir, f"{base}_stft.npy")
+        fft_image_path = os.path.join(image_dir, f"{base}.png")
+        if generate_stft_from_audio(audio_path, spectrogram_path, fft_image_path) is None:
+            return None
+        return spectrogram_path
+    except Exception as e:
+        print(f"[STT] Error generating FFT: {e}")
+        return None
+
+
+def _recognize(recognizer, audio) -> str:
+    """Transcribe ``audio`` online, falling back to offline Sphinx."""
+    try:
+        text = recognizer.recognize_google(audio)
+        print(f"[STT] Transcribed: {text}")
+        return text
+    except sr.RequestError:
+        print("[STT] API unavailable, trying offline recognition")
+        try:
+            text = recognizer.recognize_sphinx(audio)
+            print(f"[STT] Transcribed (Sphinx): {text}")
+            return text
+        except Exception as e:
+            print(f"[STT] Offline recognition failed: {e}")
+    except sr.UnknownValueError:
+        print("[STT] Unable to recognize speech")
+    return ""
+
+
+def recognize_samples(samples, rate: int) -> str:
+    """
+    Transcribe mono 16-bit PCM ``samples`` (a NumPy array) captured at
+    ``rate`` Hz.  Each calling thread reuses its own ``Recognizer``.
+    """
+    if sr is None:
+        return ""
+    recognizer = getattr(_local, "recognizer", None)
+    if recognizer is None:
+        recognizer = _local.recognizer = sr.Recognizer()
+    try:
+        return _recognize(recognizer, sr.AudioData(samples.tobytes(), rate, 2))
+    except Exception as e:
+        print(f"[STT] Error transcribing segment: {e}")
+        return ""
 
 
 def transcribe_speech(timeout: int = 5, phrase_time_limit: int = 5) -> tuple[str, str | None]:
@@ -41,33 +107,13 @@ def transcribe_speech(timeout: int = 5, phrase_time_limit: int = 5) -> tuple[str
         except Exception as e:
             print(f"[STT] Failed to save microphone audio: {e}")
 
-        # Generate FFT data and image for the captured file
-        if audio_path and generate_fft_from_audio:
-            try:
-                os.makedirs("modalities/fft_audio", exist_ok=True)
-                os.makedirs("modalities/fft_visual", exist_ok=True)
-                base = os.path.splitext(os.path.basename(audio_path))[0]
-                fft_data_path = os.path.join("modalities/fft_audio", f"{base}.npy")
-                fft_image_path = os.path.join("modalities/fft_visual", f"{base}.png")
-                generate_fft_from_audio(audio_path, fft_data_path, fft_image_path)
-            except Exception as e:
-                print(f"[STT] Error generating FFT: {e}")
+        if audio_path:
+            recording_fft(audio_path)
 
         # Perform transcription
-        try:
-            text = recognizer.recognize_google(audio)
-            print(f"[STT] Transcribed: {text}")
+        text = _recognize(recognizer, audio)
+        if text:
             return text, audio_path
-        except sr.RequestError:
-            print("[STT] API unavailable, trying offline recognition")
-            try:
-                text = recognizer.recognize_sphinx(audio)
-                print(f"[STT] Transcribed (Sphinx): {text}")
-                return text, audio_path
-            except Exception as e:
-                print(f"[STT] Offline recognition failed: {e}")
-        except sr.UnknownValueError:
-            print("[STT] Unable to recognize speech")
     except Exception as e:
         print(f"[STT] Error while capturing audio: {e}")
 
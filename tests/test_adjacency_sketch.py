@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+try:
+    from adjacency_sketch import AdjacencySketch
+except Exception:
+    AdjacencySketch = None
+
+from skg_engine import SKGEngine
+
+
+class TestAdjacencySketch(unittest.TestCase):
+    def setUp(self):
+        if AdjacencySketch is None:
+            self.skipTest('numpy not available')
+
+    def test_estimates_within_bound(self):
+        sketch = AdjacencySketch(epsilon=0.01, delta=0.01, top_k=3)
+        for i in range(200):
+            sketch.add('fire', f'adj{i % 20}', 1)
+        for i in range(20):
+            est = sketch.estimate('fire', f'adj{i}')
+            self.assertGreaterEqual(est, 10)
+            self.assertLessEqual(est, 10 + sketch.error_bound())
+        self.assertEqual(len(sketch.neighbors('fire')), 3)
+
+    def test_merge_matches_single_sketch(self):
+        a = AdjacencySketch(epsilon=0.01, delta=0.01, top_k=2)
+        b = AdjacencySketch(epsilon=0.01, delta=0.01, top_k=2)
+        a.add('fire', 'heat', 3)
+        b.add('fire', 'heat', 2)
+        b.add('fire', 'smoke', 4)
+        b.add('fire', 'ash', 1)
+        a.merge(b)
+        self.assertEqual(a.total, 10)
+        self.assertGreaterEqual(a.estimate('fire', 'heat'), 5)
+        self.assertEqual(set(a.neighbors('fire')), {'heat', 'smoke'})
+        with self.assertRaises(ValueError):
+            a.merge(AdjacencySketch(epsilon=0.1))
+
+    def test_engine_approximate_mode_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = SKGEngine(tmp, approximate_adjacency=True)
+            engine.update_adjacency_map('fire', ['heat', 'heat', 'smoke'])
+            adjs = engine.get_adjacencies_for_token('fire')
+            self.assertGreaterEqual(adjs['heat'], 2)
+            self.assertIn('smoke', adjs)
+            # The map holds a copy; editing it leaves the sketch untouched
+            adjs['smoke'] = 100
+            self.assertLess(engine.adjacency_sketch.neighbors('fire')['smoke'], 100)
+
+            engine.save_sketch()
+            engine2 = SKGEngine(tmp, approximate_adjacency=True)
+            self.assertIn('heat', engine2.get_adjacencies_for_token('fire'))
+
+    def test_engine_saves_sketch_in_batches(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('config.SKETCH_SAVE_EVERY', 3):
+            path = os.path.join(tmp, 'adjacency_sketch.npz')
+            engine = SKGEngine(tmp, approximate_adjacency=True)
+            engine.update_adjacency_map('fire', ['heat'])
+            engine.update_adjacency_map('fire', ['smoke'])
+            self.assertFalse(os.path.exists(path))
+            engine.update_adjacency_map('fire', ['ash'])
+            self.assertTrue(os.path.exists(path))
+            engine.update_adjacency_map('water', ['steam'])
+            engine.save_sketch()
+            reloaded = SKGEngine(tmp, approximate_adjacency=True)
+            self.assertIn('steam', reloaded.get_adjacencies_for_token('water'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from artifact_cache import ArtifactCache
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+
+class TestArtifactCache(unittest.TestCase):
+    def test_key_depends_on_parameters(self):
+        k1 = ArtifactCache.key('tts', text='fire', voice=None, rate=160)
+        k2 = ArtifactCache.key('tts', rate=160, voice=None, text='fire')
+        k3 = ArtifactCache.key('tts', text='fire', voice=None, rate=200)
+        self.assertEqual(k1, k2)
+        self.assertNotEqual(k1, k3)
+
+    def test_store_and_lookup_survive_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ArtifactCache(tmp)
+            key = cache.key('tts', text='fire')
+            path = cache.path('audio', key, '.wav')
+            self.assertIsNone(cache.lookup(key))
+            _write(path, 10)
+            cache.store(key, [path])
+            self.assertEqual(ArtifactCache(tmp).lookup(key), [path])
+            os.remove(path)
+            self.assertIsNone(cache.lookup(key))
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ArtifactCache(tmp, max_bytes=250)
+            paths = []
+            for i in range(3):
+                key = cache.key('tts', text=str(i))
+                path = cache.path('audio', key, '.wav')
+                _write(path, 100)
+                cache.store(key, [path])
+                paths.append((key, path))
+                if i == 1:
+                    # Touch the first entry so the second becomes the LRU
+                    self.assertIsNotNone(cache.lookup(paths[0][0]))
+            self.assertTrue(os.path.exists(paths[0][1]))
+            self.assertFalse(os.path.exists(paths[1][1]))
+            self.assertTrue(os.path.exists(paths[2][1]))
+            self.assertIsNone(cache.lookup(paths[1][0]))
+
+    def test_store_appends_to_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ArtifactCache(tmp)
+            for i in range(3):
+                key = cache.key('tts', text=str(i))
+                path = cache.path('audio', key, '.wav')
+                _write(path, 10)
+                cache.store(key, [path])
+            self.assertFalse(os.path.exists(cache.index_path))
+            with open(cache.journal_path, encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 3)
+            # Another instance (e.g. another process) sees the journaled entries
+            self.assertEqual(ArtifactCache(tmp).lookup(key), [path])
+            cache.flush()
+            self.assertEqual(os.path.getsize(cache.journal_path), 0)
+            self.assertEqual(ArtifactCache(tmp).lookup(key), [path])
+
+    def test_eviction_stops_at_low_watermark_and_skips_untracked(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ArtifactCache(tmp, max_bytes=1000)
+            photo = os.path.join(tmp, 'images', 'photo.jpg')
+            _write(photo, 5000)
+            paths = []
+            for i in range(11):
+                key = cache.key('tts', text=str(i))
+                path = cache.path('audio', key, '.wav')
+                _write(path, 100)
+                cache.store(key, [path])
+                paths.append(path)
+            # 1100 bytes exceed the budget; trimmed to 800, not just to 1000
+            self.assertEqual([os.path.exists(p) for p in paths], [False] * 3 + [True] * 8)
+            self.assertTrue(os.path.exists(photo))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+import wave
+
+try:
+    import numpy as np
+    from audio_stream import EnergySegmenter, RingBuffer, SpeechStream, WavFileSource
+except Exception:
+    np = None
+
+
+def write_bursts(path, rate=16000, bursts=((0.5, 1.0), (2.0, 2.6), (3.5, 4.5)), seconds=5.0):
+    """Write a WAV with tone bursts at the given (start, end) times over low noise."""
+    t = np.arange(int(rate * seconds)) / rate
+    signal = np.random.default_rng(0).normal(0, 30, len(t))
+    for start, end in bursts:
+        mask = (t >= start) & (t < end)
+        signal[mask] += 8000 * np.sin(2 * np.pi * 220 * t[mask])
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(signal.astype(np.int16).tobytes())
+
+
+class TestAudioStream(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy not available')
+
+    def test_ring_buffer_wraps_and_drops(self):
+        ring = RingBuffer(8)
+        ring.write(np.arange(6, dtype=np.int16))
+        self.assertEqual(ring.read(4).tolist(), [0, 1, 2, 3])
+        ring.write(np.arange(6, 16, dtype=np.int16))
+        self.assertEqual(ring.dropped, 4)
+        self.assertEqual(ring.read(100).tolist(), list(range(8, 16)))
+        ring.close()
+        self.assertIsNone(ring.read(1))
+
+    def test_blocking_ring_buffer_waits_for_reader(self):
+        ring = RingBuffer(8, block=True)
+        writer = threading.Thread(target=ring.write, args=(np.arange(20, dtype=np.int16),))
+        writer.start()
+        received = []
+        while len(received) < 20:
+            received.extend(ring.read(3, timeout=5).tolist())
+        writer.join(5)
+        self.assertEqual(received, list(range(20)))
+        self.assertEqual(ring.dropped, 0)
+
+    def test_segmenter_finds_bursts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'in.wav')
+            write_bursts(path)
+            source = WavFileSource(path, block=777)
+            segmenter = EnergySegmenter(source.rate)
+            found = []
+            while (block := source.read()) is not None:
+                found.extend(segmenter.feed(block))
+            found.extend(segmenter.flush())
+            source.close()
+            starts = [round(start / source.rate, 1) for start, _ in found]
+            self.assertEqual(len(found), 3)
+            for start, expected in zip(starts, (0.5, 2.0, 3.5)):
+                self.assertAlmostEqual(start, expected - 0.2, delta=0.1)
+
+    def test_stream_transcribes_in_order_with_fft(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'in.wav')
+            write_bursts(path)
+            ffts = []
+            stream = SpeechStream(
+                WavFileSource(path),
+                transcribe=lambda samples, rate: f'{len(samples) / rate:.1f}s',
+                fft=ffts.append,
+                workers=3,
+                output_dir=os.path.join(tmp, 'segments'),
+            )
+            segments = list(stream.start().results(timeout=10))
+            self.assertEqual(len(segments), 3)
+            self.assertEqual([s.start for s in segments], sorted(s.start for s in segments))
+            self.assertTrue(all(os.path.exists(s.audio_path) for s in segments))
+            self.assertEqual(sorted(ffts), sorted(s.audio_path for s in segments))
+            self.assertEqual(stream.ring.dropped, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from engine_cluster import EngineCluster, partition_for
+
+
+class TestEngineCluster(unittest.TestCase):
+    def test_partitions_are_stable_and_cover_all_workers(self):
+        tokens = [f'token{i}' for i in range(200)]
+        self.assertEqual([partition_for(t, 4) for t in tokens], [partition_for(t, 4) for t in tokens])
+        self.assertEqual({partition_for(t, 4) for t in tokens}, {0, 1, 2, 3})
+        # Case and whitespace do not change ownership (TokenFusion canonical form)
+        self.assertEqual(partition_for(' Fire ', 4), partition_for('fire', 4))
+
+    def test_thought_loop_crosses_partitions(self):
+        tokens = [f'w{i}' for i in range(50)]
+        start = tokens[0]
+        remote = [t for t in tokens if partition_for(t, 2) != partition_for(start, 2)][:2]
+        with tempfile.TemporaryDirectory() as tmp:
+            with EngineCluster(2, tmp, glyph_path=None) as cluster:
+                merged = cluster.update_adjacency_map(start, remote)
+                self.assertEqual(set(merged), set(remote))
+                glyphs = cluster.recursive_thought_loop(start, max_depth=3)
+            self.assertEqual([g['token'] for g in glyphs], [start] + remote)
+            # Each token was recorded by the partition that owns it
+            owner = os.path.join(tmp, f'partition_{partition_for(remote[0], 2)}', 'token_map.json')
+            with open(owner, encoding='utf-8') as f:
+                self.assertIn(remote[0], f.read())
+
+    def test_externalized_tokens_reach_the_router(self):
+        externalized = []
+        with tempfile.TemporaryDirectory() as tmp:
+            cluster = EngineCluster(
+                2, tmp, glyph_path=None,
+                on_externalize=lambda token, modality: externalized.append(token),
+            )
+            with cluster:
+                # A token's third visit raises its weight to the externalize gate
+                for _ in range(3):
+                    cluster.recursive_thought_loop('ember', max_depth=2)
+        self.assertEqual(externalized, ['ember'])
+
+    def test_requests_to_an_exited_worker_fail(self):
+        tokens = [f'w{i}' for i in range(50)]
+        with tempfile.TemporaryDirectory() as tmp:
+            with EngineCluster(2, tmp, glyph_path=None) as cluster:
+                victim = tokens[0]
+                survivor = next(t for t in tokens if cluster.owner(t) != cluster.owner(victim))
+                worker = cluster._processes[cluster.owner(victim)]
+                worker.kill()
+                worker.join(5)
+                with self.assertRaises(RuntimeError):
+                    cluster.traverse_superknowledge(victim, 1)
+                # Later requests fail at once; the other partition still serves
+                with self.assertRaises(RuntimeError):
+                    cluster.process_token(victim)
+                self.assertIsInstance(cluster.traverse_superknowledge(survivor, 1), list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest.mock import patch
+
+from engine_comm import (
+    FileTransport,
+    InboundQueue,
+    SharedMemoryTransport,
+    SocketTransport,
+    measure_latency,
+    stream_address,
+)
+
+
+def collect(transport, count, timeout=5):
+    """Subscribe to ``transport`` and return (messages, event set after ``count``)."""
+    received = []
+    done = threading.Event()
+
+    def callback(msg):
+        received.append(msg)
+        if len(received) >= count:
+            done.set()
+
+    transport.subscribe(callback)
+    return received, done
+
+
+class TestEngineComm(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def roundtrip(self, publisher, subscriber, count=50):
+        received, done = collect(subscriber, count)
+        # Attach before publishing; these transports only deliver live messages
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            publisher.publish([{'token': 'hello'}])
+            time.sleep(0.02)
+        received.clear()
+        done.clear()
+        publisher.publish([{'token': f't{i}', 'glyph': 'g'} for i in range(count)])
+        self.assertTrue(done.wait(5))
+        self.assertEqual([m['token'] for m in received[:count]], [f't{i}' for i in range(count)])
+        subscriber.close()
+        publisher.close()
+
+    def test_file_transport(self):
+        path = stream_address(self.tmp.name, 'file')
+        self.roundtrip(FileTransport(path, 0.01), FileTransport(path, 0.01))
+
+    def test_file_segments_rotate_and_expire(self):
+        stream = FileTransport(self.tmp.name, segment_bytes=200, retention=3)
+        for i in range(40):
+            stream.publish([{'token': f't{i:02d}'}])
+        bases = stream.segments()
+        self.assertEqual(len(bases), 3)
+        self.assertEqual(stream.end_offset(), 40 * len(b'{"token": "t00"}\n'))
+        # An offset from an expired segment resumes at the oldest one kept
+        messages, offset = stream.read(0, 1000)
+        self.assertEqual(offset, bases[1])
+        replayed = list(messages)
+        while True:
+            messages, next_offset = stream.read(offset, 4)
+            if next_offset == offset:
+                break
+            replayed += messages
+            offset = next_offset
+        self.assertEqual(replayed[-1]['token'], 't39')
+        self.assertEqual(len(replayed), len(set(m['token'] for m in replayed)))
+        self.assertEqual(offset, stream.end_offset())
+
+    def test_legacy_stream_file_is_migrated_by_publisher(self):
+        path = os.path.join(self.tmp.name, 'engine_stream.jsonl')
+
+        def legacy_publish(token):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(f'{{"token": "{token}", "glyph": "g"}}\n')
+
+        legacy_publish('old')
+        received = []
+        done = threading.Event()
+
+        def on_batch(msgs):
+            received.extend(m['token'] for m in msgs)
+            if 'new' in received:
+                done.set()
+
+        subscriber = FileTransport(path, 0.01)
+        self.addCleanup(subscriber.close)
+        subscriber.commit('peer', 0)
+        subscriber.subscribe(subscriber='peer', batch_callback=on_batch)
+        publisher = FileTransport(path, 0.01)
+        # Attaching leaves the legacy file for its not-yet-upgraded writer
+        self.assertTrue(os.path.isfile(path))
+        legacy_publish('legacy')
+        deadline = time.time() + 5
+        while 'legacy' not in received and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(os.path.isfile(path))
+        # The first upgraded publish migrates it; the subscriber carries on
+        publisher.publish([{'token': 'new'}])
+        self.assertTrue(os.path.isdir(path))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(received, ['old', 'legacy', 'new'])
+        # Legacy offsets stay valid once the file is segment 0
+        deadline = time.time() + 5
+        while subscriber.committed('peer') != publisher.end_offset() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(subscriber.committed('peer'), publisher.end_offset())
+
+    def test_named_subscriber_resumes_after_restart(self):
+        stream = FileTransport(self.tmp.name, 0.01)
+        stream.publish([{'token': 'first'}])
+        stream.subscribe(subscriber='peer', batch_callback=lambda msgs: None)
+        deadline = time.time() + 5
+        while stream.committed('peer') is None and time.time() < deadline:
+            time.sleep(0.01)
+            stream.publish([{'token': 'live'}])
+        stream.close()
+        time.sleep(0.05)
+        # Written while the subscriber is down
+        stream.publish([{'token': f'missed{i}'} for i in range(10)])
+        restarted = FileTransport(self.tmp.name, 0.01)
+        replay = []
+        done = threading.Event()
+
+        def on_batch(msgs):
+            replay.append([m['token'] for m in msgs])
+            if 'missed9' in replay[-1]:
+                done.set()
+
+        restarted.subscribe(subscriber='peer', batch_callback=on_batch)
+        self.assertTrue(done.wait(5))
+        restarted.close()
+        # The backlog is replayed in order, in one batch
+        self.assertEqual([t for t in replay[-1] if t.startswith('missed')], [f'missed{i}' for i in range(10)])
+
+    def test_think_batch_thinks_once_per_token(self):
+        from skg_engine import SKGEngine
+
+        engine = SKGEngine(self.tmp.name)
+        with patch.object(engine, 'recursive_thought_loop', side_effect=lambda tok, max_depth: [tok]) as loop:
+            results = engine.think_batch(['a', 'b', 'a', 'c', 'b'])
+        self.assertEqual([c.args[0] for c in loop.call_args_list], ['a', 'b', 'c'])
+        self.assertEqual(results, {'a': ['a'], 'b': ['b'], 'c': ['c']})
+
+    def test_inbound_queue_dedups_and_rate_limits(self):
+        gate = threading.Event()
+        batches = []
+
+        def handler(tokens):
+            gate.wait(5)
+            batches.append(tokens)
+
+        inbound = InboundQueue(handler, maxsize=5, dedup_ttl=60, rate=1, burst=8)
+        inbound.offer([{'token': 'echo'}, {'token': 'echo'}], 'a')
+        while inbound.metrics()['depth']:
+            time.sleep(0.001)
+        inbound.offer([{'token': f'a{i}'} for i in range(7)], 'a')
+        inbound.offer([{'token': 'b0', 'source': 'b'}], 'a')
+        gate.set()
+        inbound.join()
+        metrics = inbound.metrics()
+        self.assertEqual(metrics['duplicate'], 1)
+        # The stalled consumer holds 'echo'; the queue fills and the rest overflow
+        self.assertEqual(metrics['processed'], 6)
+        self.assertEqual(metrics['overflow'], 3)
+        self.assertLessEqual(metrics['max_depth'], 5)
+        self.assertEqual(metrics['depth'], 0)
+        # Source 'a' spent its burst of 8; 'b' has its own budget
+        self.assertEqual(inbound.offer([{'token': 'a9'}], 'a'), 0)
+        self.assertEqual(inbound.offer([{'token': 'b1', 'source': 'b'}], 'a'), 1)
+        self.assertEqual(inbound.metrics()['rate_limited'], 1)
+        inbound.join()
+        handled = [t for batch in batches for t in batch]
+        self.assertEqual(handled, ['echo', 'a0', 'a1', 'a2', 'a3', 'a4', 'b1'])
+
+    def test_file_offsets_commit_after_lossless_handling(self):
+        gate = threading.Event()
+        self.addCleanup(gate.set)
+        handled = []
+
+        def handler(tokens):
+            gate.wait(5)
+            handled.extend(tokens)
+
+        inbound = InboundQueue(handler, maxsize=2, rate=1, burst=1)
+        stream = FileTransport(self.tmp.name, 0.01)
+        self.addCleanup(stream.close)
+        stream.publish([{'token': f'm{i}'} for i in range(6)])
+        stream.commit('peer', 0)
+        stream.subscribe(
+            subscriber='peer',
+            batch_callback=lambda msgs: inbound.offer(msgs, 'a', lossless=True),
+        )
+        time.sleep(0.1)
+        # The stalled consumer holds back the stream and its offset
+        self.assertEqual(stream.committed('peer'), 0)
+        gate.set()
+        deadline = time.time() + 5
+        while stream.committed('peer') == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(stream.committed('peer'), stream.end_offset())
+        self.assertEqual(handled, [f'm{i}' for i in range(6)])
+        metrics = inbound.metrics()
+        self.assertEqual((metrics['rate_limited'], metrics['overflow']), (0, 0))
+
+    def test_socket_transport(self):
+        path = stream_address(self.tmp.name, 'socket')
+        self.roundtrip(SocketTransport(path), SocketTransport(path))
+
+    def test_shm_transport_wraps_ring(self):
+        name = f'skg_test_{uuid.uuid4().hex[:8]}'
+        # A ring smaller than the batch forces wraparound and backpressure
+        self.roundtrip(SharedMemoryTransport(name, 512), SharedMemoryTransport(name, 512), count=200)
+
+    def test_shm_drops_without_waiting_when_no_consumer(self):
+        name = f'skg_test_{uuid.uuid4().hex[:8]}'
+        publisher = SharedMemoryTransport(name, 256)
+        self.addCleanup(publisher.close)
+        start = time.monotonic()
+        for _ in range(20):
+            publisher.publish([{'token': f't{i}'} for i in range(50)])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(publisher.dropped, 1000)
+
+    def test_shm_waits_once_for_a_stalled_consumer(self):
+        import config
+
+        name = f'skg_test_{uuid.uuid4().hex[:8]}'
+        publisher = SharedMemoryTransport(name, 256)
+        subscriber = SharedMemoryTransport(name, 256)
+        self.addCleanup(publisher.close)
+        self.addCleanup(subscriber.close)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        done = threading.Event()
+        # The consumer takes one message, then stops reading
+        subscriber.subscribe(lambda msg: done.set() or release.wait(5))
+        deadline = time.time() + 5
+        while not done.is_set() and time.time() < deadline:
+            publisher.publish([{'token': 'hello'}])
+            time.sleep(0.01)
+        with patch.object(config, 'COMM_PUBLISH_TIMEOUT', 0.1):
+            start = time.monotonic()
+            for _ in range(10):
+                publisher.publish([{'token': f't{i}'} for i in range(50)])
+            # One timeout for the first full batch; later batches drop at once
+            self.assertLess(time.monotonic() - start, 0.4)
+        self.assertGreater(publisher.dropped, 0)
+
+    def test_socket_drops_subscriber_that_stops_reading(self):
+        import socket as socket_module
+
+        import config
+
+        path = stream_address(self.tmp.name, 'socket')
+        publisher = SocketTransport(path)
+        self.addCleanup(publisher.close)
+        publisher.listen()
+        stalled = socket_module.socket(socket_module.AF_UNIX, socket_module.SOCK_STREAM)
+        self.addCleanup(stalled.close)
+        with patch.object(config, 'COMM_SEND_TIMEOUT', 0.05):
+            stalled.connect(path)
+            deadline = time.time() + 5
+            while not publisher._conns and time.time() < deadline:
+                time.sleep(0.01)
+            payload = 'x' * 1024
+            while publisher._conns and time.time() < deadline:
+                publisher.publish([{'token': payload} for _ in range(64)])
+        self.assertEqual(publisher._conns, [])
+
+    def test_shm_latency_is_low(self):
+        name = f'skg_test_{uuid.uuid4().hex[:8]}'
+        latencies = sorted(measure_latency('shm', name, count=200))
+        self.assertEqual(len(latencies), 200)
+        self.assertLess(latencies[len(latencies) // 2], 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
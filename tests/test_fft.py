@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    import scipy.io.wavfile as wav
+    from PIL import Image
+    from fft_generator import (
+        generate_fft_from_audio,
+        generate_stft_from_audio,
+        load_audio_spectrum,
+        render_spectrum_image,
+    )
+except Exception:
+    np = None
+
+
+class TestAudioFFT(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy/scipy/Pillow not available')
+
+    def _write_tone(self, path, rate=8000, seconds=1.0, freq=1000.0):
+        t = np.arange(int(rate * seconds)) / rate
+        wav.write(path, rate, (np.sin(2 * np.pi * freq * t) * 10000).astype(np.int16))
+
+    def test_generate_fft_from_audio(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = os.path.join(tmp, 'tone.wav')
+            self._write_tone(audio)
+            data_path = os.path.join(tmp, 'tone.npz')
+            image_path = os.path.join(tmp, 'tone.png')
+            generate_fft_from_audio(audio, data_path, image_path)
+            with Image.open(image_path) as img:
+                self.assertEqual(img.size, (1200, 400))
+            magnitude, meta = load_audio_spectrum(data_path)
+            self.assertEqual(magnitude.dtype, np.float32)
+            self.assertEqual(len(magnitude), 8000 // 2 + 1)
+            self.assertEqual(meta['sample_rate'], 8000)
+            peak_hz = int(np.argmax(magnitude)) * meta['bin_hz']
+            self.assertAlmostEqual(peak_hz, 1000.0, delta=meta['bin_hz'])
+
+    def test_float16_log_storage_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = os.path.join(tmp, 'tone.wav')
+            self._write_tone(audio)
+            linear = os.path.join(tmp, 'linear.npz')
+            compact = os.path.join(tmp, 'compact.npz')
+            generate_fft_from_audio(audio, linear, os.path.join(tmp, 'a.png'))
+            generate_fft_from_audio(
+                audio, compact, os.path.join(tmp, 'b.png'), dtype='float16', log_scale=True
+            )
+            ref, _ = load_audio_spectrum(linear)
+            approx, _ = load_audio_spectrum(compact)
+            self.assertEqual(int(np.argmax(approx)), int(np.argmax(ref)))
+            self.assertLess(os.path.getsize(compact), os.path.getsize(linear))
+
+    def test_npy_paths_round_trip_and_legacy_files_are_halved(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = os.path.join(tmp, 'tone.wav')
+            self._write_tone(audio)
+            new = os.path.join(tmp, 'new.npy')
+            generate_fft_from_audio(audio, new, os.path.join(tmp, 'a.png'), dtype='float16')
+            magnitude, meta = load_audio_spectrum(new)
+            self.assertEqual(len(magnitude), 8000 // 2 + 1)
+            self.assertTrue(np.isfinite(magnitude).all())
+            self.assertEqual(meta['sample_rate'], 8000)
+            legacy = os.path.join(tmp, 'legacy.npy')
+            np.save(legacy, np.arange(8, dtype=np.float64))
+            magnitude, meta = load_audio_spectrum(legacy)
+            self.assertEqual(magnitude.tolist(), [0, 1, 2, 3])
+            self.assertEqual(meta, {})
+
+    def test_envelope_keeps_narrow_peaks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            magnitude = np.zeros(500_000, dtype=np.float32)
+            magnitude[123_457] = 1.0
+            path = os.path.join(tmp, 'peak.png')
+            render_spectrum_image(magnitude, 22050, path)
+            with Image.open(path) as img:
+                arr = np.asarray(img.convert('RGB'))
+            # A single-bin peak must still reach the top of the plot area
+            plot = arr[25:30, 60:-15]
+            self.assertTrue((plot != 255).any())
+
+    def test_streaming_stft_matches_direct_frames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            audio = os.path.join(tmp, 'long.wav')
+            self._write_tone(audio, rate=8000, seconds=5.0, freq=500.0)
+            spec_path = os.path.join(tmp, 'long_stft.npy')
+            image_path = os.path.join(tmp, 'long_stft.png')
+            shape = generate_stft_from_audio(
+                audio, spec_path, image_path, frame_size=256, batch_frames=7
+            )
+            self.assertEqual(shape, (1 + (40000 - 256) // 128, 129))
+            spec = np.load(spec_path, mmap_mode='r')
+            self.assertEqual(spec.shape, shape)
+            _, samples = wav.read(audio)
+            frame = samples[128 * 10:128 * 10 + 256].astype(np.float32) * np.hanning(256)
+            np.testing.assert_allclose(spec[10], np.abs(np.fft.rfft(frame)), rtol=1e-3, atol=1e-2)
+            self.assertEqual(int(np.argmax(spec[10])), 500 * 256 // 8000)
+            with Image.open(image_path) as img:
+                self.assertEqual(img.size, (1200, 400))
+
+
+if __name__ == '__main__':
+    unittest.main()
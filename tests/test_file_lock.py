@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from file_lock import FileLock
+
+
+def _append_under_lock(path, lock_path, tag, count):
+    for i in range(count):
+        with FileLock(lock_path):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(tag)
+                f.flush()
+                f.write(f"{i}\n")
+
+
+class TestFileLock(unittest.TestCase):
+    def test_reentrant_within_thread(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lock = FileLock(os.path.join(tmp, "x.lock"))
+            with lock:
+                with lock:
+                    pass
+            with lock:
+                pass
+
+    def test_serializes_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log")
+            lock_path = os.path.join(tmp, "log.lock")
+            ctx = multiprocessing.get_context("spawn")
+            procs = [
+                ctx.Process(target=_append_under_lock, args=(path, lock_path, tag, 50))
+                for tag in "ab"
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join(30)
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self.assertEqual(len(lines), 100)
+            self.assertTrue(all(line[0] in "ab" and line[1:].isdigit() for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+try:
+    import numpy as np
+    import glyph_atlas
+    import glyph_visualizer
+    from glyph_atlas import GlyphAtlas
+except Exception:
+    np = None
+
+
+class TestGlyphAtlas(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy/Pillow not available')
+
+    def test_sprites_match_direct_rendering(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            atlas = GlyphAtlas(tmp, sizes=(64, 512))
+            self.assertEqual(atlas.add(['☀', '☁', '☀']), 2)
+            sprite = np.asarray(atlas.sprite('☁', 512))
+            direct = np.asarray(
+                glyph_visualizer._draw_glyph('☁', atlas.font_path, 512, 220).convert('L')
+            )
+            self.assertTrue(np.array_equal(sprite, direct))
+            self.assertEqual(atlas.sprite('☁', 32).size, (32, 32))
+            self.assertIsNone(atlas.sprite('☂', 64))
+
+    def test_incremental_add_persists(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            atlas = GlyphAtlas(tmp, sizes=(64,))
+            atlas.add(['☀'])
+            first_box = atlas.boxes[0, 0].copy()
+            # Enough glyphs to wrap shelves and grow the sheet
+            with open('glossary/extended_glyph_pool.json', encoding='utf-8') as f:
+                pool = json.load(f)[:60]
+            self.assertEqual(atlas.add(pool), 59)
+            reopened = GlyphAtlas(tmp, sizes=(64,))
+            self.assertEqual(len(reopened), 60)
+            self.assertTrue(np.array_equal(reopened.boxes[0, 0], first_box))
+            self.assertTrue(
+                np.array_equal(np.asarray(reopened.sprite(pool[-1], 64)),
+                               np.asarray(atlas.sprite(pool[-1], 64)))
+            )
+            # Other render settings invalidate the atlas
+            self.assertEqual(len(GlyphAtlas(tmp, sizes=(32,))), 0)
+
+    def test_engine_adds_new_pool_glyphs(self):
+        from skg_engine import SKGEngine
+        with tempfile.TemporaryDirectory() as tmp:
+            pool_path = os.path.join(tmp, 'pool.json')
+            with open(pool_path, 'w', encoding='utf-8') as f:
+                json.dump(['☀'], f)
+            atlas = GlyphAtlas(os.path.join(tmp, 'atlas'), sizes=(64,))
+            with patch.object(glyph_atlas, '_atlas', atlas):
+                engine = SKGEngine(tmp, pool_path, glyph_atlas=True)
+                self.assertIn('☀', atlas)
+                engine.add_glyph_to_pool('☁')
+            self.assertIn('☁', atlas)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+try:
+    import glyph_visualizer
+except Exception:
+    glyph_visualizer = None
+
+
+class TestGlyphVisualizer(unittest.TestCase):
+    def setUp(self):
+        if glyph_visualizer is None:
+            self.skipTest('Pillow not available')
+
+    def test_existing_output_is_not_rendered_again(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = glyph_visualizer.generate_glyph_image('🜂', tmp)
+            self.assertTrue(first and os.path.exists(first))
+            with patch.object(glyph_visualizer, '_render_glyph') as render:
+                second = glyph_visualizer.generate_glyph_image('🜂', tmp)
+            self.assertEqual(first, second)
+            render.assert_not_called()
+
+    def test_fonts_and_bitmaps_are_cached(self):
+        glyph_visualizer._load_font.cache_clear()
+        glyph_visualizer._render_glyph.cache_clear()
+        a = glyph_visualizer.render_glyph_bitmap('🜁')
+        b = glyph_visualizer.render_glyph_bitmap('🜁')
+        self.assertEqual(glyph_visualizer._render_glyph.cache_info().hits, 1)
+        # Callers get private copies; drawing on one leaves the cache intact
+        self.assertIsNot(a, b)
+        a.paste((255, 0, 0), (0, 0, 8, 8))
+        self.assertEqual(b.getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(glyph_visualizer.render_glyph_bitmap('🜁').getpixel((0, 0)), (255, 255, 255))
+        glyph_visualizer.render_glyph_bitmap('🜃')
+        self.assertEqual(glyph_visualizer._load_font.cache_info().currsize, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from PIL import Image
+    from generate_fft_from_image import (
+        generate_fft_from_image,
+        generate_fft_from_images,
+        list_images,
+    )
+except Exception:
+    np = None
+
+
+class TestImageFFT(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy/Pillow not available')
+
+    def _make_images(self, directory):
+        rng = np.random.default_rng(0)
+        paths = []
+        for i, size in enumerate([(64, 64), (64, 64), (80, 40), (64, 64)]):
+            path = os.path.join(directory, f'img{i}.png')
+            Image.fromarray(rng.integers(0, 255, size[::-1], dtype=np.uint8)).save(path)
+            paths.append(path)
+        return paths
+
+    def test_batch_matches_single_image_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'src')
+            os.makedirs(src)
+            paths = self._make_images(src)
+            self.assertEqual(list_images(src), paths)
+            single_dir = os.path.join(tmp, 'single')
+            singles = [generate_fft_from_image(p, single_dir, max_dim=64) for p in paths]
+            for workers in (1, 2):
+                batch_dir = os.path.join(tmp, f'batch{workers}')
+                results = generate_fft_from_images(
+                    paths, batch_dir, max_dim=64, workers=workers, batch_size=2
+                )
+                self.assertEqual(set(results), set(paths))
+                for path, single in zip(paths, singles):
+                    a = np.asarray(Image.open(single))
+                    b = np.asarray(Image.open(results[path]))
+                    np.testing.assert_array_equal(a, b)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from job_queue import PRIORITY_BACKFILL, PRIORITY_INTERACTIVE, JobQueue
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_priority_order_and_dedup(self):
+        queue = JobQueue(':memory:', workers=1)
+        order = []
+        queue.register('work', lambda p: order.append(p['token']))
+        queue.submit('work', {'token': 'backfill'}, PRIORITY_BACKFILL)
+        first = queue.submit('work', {'token': 'dup'}, PRIORITY_BACKFILL)
+        second = queue.submit('work', {'token': 'dup'}, PRIORITY_BACKFILL)
+        queue.submit('work', {'token': 'user'}, PRIORITY_INTERACTIVE)
+        self.assertEqual(first, second)
+        queue.start()
+        self.assertTrue(queue.join(timeout=5))
+        queue.stop()
+        self.assertEqual(order, ['user', 'backfill', 'dup'])
+
+    def test_retry_with_backoff_and_callback(self):
+        queue = JobQueue(':memory:', workers=2, max_attempts=3, backoff=0.01)
+        attempts = []
+        done = threading.Event()
+        results = []
+
+        def flaky(payload):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError('try again')
+            return payload['n'] * 2
+
+        queue.register('flaky', flaky)
+        queue.start()
+        queue.submit('flaky', {'n': 21}, callback=lambda r: (results.append(r), done.set()))
+        self.assertTrue(done.wait(5))
+        queue.stop()
+        self.assertEqual(results, [42])
+        self.assertEqual(len(attempts), 3)
+
+    def test_permanent_failure_and_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'jobs.sqlite3')
+            queue = JobQueue(db, workers=1, max_attempts=1)
+            queue.submit('unknown', {'token': 'x'})
+            queue.submit('later', {'token': 'y'})
+            queue.register('later', lambda p: None)
+            # Jobs survive a restart before any worker ran
+            reopened = JobQueue(db, workers=1, max_attempts=1)
+            self.assertEqual(reopened.pending(), 2)
+            reopened.register('later', lambda p: None)
+            reopened.start()
+            self.assertTrue(reopened.join(timeout=5))
+            reopened.stop()
+            failed = reopened.failed()
+            self.assertEqual([f['kind'] for f in failed], ['unknown'])
+
+    def test_only_orphaned_running_jobs_are_requeued(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'jobs.sqlite3')
+            queue = JobQueue(db, workers=1)
+            live = queue.submit('work', {'token': 'live'})
+            dead = queue.submit('work', {'token': 'dead'})
+            expired = queue.submit('work', {'token': 'expired'})
+            gone = subprocess.Popen([sys.executable, '-c', 'pass'])
+            gone.wait()
+            lease = time.time() + 60
+            for job_id, owner, until in (
+                (live, os.getpid(), lease),
+                (dead, gone.pid, lease),
+                (expired, os.getpid(), time.time() - 1),
+            ):
+                queue._conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_until = ? WHERE id = ?",
+                    (owner, until, job_id),
+                )
+            # Another queue opening the database leaves the live lease alone
+            reopened = JobQueue(db, workers=1)
+            rows = dict(reopened._conn.execute('SELECT id, status FROM jobs').fetchall())
+            self.assertEqual(rows, {live: 'running', dead: 'queued', expired: 'queued'})
+
+    def test_long_job_keeps_its_lease(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('config.JOB_LEASE_SECONDS', 0.2):
+            db = os.path.join(tmp, 'jobs.sqlite3')
+            queue = JobQueue(db, workers=1)
+            running = threading.Event()
+            release = threading.Event()
+            self.addCleanup(release.set)
+            queue.register('work', lambda p: running.set() or release.wait(5))
+            queue.submit('work', {'token': 'slow'})
+            queue.start()
+            self.assertTrue(running.wait(5))
+            time.sleep(0.5)
+            # Well past the original lease, another process still sees it held
+            other = JobQueue(db, workers=1)
+            other._requeue_orphans()
+            status = other._conn.execute('SELECT status FROM jobs').fetchone()[0]
+            self.assertEqual(status, 'running')
+            release.set()
+            self.assertTrue(queue.join(timeout=5))
+            queue.stop()
+
+    def test_callbacks_of_jobs_finished_elsewhere_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('config.JOB_LEASE_SECONDS', 0.1):
+            db = os.path.join(tmp, 'jobs.sqlite3')
+            queue = JobQueue(db, workers=0)
+            queue.submit('work', {'token': 'x'}, callback=lambda result: None)
+            other = JobQueue(db, workers=1)
+            other.register('work', lambda p: None)
+            other.start()
+            self.assertTrue(other.join(timeout=5))
+            other.stop()
+            queue.start()
+            deadline = time.time() + 5
+            while queue._callbacks and time.time() < deadline:
+                time.sleep(0.01)
+            queue.stop()
+            self.assertEqual(queue._callbacks, {})
+
+    def test_worker_survives_database_errors(self):
+        queue = JobQueue(':memory:', workers=1)
+        done = threading.Event()
+        queue.register('work', lambda p: done.set())
+        claim = queue._claim
+        calls = []
+
+        def flaky_claim():
+            calls.append(1)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError('database is locked')
+            return claim()
+
+        with patch.object(queue, '_claim', side_effect=flaky_claim):
+            queue.submit('work', {'token': 'x'})
+            queue.start()
+            self.assertTrue(done.wait(5))
+        queue.stop()
+        self.assertGreater(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import threading
+import time
+import unittest
+
+from modalities import run_stage_graph
+
+
+class TestStageGraph(unittest.TestCase):
+    def test_dependencies_receive_results(self):
+        stages = {
+            'a': (lambda: 2, []),
+            'b': (lambda a: a * 3, ['a']),
+            'c': (lambda: 'independent', []),
+        }
+        results = run_stage_graph(stages)
+        self.assertEqual(results, {'a': 2, 'b': 6, 'c': 'independent'})
+
+    def test_timeout_returns_partial_results(self):
+        stages = {
+            'slow': (lambda: time.sleep(1.0) or 'late', []),
+            'after_slow': (lambda s: s, ['slow']),
+            'fast': (lambda: 'ok', []),
+        }
+        start = time.monotonic()
+        timed_out = set()
+        results = run_stage_graph(stages, timeouts={'slow': 0.1}, timed_out=timed_out)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(results, {'fast': 'ok'})
+        self.assertEqual(timed_out, {'slow'})
+
+    def test_timeout_starts_when_stage_runs(self):
+        import config
+
+        # More stages than pool workers: the last ones wait in the queue
+        # longer than their timeout but still get their full run time.
+        stages = {
+            f's{i}': (lambda i=i: time.sleep(0.2) or i, [])
+            for i in range(config.MODALITY_WORKERS + 1)
+        }
+        timed_out = set()
+        results = run_stage_graph(stages, default_timeout=0.3, timed_out=timed_out)
+        self.assertEqual(timed_out, set())
+        self.assertEqual(len(results), len(stages))
+
+    def test_hung_isolated_stages_do_not_hold_pool_workers(self):
+        import config
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+        hung = {
+            f'h{i}': (lambda: release.wait(10), [])
+            for i in range(config.MODALITY_WORKERS)
+        }
+        timed_out = set()
+        run_stage_graph(hung, default_timeout=0.05, timed_out=timed_out, isolated=hung)
+        self.assertEqual(timed_out, set(hung))
+        start = time.monotonic()
+        results = run_stage_graph({'next': (lambda: 'ok', [])}, default_timeout=1.0)
+        self.assertEqual(results, {'next': 'ok'})
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_saturated_pool_does_not_block_the_graph(self):
+        import config
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+        hung = {
+            f'h{i}': (lambda: release.wait(10), [])
+            for i in range(config.MODALITY_WORKERS)
+        }
+        # 'queued' never gets a pool worker; it is dropped instead of waiting
+        stages = dict(hung, queued=(lambda: 'late', []))
+        timed_out = set()
+        start = time.monotonic()
+        results = run_stage_graph(stages, default_timeout=0.1, timed_out=timed_out)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(results, {})
+        self.assertEqual(timed_out, set(stages))
+        # The hung stages still hold the pool; later stages run beside it
+        results = run_stage_graph({'h0': (lambda: 'ok', []), 'next': (lambda: 'ok', [])})
+        self.assertEqual(results, {'h0': 'ok', 'next': 'ok'})
+
+    def test_graph_budget_bounds_the_whole_run(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        stages = {
+            'slow': (lambda: release.wait(10), []),
+            'after': (lambda s: s, ['slow']),
+        }
+        timed_out = set()
+        start = time.monotonic()
+        results = run_stage_graph(
+            stages, default_timeout=5.0, timed_out=timed_out, isolated={'slow'}, budget=0.1
+        )
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual((results, timed_out), ({}, {'slow'}))
+
+    def test_failed_stage_skips_dependents(self):
+        def boom():
+            raise RuntimeError('fail')
+
+        results = run_stage_graph({'a': (boom, []), 'b': (lambda a: a, ['a'])})
+        self.assertEqual(results, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,9 +20,11 @@ class TestModality(unittest.TestCase):
     def test_externalize_token_paths(self):
         with tempfile.TemporaryDirectory() as tmp:
             engine = SKGEngine(tmp)
-            with patch('skg_engine.speak') as mock_speak, patch('skg_engine.display_gesture') as mock_gesture:
+            with patch('skg_engine.speak') as mock_speak, \
+                    patch('skg_engine.display_gesture') as mock_gesture, \
+                    patch('skg_engine.submit_modalities'):
                 engine.externalize_token('hi', modality='speak')
-                mock_speak.assert_called_once_with('hi')
+                mock_speak.assert_called_once_with('hi', channel='thought')
                 mock_gesture.assert_not_called()
                 mock_speak.reset_mock()
                 engine.externalize_token('wave', modality='gesture')
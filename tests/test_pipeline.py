@@ -1,14 +1,30 @@
 import os
 import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import patch
 
 from adjacency_seed import generate_adjacents
-from glyph_builder import build_glyph_if_needed
+from artifact_cache import ArtifactCache
+from glyph_builder import (
+    GlyphManifest,
+    build_glyph_if_needed,
+    build_glyphs,
+    ensure_modalities,
+)
 from glyph_decision_engine import AGIDecision
 from token_fusion import TokenFusion
 
 
+def touch(directory, *names):
+    """Create empty files standing in for generated media."""
+    paths = [os.path.join(directory, name) for name in names]
+    for path in paths:
+        open(path, "wb").close()
+    return paths
+
+
 class TestPipeline(unittest.TestCase):
     def test_adjacency_generation(self):
         adjs = generate_adjacents("fire")
@@ -23,6 +39,131 @@ class TestPipeline(unittest.TestCase):
             json_path = os.path.join(tmp, f"{token_id}.json")
             self.assertTrue(os.path.exists(json_path))
 
+    def test_build_glyphs_resumes_from_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fake = lambda token, adj_count, profile: {"token": token, "glyph_id": "□"}
+            with patch("glyph_builder._compose_glyph", side_effect=fake) as compose:
+                built = build_glyphs(["fire", "water", "Fire"], workers=1, base_dir=tmp, batch_size=1)
+                self.assertEqual(built, 2)
+                self.assertEqual(compose.call_count, 2)
+                compose.reset_mock()
+                built = build_glyphs(["fire", "water", "earth"], workers=1, base_dir=tmp)
+                self.assertEqual(built, 1)
+                compose.assert_called_once_with("earth", 50, "text")
+            self.assertTrue(os.path.exists(os.path.join(tmp, "manifest.json")))
+
+    def test_manifest_journal_and_compaction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = GlyphManifest(tmp)
+            with patch("config.MANIFEST_COMPACT_EVERY", 3):
+                manifest.add("a", "1")
+                manifest.add("b", "2")
+                self.assertTrue(os.path.exists(os.path.join(tmp, "manifest.journal")))
+                manifest.add("c", "3")
+            self.assertEqual(os.path.getsize(os.path.join(tmp, "manifest.journal")), 0)
+            # A second cache instance (e.g. another process) sees every entry
+            other = GlyphManifest(tmp)
+            self.assertEqual(other.get("c"), "3")
+            other.add("d", "4")
+            self.assertEqual(manifest.get("d"), "4")
+
+    def test_compaction_keeps_other_writers_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = GlyphManifest(tmp)
+            second = GlyphManifest(tmp)
+            first.add("a", "1")
+            second.add("b", "2")
+            first.compact()
+            self.assertEqual(GlyphManifest(tmp).get("b"), "2")
+
+    def test_partial_journal_line_is_read_once_complete(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = GlyphManifest(tmp)
+            manifest.add("a", "1")
+            journal = os.path.join(tmp, "manifest.journal")
+            with open(journal, "a", encoding="utf-8") as f:
+                f.write('{"id": "b", ')
+            self.assertIsNone(manifest.get("b"))
+            with open(journal, "a", encoding="utf-8") as f:
+                f.write('"hash": "2"}\n')
+            self.assertEqual(manifest.get("b"), "2")
+
+    def test_lazy_glyph_materializes_on_demand(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            glyph = build_glyph_if_needed("ember", base_dir=tmp, adj_count=1, profile="lazy")
+            self.assertEqual(glyph["modalities"]["pending"], ["audio", "image", "photos"])
+            self.assertIsNone(glyph["modalities"]["visual"]["symbolic_image"])
+            sigil, sigil_fft = touch(tmp, "sigil.png", "sigil_fft.png")
+            generated = {
+                "audio": {"tts": None, "fft_audio": None},
+                "visual": {
+                    "fft_visual": None,
+                    "photographic": [],
+                    "symbolic_image": sigil,
+                    "fft_from_image": sigil_fft,
+                },
+                "pending": ["audio", "photos"],
+            }
+            with patch("modalities.generate_modalities", return_value=generated) as gen:
+                glyph = ensure_modalities("ember", ["image"], base_dir=tmp)
+                self.assertEqual(gen.call_args.kwargs["kinds"], ["image"])
+                # Already materialized kinds are not generated again
+                ensure_modalities("ember", ["image"], base_dir=tmp)
+                self.assertEqual(gen.call_count, 1)
+            self.assertEqual(glyph["modalities"]["visual"]["symbolic_image"], sigil)
+            self.assertEqual(glyph["modalities"]["pending"], ["audio", "photos"])
+            self.assertIsNone(ensure_modalities("unbuilt", base_dir=tmp, build_missing=False))
+
+    def test_concurrent_ensure_modalities_generates_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_glyph_if_needed("ash", base_dir=tmp, adj_count=1, profile="lazy")
+            (sigil,) = touch(tmp, "sigil.png")
+            generated = {
+                "visual": {"symbolic_image": sigil, "fft_from_image": None},
+                "pending": ["audio", "photos"],
+            }
+
+            def slow_generate(*args, **kwargs):
+                time.sleep(0.05)
+                return generated
+
+            with patch("modalities.generate_modalities", side_effect=slow_generate) as gen:
+                threads = [
+                    threading.Thread(target=ensure_modalities, args=("ash", ["image"], tmp))
+                    for _ in range(4)
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join(5)
+            self.assertEqual(gen.call_count, 1)
+
+    def test_evicted_artifacts_are_regenerated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_glyph_if_needed("soot", base_dir=tmp, adj_count=1, profile="lazy")
+            sigil, sigil_fft = touch(tmp, "sigil.png", "sigil_fft.png")
+
+            def generate(*args, **kwargs):
+                for path in (sigil, sigil_fft):
+                    with open(path, "wb") as f:
+                        f.write(b"png")
+                return {
+                    "visual": {"symbolic_image": sigil, "fft_from_image": sigil_fft},
+                    "pending": ["audio", "photos"],
+                }
+
+            with patch("modalities.generate_modalities", side_effect=generate) as gen:
+                ensure_modalities("soot", ["image"], base_dir=tmp)
+                # Over budget: the cache deletes the files the glyph records
+                cache = ArtifactCache(os.path.join(tmp, "cache"), max_bytes=1)
+                cache.store("sigil", [sigil, sigil_fft])
+                self.assertFalse(os.path.exists(sigil))
+                glyph = ensure_modalities("soot", ["image"], base_dir=tmp)
+                self.assertEqual(gen.call_count, 2)
+            visual = glyph["modalities"]["visual"]
+            self.assertTrue(os.path.exists(visual["symbolic_image"]))
+            self.assertNotIn("image", glyph["modalities"]["pending"])
+
     def test_agidecision_fallback(self):
         decider = AGIDecision(["A", "B", "C"])
         with patch("agency_gate.process_agency_gates", return_value=[{"gate": "decide_glyph", "decision": "NO"}]):
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from spectral_index import SpectralIndex, audio_fingerprint, image_fingerprint
+except Exception:
+    np = None
+
+
+class TestSpectralIndex(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy not available')
+
+    def _tone_spectrum(self, freq, rate=8000, n=8000):
+        # Harmonic tone with light noise, like a voiced TTS sample
+        t = np.arange(n) / rate
+        signal = sum(np.sin(2 * np.pi * freq * h * t) / h for h in range(1, 6))
+        signal += np.random.default_rng(0).normal(0, 0.01, n)
+        return np.abs(np.fft.rfft(signal)), rate / n
+
+    def test_audio_fingerprint_shape_and_norm(self):
+        magnitude, bin_hz = self._tone_spectrum(440.0)
+        fp = audio_fingerprint(magnitude, bin_hz, n_bands=32)
+        self.assertEqual(fp.shape, (32,))
+        self.assertEqual(fp.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(fp)), 1.0, places=5)
+
+    def test_search_finds_similar_tones(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SpectralIndex(os.path.join(tmp, 'audio'), dim=32)
+            for name, freq in [('low', 200.0), ('low2', 210.0), ('high', 3000.0)]:
+                index.add(name, audio_fingerprint(*self._tone_spectrum(freq), n_bands=32))
+            neighbors = index.neighbors('low', k=2)
+            self.assertEqual(neighbors[0][0], 'low2')
+            self.assertGreater(neighbors[0][1], neighbors[1][1])
+
+            # Rows and tokens persist across reopen
+            reopened = SpectralIndex(os.path.join(tmp, 'audio'), dim=32)
+            self.assertEqual(len(reopened), 3)
+            self.assertEqual(reopened.neighbors('low', k=1)[0][0], 'low2')
+
+    def test_index_grows_and_replaces(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SpectralIndex(os.path.join(tmp, 'image'), dim=8)
+            rng = np.random.default_rng(0)
+            for i in range(1500):
+                index.add(f't{i}', rng.random(8))
+            self.assertEqual(len(index), 1500)
+            self.assertGreaterEqual(index.matrix.shape[0], 1500)
+            target = np.eye(8)[3]
+            index.add('t7', target)
+            self.assertEqual(len(index), 1500)
+            self.assertEqual(index.search(target, k=1)[0][0], 't7')
+
+    def test_writers_sharing_an_index_see_each_others_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audio')
+            # Two instances stand in for two processes writing one index
+            first, second = SpectralIndex(path, dim=4), SpectralIndex(path, dim=4)
+            for i in range(1100):
+                writer = first if i % 2 else second
+                writer.add(f't{i}', np.eye(4)[i % 4] + 0.1)
+            first.add('last', np.ones(4))
+            first.flush()
+            second.flush()
+            self.assertEqual(second.search(np.ones(4), k=1)[0][0], 'last')
+            self.assertEqual(len(second), 1101)
+            reopened = SpectralIndex(path, dim=4)
+            self.assertEqual(reopened.tokens, [f't{i}' for i in range(1100)] + ['last'])
+            self.assertTrue(np.allclose(reopened.matrix[1099], second.matrix[1099]))
+
+    def test_image_fingerprint(self):
+        smooth = np.outer(np.hanning(64), np.hanning(64))
+        noisy = np.random.default_rng(1).random((64, 64))
+        a, b = image_fingerprint(smooth), image_fingerprint(noisy)
+        self.assertEqual(a.shape, (32,))
+        self.assertLess(float(a @ b), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+try:
+    from PIL import Image
+    from thumbnails import PhotoCache, load_thumbnail, make_thumbnail, thumbnail_path
+except Exception:
+    Image = None
+
+
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        if Image is None:
+            self.skipTest('Pillow not available')
+
+    def test_make_and_load_thumbnail(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'glyph.png')
+            Image.new('RGB', (512, 512), 'white').save(src)
+            thumb = make_thumbnail(src, size=64)
+            self.assertEqual(thumb, thumbnail_path(src, 64))
+            self.assertEqual(Image.open(thumb).size, (64, 64))
+            self.assertEqual(load_thumbnail(src, size=64).size, (64, 64))
+            self.assertIsNone(make_thumbnail(os.path.join(tmp, 'missing.png')))
+
+    def test_photo_cache_keys_on_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'frame.png')
+            Image.new('L', (32, 32)).save(src)
+            decoded = []
+            cache = PhotoCache(lambda p: decoded.append(p) or len(decoded), max_items=2)
+            self.assertEqual(cache.get(src), 1)
+            self.assertEqual(cache.get(src), 1)
+            # Rewriting the file invalidates the cached decode
+            stat = os.stat(src)
+            os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual(cache.get(src), 2)
+            self.assertEqual(len(decoded), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import tts_engine
+from artifact_cache import ArtifactCache
+
+
+class FakeEngine:
+    """Stand-in for a pyttsx3 engine that writes audio on runAndWait."""
+
+    spoken = []
+    gate = None
+    # Set once an engine starts running a batch
+    running = threading.Event()
+
+    def __init__(self):
+        self.jobs = []
+        self.synthesized = []
+
+    def setProperty(self, name, value):
+        pass
+
+    def getProperty(self, name):
+        return []
+
+    def save_to_file(self, text, path):
+        self.synthesized.append(text)
+        self.jobs.append(path)
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def runAndWait(self):
+        self.running.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        for path in self.jobs:
+            with open(path, 'wb') as f:
+                f.write(b'RIFF')
+        self.jobs = []
+
+
+class FakePyttsx3:
+    @staticmethod
+    def init():
+        return FakeEngine()
+
+
+class WavCacheTestCase(unittest.TestCase):
+    """Points the TTS WAV cache at a temporary directory."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch('tts_engine.wav_cache', ArtifactCache(tmp.name, max_bytes=10 ** 6))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestTTSCompletion(WavCacheTestCase):
+    def test_future_resolves_with_complete_file(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('tts_engine.pyttsx3', FakePyttsx3):
+            out = os.path.join(tmp, 'word.wav')
+            future = tts_engine.generate_tts_async('word', out)
+            self.assertEqual(future.result(timeout=5), out)
+            self.assertTrue(os.path.getsize(out) > 0)
+            self.assertEqual(os.listdir(tmp), ['word.wav'])
+
+    def test_concurrent_links_to_one_path_use_private_temp_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'src.wav')
+            with open(src, 'wb') as f:
+                f.write(b'RIFF' * 1000)
+            out = os.path.join(tmp, 'out.wav')
+            errors = []
+
+            def link():
+                try:
+                    for _ in range(50):
+                        tts_engine._link(src, out)
+                except OSError as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=link) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(5)
+            self.assertEqual(errors, [])
+            self.assertEqual(sorted(os.listdir(tmp)), ['out.wav', 'src.wav'])
+            self.assertEqual(os.path.getsize(out), 4000)
+
+    def test_cached_audio_is_linked_not_resynthesized(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('tts_engine.pyttsx3', FakePyttsx3):
+            first = os.path.join(tmp, 'a.wav')
+            second = os.path.join(tmp, 'b.wav')
+            tts_engine.generate_tts_async('again', first).result(timeout=5)
+            future = tts_engine.generate_tts_async('again', second)
+            self.assertTrue(future.done())
+            self.assertEqual(future.result(), second)
+            self.assertEqual(tts_engine._worker._engine.synthesized.count('again'), 1)
+            with open(second, 'rb') as f:
+                self.assertEqual(f.read(), b'RIFF')
+
+    def test_future_raises_without_engine(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('tts_engine.pyttsx3', None):
+            future = tts_engine.generate_tts_async('word', os.path.join(tmp, 'w.wav'))
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+
+
+class TestTTSWorker(WavCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        FakeEngine.spoken = []
+        FakeEngine.gate = threading.Event()
+        FakeEngine.running.clear()
+        self.addCleanup(setattr, FakeEngine, 'gate', None)
+        patcher = patch('tts_engine.pyttsx3', FakePyttsx3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.worker = tts_engine.TTSWorker()
+
+    def test_coalesce_supersede_and_expire(self):
+        first = self.worker.submit('say', 'busy', 160, None)
+        # Wait until the worker is blocked speaking 'busy'
+        self.assertTrue(FakeEngine.running.wait(5))
+        a = self.worker.submit('say', 'hello', 160, None)
+        b = self.worker.submit('say', 'hello', 160, None)
+        old = self.worker.submit('say', 'thought one', 160, None, channel='thought')
+        new = self.worker.submit('say', 'thought two', 160, None, channel='thought')
+        # Expired by the time the worker dequeues it
+        stale = self.worker.submit('say', 'stale', 160, None, max_age=1e-6)
+        FakeEngine.gate.set()
+        self.assertTrue(self.worker.wait_until_idle(timeout=5))
+        self.assertIs(a, b)
+        self.assertTrue(first.result() and new.result())
+        self.assertTrue(old.cancelled() and stale.cancelled())
+        self.assertEqual(FakeEngine.spoken, ['busy', 'hello', 'thought two'])
+
+    def test_speak_returns_immediately(self):
+        start = time.monotonic()
+        future = tts_engine.speak('not blocking', channel='test')
+        self.assertLess(time.monotonic() - start, 0.5)
+        FakeEngine.gate.set()
+        self.assertTrue(future.result(timeout=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
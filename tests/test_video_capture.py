@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+import unittest
+
+try:
+    import numpy as np
+    import video_capture
+    from video_capture import CameraSource, CaptureService, FrameHashIndex, FrameRing, dhash, phash
+except Exception:
+    np = None
+
+
+class ArraySource:
+    """Frame source that replays numbered frames, one per ``step`` event."""
+
+    def __init__(self, count, shape=(4, 6, 3)):
+        self.frames = [np.full(shape, i, dtype=np.uint8) for i in range(count)]
+        self.step = threading.Semaphore(0)
+        self.closed = False
+
+    def read(self, out=None):
+        if not self.frames:
+            return None
+        if out is not None:
+            self.step.acquire()
+        frame = self.frames.pop(0)
+        if out is None:
+            return frame
+        out[...] = frame
+        return out
+
+    def close(self):
+        self.closed = True
+
+
+class TestVideoCapture(unittest.TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest('numpy not available')
+
+    def test_ring_views_expire(self):
+        ring = FrameRing(3, (2, 2))
+        for i in range(4):
+            ring.reserve()[...] = i
+            ring.commit()
+        self.assertIsNone(ring.get(0))
+        self.assertIsNone(ring.get(1))
+        view = ring.get(3)
+        self.assertEqual(int(view[0, 0]), 3)
+        self.assertTrue(np.shares_memory(view, ring._frames))
+        with self.assertRaises(ValueError):
+            view[0, 0] = 9
+        self.assertTrue(ring.held(3))
+        copy = ring.snapshot(3)
+        self.assertFalse(np.shares_memory(copy, ring._frames))
+        # Committing more frames hands frame 3's slot back to the writer
+        for i in range(4, 6):
+            ring.reserve()[...] = i
+            ring.commit()
+        self.assertFalse(ring.held(3))
+        self.assertIsNone(ring.snapshot(3))
+        self.assertEqual(int(copy[0, 0]), 3)
+
+    def test_service_hands_out_latest_frame(self):
+        source = ArraySource(5)
+        service = CaptureService(source, slots=4).start()
+        index, frame = service.latest(timeout=2)
+        self.assertEqual((index, int(frame[0, 0, 0])), (0, 0))
+        source.step.release(3)
+        index, frame = service.latest(after=0, timeout=2)
+        self.assertGreater(index, 0)
+        # Nothing newer has been decoded yet
+        self.assertEqual(service.latest(after=3, timeout=0.05), (3, None))
+        source.step.release(2)
+        service.stop()
+        self.assertTrue(source.closed)
+
+    def test_near_duplicate_frames_share_a_token(self):
+        rng = np.random.default_rng(0)
+        y, x = np.mgrid[0:120, 0:160]
+        scene = np.stack([(x + y) % 256, (x * 2) % 256, y * 2], axis=2).astype(np.uint8)
+        noisy = np.clip(scene + rng.normal(0, 4, scene.shape), 0, 255).astype(np.uint8)
+        other = scene[::-1, ::-1].copy()
+        for method in ('dhash', 'phash'):
+            index = FrameHashIndex(threshold=10, method=method)
+            token, is_new = index.match(scene)
+            self.assertTrue(is_new)
+            self.assertEqual(index.match(noisy), (token, False))
+            other_token, is_new = index.match(other)
+            self.assertTrue(is_new)
+            self.assertNotEqual(other_token, token)
+        self.assertLess((dhash(scene) ^ dhash(noisy)).bit_count(), 10)
+        self.assertLess((phash(scene) ^ phash(noisy)).bit_count(), 10)
+
+    def test_video_file_stands_in_for_camera(self):
+        cv2 = video_capture.cv2
+        if cv2 is None:
+            self.skipTest('opencv not available')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'clip.avi')
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (32, 24))
+            for i in range(5):
+                writer.write(np.full((24, 32, 3), i * 40, dtype=np.uint8))
+            writer.release()
+            service = CaptureService(CameraSource(path), slots=8).start()
+            index, frame = service.latest(timeout=2)
+            self.assertEqual(frame.shape, (24, 32, 3))
+            saved = service.persist(index, directory=tmp)
+            self.assertTrue(os.path.exists(saved))
+            service.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Pre-scaled thumbnails and a decoded-image LRU for the Tk interfaces.
+
+Glyph and FFT images are generated at full size (512px sigils, 1200x400
+spectra) but displayed in 256px panels.  A thumbnail at display size is
+written next to each artifact when it is generated, and the GUIs keep the
+decoded ``PhotoImage`` objects in a small LRU keyed by path and mtime, so a
+refresh that shows an already seen image neither reads the file nor resizes
+it again.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Any, Callable
+
+from PIL import Image
+
+import config
+
+
+def thumbnail_path(path: str, size: int | None = None) -> str:
+    """Return the thumbnail location for the image at ``path``."""
+    size = config.THUMBNAIL_SIZE if size is None else size
+    root, _ = os.path.splitext(path)
+    return f"{root}_thumb{size}.png"
+
+
+def _scaled(path: str, size: int) -> Image.Image:
+    img = Image.open(path)
+    img.load()
+    if img.size != (size, size):
+        img = img.resize((size, size))
+    return img
+
+
+def make_thumbnail(path: str | None, size: int | None = None) -> str | None:
+    """
+    Write the display-size thumbnail of ``path`` and return its location.
+
+    Returns ``None`` if ``path`` is missing or cannot be decoded.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    size = config.THUMBNAIL_SIZE if size is None else size
+    out = thumbnail_path(path, size)
+    try:
+        _scaled(path, size).save(out, compress_level=1)
+        return out
+    except Exception as e:
+        print(f"[Thumbnails] Error creating thumbnail for {path}: {e}")
+        return None
+
+
+def load_thumbnail(path: str, size: int | None = None, persist: bool = True) -> Image.Image:
+    """
+    Return ``path`` scaled to display size.
+
+    A thumbnail at least as new as the source is read directly; otherwise the
+    source is resized and, with ``persist``, the thumbnail is written for
+    next time (artifacts generated before thumbnails existed).
+    """
+    size = config.THUMBNAIL_SIZE if size is None else size
+    thumb = thumbnail_path(path, size)
+    try:
+        if os.path.getmtime(thumb) >= os.path.getmtime(path):
+            img = Image.open(thumb)
+            img.load()
+            return img
+    except OSError:
+        pass
+    img = _scaled(path, size)
+    if persist:
+        try:
+            img.save(thumb, compress_level=1)
+        except Exception:
+            pass
+    return img
+
+
+class PhotoCache:
+    """
+    LRU of decoded images keyed by ``(path, mtime)``.
+
+    ``factory`` turns a path into the displayable object (for example an
+    ``ImageTk.PhotoImage``) and is only called on a miss, so it must run on
+    the thread that owns the Tk interpreter.  A rewritten file gets a new
+    mtime and is decoded again.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_items: int = 64) -> None:
+        self.factory = factory
+        self.max_items = max_items
+        self._items: OrderedDict[tuple, Any] = OrderedDict()
+
+    def get(self, path: str) -> Any:
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        return self.lookup(key, lambda: self.factory(path))
+
+    def lookup(self, key: tuple, build: Callable[[], Any]) -> Any:
+        """Return the item cached under ``key``, calling ``build`` on a miss."""
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+            return item
+        item = build()
+        self._items[key] = item
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return item
+
+    def clear(self) -> None:
+        self._items.clear()
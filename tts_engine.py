@@ -1,54 +1,343 @@
 import os
+import time
+import wave
+import queue
+import shutil
+import itertools
 import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import config
+from artifact_cache import ArtifactCache
 
 try:
     import pyttsx3
 except Exception:  # pragma: no cover - optional dependency
     pyttsx3 = None  # type: ignore
+try:
+    import pyaudio
+except Exception:  # pragma: no cover - optional dependency
+    pyaudio = None  # type: ignore
+
+
+# Queue priorities: live speech goes ahead of background synthesis
+PRIORITY_SPEECH = 0
+PRIORITY_SYNTHESIS = 10
+
+# Synthesized speech keyed by (text, voice, rate); repeated utterances are
+# played or linked from here instead of being synthesized again.
+wav_cache = ArtifactCache(config.TTS_CACHE_DIR, config.TTS_CACHE_MAX_BYTES)
+
+
+def _wav_key(text: str, rate: int, voice_id: str | None) -> str:
+    return wav_cache.key("tts", text=text, voice=voice_id, rate=rate)
+
+
+def cached_wav(text: str, rate: int, voice_id: str | None) -> str | None:
+    """Return the cached WAV for ``text`` spoken at ``rate`` by ``voice_id``."""
+    paths = wav_cache.lookup(_wav_key(text, rate, voice_id))
+    return paths[0] if paths else None
+
+
+def _partial_path(path: str) -> str:
+    """Temporary name for ``path`` private to the calling process and thread."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{os.getpid()}.{threading.get_ident()}.partial{ext}"
+
+
+def _link(src: str, dst: str) -> None:
+    """Atomically place ``src`` at ``dst`` as a hardlink, or a copy."""
+    tmp_path = _partial_path(dst)
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+    # Renaming a link onto another link of the same file leaves both names
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+@dataclass(order=True)
+class _Utterance:
+    priority: int
+    seq: int
+    kind: str = field(compare=False)  # "say" or "save"
+    text: str = field(compare=False)
+    rate: int = field(compare=False)
+    voice_id: str | None = field(compare=False)
+    output_path: str | None = field(compare=False, default=None)
+    deadline: float | None = field(compare=False, default=None)
+    channel: str | None = field(compare=False, default=None)
+    future: Future = field(compare=False, default_factory=Future)
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.text, self.rate, self.voice_id, self.output_path)
+
+
+class TTSWorker:
+    """
+    Long-lived thread that owns the single pyttsx3 engine.
+
+    Requests are served from a priority queue.  An identical request that is
+    still queued is coalesced with the new one: both callers get the same
+    future.  A spoken utterance can carry a ``channel``; a newer utterance
+    on the same channel cancels a queued older one.  Utterances still
+    queued after their ``max_age`` are cancelled instead of spoken late.
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._queued: dict[tuple, _Utterance] = {}
+        self._channels: dict[str, _Utterance] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._speaking = 0
+        self._seq = itertools.count()
+        self._thread: threading.Thread | None = None
+        self._engine = None
+        self._engine_module = None
+        self._voices: dict[str, object] = {}
+        self._rate: int | None = None
+        self._voice_id: str | None = None
+        self._audio = None
+
+    def submit(
+        self,
+        kind: str,
+        text: str,
+        rate: int,
+        voice_id: str | None,
+        output_path: str | None = None,
+        priority: int = PRIORITY_SPEECH,
+        max_age: float | None = None,
+        channel: str | None = None,
+    ) -> Future:
+        item = _Utterance(
+            priority,
+            next(self._seq),
+            kind,
+            text,
+            rate,
+            voice_id,
+            output_path,
+            time.monotonic() + max_age if max_age else None,
+            channel,
+        )
+        with self._lock:
+            queued = self._queued.get(item.key)
+            if queued is not None and not queued.future.done():
+                return queued.future
+            if channel:
+                previous = self._channels.get(channel)
+                if previous is not None and previous.future.cancel():
+                    self._queued.pop(previous.key, None)
+                self._channels[channel] = item
+            self._queued[item.key] = item
+            if kind == "say":
+                self._speaking += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+        return item.future
 
+    def cancel_pending(self, channel: str | None = None) -> int:
+        """Cancel queued utterances (of one ``channel`` if given)."""
+        cancelled = 0
+        with self._lock:
+            for item in list(self._queued.values()):
+                if item.kind == "say" and (channel is None or item.channel == channel):
+                    if item.future.cancel():
+                        cancelled += 1
+        return cancelled
 
-_tts_lock = threading.Lock()
+    def wait_until_idle(self, timeout: float | None = None) -> bool:
+        """Block until no utterance is queued or being spoken."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._speaking == 0, timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            with self._lock:
+                if self._queued.get(item.key) is item:
+                    del self._queued[item.key]
+                if item.channel and self._channels.get(item.channel) is item:
+                    del self._channels[item.channel]
+            if item.deadline is not None and time.monotonic() > item.deadline:
+                item.future.cancel()
+            if item.future.set_running_or_notify_cancel():
+                try:
+                    item.future.set_result(self._handle(item))
+                except Exception as e:
+                    if item.kind == "say":
+                        print(f"[TTS] Error speaking '{item.text}': {e}")
+                    item.future.set_exception(e)
+            if item.kind == "say":
+                with self._idle:
+                    self._speaking -= 1
+                    self._idle.notify_all()
+
+    def _prepare(self, rate: int, voice_id: str | None):
+        """Return the engine configured for ``rate`` and ``voice_id``."""
+        if pyttsx3 is None:
+            raise RuntimeError("pyttsx3 not installed")
+        if self._engine is None or self._engine_module is not pyttsx3:
+            self._engine = pyttsx3.init()
+            self._engine_module = pyttsx3
+            self._voices = {v.id: v for v in self._engine.getProperty("voices") or []}
+            self._rate = self._voice_id = None
+        if rate != self._rate:
+            self._engine.setProperty("rate", rate)
+            self._rate = rate
+        if voice_id != self._voice_id:
+            if voice_id in self._voices:
+                self._engine.setProperty("voice", voice_id)
+            self._voice_id = voice_id
+        return self._engine
+
+    def _synthesize(self, item: _Utterance) -> str:
+        """Return the cached WAV for ``item``, synthesizing it on a miss."""
+        key = _wav_key(item.text, item.rate, item.voice_id)
+        paths = wav_cache.lookup(key)
+        if paths:
+            return paths[0]
+        engine = self._prepare(item.rate, item.voice_id)
+        path = wav_cache.path("wav", key, ".wav")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        print(f"[TTS] Synthesizing audio for: '{item.text}' -> {path}")
+        tmp_path = _partial_path(path)
+        try:
+            engine.save_to_file(item.text, tmp_path)
+            engine.runAndWait()
+            if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+                raise RuntimeError(f"TTS engine produced no audio for '{item.text}'")
+            # The WAV only ever appears once the audio is complete, so
+            # consumers never see a partially written file.
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        wav_cache.store(key, [path])
+        return path
+
+    def _play(self, path: str) -> None:
+        """Play a WAV file on the default output device."""
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        with wave.open(path, "rb") as wf:
+            stream = self._audio.open(
+                format=self._audio.get_format_from_width(wf.getsampwidth()),
+                channels=wf.getnchannels(),
+                rate=wf.getframerate(),
+                output=True,
+            )
+            try:
+                data = wf.readframes(4096)
+                while data:
+                    stream.write(data)
+                    data = wf.readframes(4096)
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+    def _handle(self, item: _Utterance):
+        if item.kind == "say":
+            if pyaudio is not None:
+                # Render once into the cache so that repeats are just playback
+                try:
+                    self._play(self._synthesize(item))
+                    return True
+                except Exception as e:
+                    print(f"[TTS] Playback failed, speaking directly: {e}")
+            engine = self._prepare(item.rate, item.voice_id)
+            engine.say(item.text)
+            engine.runAndWait()
+            return True
+        _link(self._synthesize(item), item.output_path)
+        return item.output_path
+
+
+_worker = TTSWorker()
+
+
+def _resolve(rate: int | None, voice_id: str | None) -> tuple[int, str | None]:
+    return rate or int(os.getenv("TTS_RATE", "160")), voice_id or os.getenv("TTS_VOICE")
+
+
+def generate_tts_async(
+    text: str, output_path: str, rate: int | None = None, voice_id: str | None = None
+) -> "Future[str]":
+    """
+    Queue synthesis of ``text`` to ``output_path`` on the TTS worker.
+
+    The returned future resolves to ``output_path`` as soon as the finished
+    WAV is in place, or raises if synthesis failed.  Text already in the WAV
+    cache is hardlinked (or copied) to ``output_path`` without queueing.
+    """
+    rate, voice_id = _resolve(rate, voice_id)
+    cached = cached_wav(text, rate, voice_id)
+    if cached:
+        future: Future = Future()
+        try:
+            _link(cached, output_path)
+            future.set_result(output_path)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    return _worker.submit("save", text, rate, voice_id, output_path, PRIORITY_SYNTHESIS)
 
 
 def generate_tts(text: str, output_path: str, rate: int | None = None, voice_id: str | None = None) -> None:
-    """Synthesize ``text`` to ``output_path`` using pyttsx3."""
-    if pyttsx3 is None:
-        print(f"[TTS] pyttsx3 not installed; cannot generate speech for '{text}'")
-        return
+    """Synthesize ``text`` to ``output_path`` using pyttsx3 and wait for it."""
     try:
-        print(f"[TTS] Synthesizing audio for: '{text}' -> {output_path}")
-        engine = pyttsx3.init()
-        rate = rate or int(os.getenv("TTS_RATE", "160"))
-        engine.setProperty("rate", rate)
-        voice_id = voice_id or os.getenv("TTS_VOICE")
-        if voice_id:
-            for voice in engine.getProperty("voices"):
-                if voice.id == voice_id:
-                    engine.setProperty("voice", voice.id)
-                    break
-        engine.save_to_file(text, output_path)
-        engine.runAndWait()
+        generate_tts_async(text, output_path, rate, voice_id).result()
     except Exception as e:  # pragma: no cover - runtime guard
         print(f"[TTS] Error generating speech for '{text}': {e}")
 
 
-def speak(text: str, rate: int | None = None, voice_id: str | None = None) -> None:
-    """Speak ``text`` synchronously using pyttsx3."""
-    if pyttsx3 is None:
+def speak(
+    text: str,
+    rate: int | None = None,
+    voice_id: str | None = None,
+    channel: str | None = None,
+    max_age: float | None = None,
+) -> "Future[bool]":
+    """
+    Queue ``text`` to be spoken and return immediately.
+
+    Utterances sharing a ``channel`` supersede each other while queued, and
+    anything not started within ``max_age`` seconds
+    (``config.TTS_SPEECH_MAX_AGE`` by default) is dropped.  The returned
+    future resolves once the text has been spoken.
+    """
+    if pyttsx3 is None and pyaudio is None:
         print(f"[TTS] pyttsx3 not installed; cannot speak '{text}'")
-        return
-    with _tts_lock:
-        try:
-            engine = pyttsx3.init()
-            rate = rate or int(os.getenv("TTS_RATE", "160"))
-            engine.setProperty("rate", rate)
-            voice_id = voice_id or os.getenv("TTS_VOICE")
-            if voice_id:
-                for voice in engine.getProperty("voices"):
-                    if voice.id == voice_id:
-                        engine.setProperty("voice", voice.id)
-                        break
-            engine.say(text)
-            engine.runAndWait()
-        except Exception as e:  # pragma: no cover - runtime guard
-            print(f"[TTS] Error speaking '{text}': {e}")
+        future: Future = Future()
+        future.set_result(False)
+        return future
+    rate, voice_id = _resolve(rate, voice_id)
+    return _worker.submit(
+        "say",
+        text,
+        rate,
+        voice_id,
+        priority=PRIORITY_SPEECH,
+        max_age=config.TTS_SPEECH_MAX_AGE if max_age is None else max_age,
+        channel=channel,
+    )
+
+
+def cancel_speech(channel: str | None = None) -> int:
+    """Drop queued utterances, e.g. when new input makes them stale."""
+    return _worker.cancel_pending(channel)
+
+
+def wait_for_speech(timeout: float | None = None) -> bool:
+    """Wait until all queued speech has been spoken (synthesis excluded)."""
+    return _worker.wait_until_idle(timeout)
@@ -1,6 +1,13 @@
 import os
-import hashlib
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+import config
 
 try:
     import cv2
@@ -8,31 +15,321 @@ except Exception:
     cv2 = None  # type: ignore
 
 
-def capture_frame(device: int = 0) -> tuple[str, str | None]:
-    """Capture a frame from the webcam and return a token and image path."""
+class CameraSource:
+    """
+    OpenCV capture device kept open for the life of the source.  Given a
+    file path instead of a device index it plays a video file, which stands
+    in for the webcam in tests and benchmarks.
+
+    ``realtime`` paces file playback at the video's frame rate and ``loop``
+    restarts it at the end.
+    """
+
+    def __init__(self, device: int | str = 0, realtime: bool = False, loop: bool = False) -> None:
+        if cv2 is None:
+            raise RuntimeError("opencv-python not installed; cannot open video source")
+        self.device = device
+        self._cap = cv2.VideoCapture(device)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Unable to open video source {device!r}")
+        is_file = isinstance(device, str)
+        fps = self._cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        self._interval = 1.0 / fps if realtime and fps else 0.0
+        self._loop = loop and is_file
+        self._next = time.monotonic()
+
+    def read(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        """Decode the next frame, into ``out`` when its shape matches."""
+        ok, frame = self._cap.read(out) if out is not None else self._cap.read()
+        if not ok and self._loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read(out) if out is not None else self._cap.read()
+        if not ok:
+            return None
+        if self._interval:
+            self._next += self._interval
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return frame
+
+    def close(self) -> None:
+        self._cap.release()
+
+
+class FrameRing:
+    """
+    Preallocated ring of ``slots`` frames.
+
+    The writer decodes straight into :meth:`reserve`'s slot and then
+    :meth:`commit`s it.  :meth:`get` returns a read-only view into the ring.
+    Once ``slots - 1`` newer frames have been committed the writer starts
+    decoding into that slot again, so a reader of a view must confirm with
+    :meth:`held` afterwards that the frame was not overwritten meanwhile.
+    :meth:`snapshot` does this for a private copy.
+    """
+
+    def __init__(self, slots: int, shape: tuple, dtype=np.uint8) -> None:
+        if slots < 2:
+            raise ValueError("FrameRing needs at least two slots")
+        self.slots = slots
+        self._frames = np.empty((slots, *shape), dtype=dtype)
+        self.count = 0  # frames committed so far; the latest has index count - 1
+        self._cond = threading.Condition()
+
+    def reserve(self) -> np.ndarray:
+        """Return the buffer the next frame should be decoded into."""
+        return self._frames[self.count % self.slots]
+
+    def commit(self) -> int:
+        """Publish the reserved frame and return its index."""
+        with self._cond:
+            self.count += 1
+            self._cond.notify_all()
+            return self.count - 1
+
+    def held(self, index: int) -> bool:
+        """Return True while frame ``index``'s slot has not been reused."""
+        return 0 <= index < self.count and index > self.count - self.slots
+
+    def get(self, index: int) -> np.ndarray | None:
+        """Return a read-only view of frame ``index`` if it is still held."""
+        if not self.held(index):
+            return None
+        view = self._frames[index % self.slots]
+        view.flags.writeable = False
+        return view
+
+    def snapshot(self, index: int) -> np.ndarray | None:
+        """Return a copy of frame ``index``, or ``None`` if it was overwritten."""
+        view = self.get(index)
+        if view is None:
+            return None
+        frame = view.copy()
+        # The writer may have started on this slot while we were copying
+        return frame if self.held(index) else None
+
+    def wait(self, after: int, timeout: float | None = None) -> int | None:
+        """Wait for a frame newer than ``after`` and return the latest index."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.count - 1 > after, timeout):
+                return None
+            return self.count - 1
+
+
+class CaptureService:
+    """
+    Keeps a video source open and decodes frames into a :class:`FrameRing`
+    on a background thread.  Consumers take copies of the frames they use
+    and :meth:`persist` only the frames they select.
+    """
+
+    def __init__(self, source, slots: int | None = None) -> None:
+        self.source = source
+        self.slots = slots or config.VIDEO_RING_SLOTS
+        self.ring: FrameRing | None = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "CaptureService":
+        self._thread = threading.Thread(target=self._run, name="video-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        try:
+            first = self.source.read()
+            if first is None:
+                return
+            self.ring = FrameRing(self.slots, first.shape, first.dtype)
+            self.ring.reserve()[...] = first
+            self.ring.commit()
+            self._ready.set()
+            while not self._stop.is_set():
+                buf = self.ring.reserve()
+                frame = self.source.read(buf)
+                if frame is None:
+                    break
+                if frame is not buf:
+                    buf[...] = frame
+                self.ring.commit()
+        except Exception as e:
+            print(f"[Video] Capture stopped: {e}")
+        finally:
+            self._ready.set()
+            self.source.close()
+
+    def latest(self, after: int = -1, timeout: float | None = None) -> tuple[int, np.ndarray | None]:
+        """
+        Return ``(index, frame)`` of the newest frame later than ``after``,
+        or ``(after, None)`` if none arrives within ``timeout``.  The frame
+        is a copy that the capture thread cannot overwrite.
+        """
+        if not self._ready.wait(timeout) or self.ring is None:
+            return after, None
+        while True:
+            index = self.ring.wait(after, timeout)
+            if index is None:
+                return after, None
+            frame = self.ring.snapshot(index)
+            if frame is not None:
+                return index, frame
+            # Overwritten while copying; take the newest frame instead
+            after = index
+
+    def persist(
+        self,
+        index: int,
+        directory: str = "modalities/webcam",
+        frame: np.ndarray | None = None,
+    ) -> str | None:
+        """
+        Write frame ``index`` to a PNG file and return its path.  Pass the
+        ``frame`` returned by :meth:`latest` to save it even if the ring has
+        moved on since.
+        """
+        if frame is None and self.ring is not None:
+            frame = self.ring.snapshot(index)
+        if frame is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        image_path = os.path.join(directory, f"frame_{ts}_{index}.png")
+        try:
+            cv2.imwrite(image_path, frame)
+        except Exception as e:
+            print(f"[Video] Error saving frame: {e}")
+            return None
+        return image_path
+
+
+def _gray(frame: np.ndarray, side: int) -> np.ndarray:
+    """Downscale ``frame`` to a ``side`` square grayscale float array."""
+    # Subsample the frame first (no copy) so only a few thousand pixels
+    # are converted, then average the remaining blocks.
+    step = max(1, min(frame.shape[0], frame.shape[1]) // (side * 4))
+    small = frame[::step, ::step]
+    gray = small.mean(axis=2) if small.ndim == 3 else small.astype(np.float64)
+    rows = np.array_split(np.arange(gray.shape[0]), side)
+    cols = np.array_split(np.arange(gray.shape[1]), side)
+    row_means = np.stack([gray[r].mean(axis=0) for r in rows])
+    return np.stack([row_means[:, c].mean(axis=1) for c in cols], axis=1)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def dhash(frame: np.ndarray, size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradients on a small gray frame."""
+    gray = _gray(frame, size + 1)[:size]
+    return _bits_to_int(gray[:, 1:] > gray[:, :-1])
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+def phash(frame: np.ndarray, size: int = 8) -> int:
+    """DCT hash: low-frequency coefficients above their median."""
+    n = size * 4
+    dct = _dct_matrix(n)
+    coeffs = (dct @ _gray(frame, n) @ dct.T)[:size, :size]
+    return _bits_to_int(coeffs > np.median(coeffs.ravel()[1:]))
+
+
+FRAME_HASHES = {"dhash": dhash, "phash": phash}
+
+
+class FrameHashIndex:
+    """
+    Recently seen perceptual frame hashes and the tokens they were given.
+
+    A frame whose hash is within ``threshold`` bits of a recent hash is a
+    near-duplicate and reuses that token; otherwise its own hash becomes a
+    new token.  Only the ``max_items`` most recently matched hashes are kept.
+    """
+
+    def __init__(self, threshold: int | None = None, max_items: int | None = None, method: str | None = None) -> None:
+        self.threshold = config.VIDEO_HASH_THRESHOLD if threshold is None else threshold
+        self.max_items = max_items or config.VIDEO_HASH_INDEX_SIZE
+        self.hash = FRAME_HASHES[method or config.VIDEO_HASH_METHOD]
+        self._hashes: OrderedDict[int, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def match(self, frame: np.ndarray) -> tuple[str, bool]:
+        """Return ``(token, is_new)`` for ``frame``."""
+        h = self.hash(frame)
+        with self._lock:
+            best = min(self._hashes, key=lambda k: (k ^ h).bit_count(), default=None)
+            if best is not None and (best ^ h).bit_count() <= self.threshold:
+                self._hashes.move_to_end(best)
+                return self._hashes[best], False
+            token = f"{h:016x}"
+            self._hashes[h] = token
+            if len(self._hashes) > self.max_items:
+                self._hashes.popitem(last=False)
+            return token, True
+
+
+_services: dict = {}
+_last_index: dict = {}
+_indexes: dict = {}
+_services_lock = threading.Lock()
+
+
+def get_capture_service(device: int | str = 0) -> CaptureService:
+    """Return the running capture service for ``device``, starting it once."""
+    with _services_lock:
+        service = _services.get(device)
+        if service is None or not service.running:
+            service = _services[device] = CaptureService(CameraSource(device)).start()
+        return service
+
+
+def capture_frame(device: int = 0, timeout: float = 5.0, skip_duplicates: bool = True) -> tuple[str, str | None]:
+    """
+    Capture a frame from the webcam and return a token and image path.
+
+    The device stays open between calls; each call takes the newest frame
+    decoded since the previous one and persists only that frame.  The token
+    is a perceptual hash, so an unchanged scene keeps its token.  With
+    ``skip_duplicates`` such a near-duplicate frame is not saved and
+    ``("", None)`` is returned.
+    """
     if cv2 is None:
         print("[Video] opencv-python not installed; skipping webcam capture")
         return "", None
-
-    cap = cv2.VideoCapture(device)
-    if not cap.isOpened():
-        print("[Video] Unable to open webcam")
+    try:
+        service = get_capture_service(device)
+    except Exception as e:
+        print(f"[Video] {e}")
         return "", None
 
-    ret, frame = cap.read()
-    cap.release()
-    if not ret:
+    index, frame = service.latest(_last_index.get(device, -1), timeout)
+    if frame is None:
         print("[Video] Failed to capture frame")
         return "", None
+    _last_index[device] = index
 
-    os.makedirs("modalities/webcam", exist_ok=True)
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    image_path = os.path.join("modalities/webcam", f"frame_{ts}.png")
-    try:
-        cv2.imwrite(image_path, frame)
-    except Exception as e:
-        print(f"[Video] Error saving frame: {e}")
+    token, is_new = _indexes.setdefault(device, FrameHashIndex()).match(frame)
+    if not is_new and skip_duplicates:
+        return "", None
+    image_path = service.persist(index, frame=frame)
+    if image_path is None:
         return "", None
-
-    token = hashlib.sha1(frame.tobytes()).hexdigest()[:8]
     return token, image_path